@@ -1,11 +1,17 @@
 import streamlit as st
-import sqlite3
 import os
-import pandas as pd
-from datetime import datetime
 from utils.auth import authenticate, create_user, is_admin
+from utils.dashboard import home_dashboard
 from utils.database import initialize_database
-from utils.responsive import apply_responsive_styles, create_responsive_grid, responsive_text, create_responsive_card
+from utils.maintenance import start_maintenance_scheduler
+from utils.page_registry import render_page
+from utils.render_metrics import start_run
+from utils.session_memory import start_session_reaper
+from utils.responsive import create_responsive_grid, responsive_text, create_responsive_card
+from utils.stylesheet import inject_stylesheet
+
+# Time each phase of this rerun (see the admin Performance tab)
+run_timer = start_run("app")
 
 # Load secrets if available
 try:
@@ -29,113 +35,17 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+run_timer.lap("config")
 
-# Apply responsive styles and UI enhancements
-apply_responsive_styles()
-
-# Apply custom styles for improved UI
-st.markdown("""
-<style>
-    /* Global styles for improved UI */
-    h1, h2, h3, h4 {
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        font-weight: 600;
-        color: #2c3e50;
-    }
-    
-    h1 {
-        margin-bottom: 1.5rem;
-    }
-    
-    /* Button styles */
-    .stButton > button {
-        border-radius: 8px !important;
-        font-weight: 500 !important;
-        transition: all 0.2s ease !important;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.12) !important;
-    }
-    .stButton > button:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.15) !important;
-    }
-    
-    /* Card styling */
-    .ui-card {
-        border-radius: 10px;
-        padding: 1.5rem;
-        background-color: white;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.05), 0 1px 3px rgba(0, 0, 0, 0.1);
-        margin-bottom: 1.5rem;
-        border-top: 4px solid #4361EE;
-    }
-    
-    /* Input field styling */
-    .stTextInput > div > div > input, .stTextArea > div > div > textarea {
-        border-radius: 8px !important;
-        border: 1px solid #e0e0e0 !important;
-        padding: 0.5rem 1rem !important;
-        transition: all 0.2s ease !important;
-    }
-    .stTextInput > div > div > input:focus, .stTextArea > div > div > textarea:focus {
-        border-color: #4361EE !important;
-        box-shadow: 0 0 0 2px rgba(67, 97, 238, 0.2) !important;
-    }
-    
-    /* Sidebar styling */
-    [data-testid="stSidebar"] {
-        background-color: #f8f9fa;
-        border-right: 1px solid #eaeaea;
-        padding-top: 1rem;
-    }
-    [data-testid="stSidebar"] > div:first-child {
-        padding-top: 1.5rem;
-    }
-    [data-testid="stSidebar"] [data-testid="stRadio"] label {
-        margin-bottom: 0.3rem;
-        padding: 0.4rem 0;
-        border-radius: 5px;
-        transition: background-color 0.2s;
-    }
-    [data-testid="stSidebar"] [data-testid="stRadio"] label:hover {
-        background-color: rgba(67, 97, 238, 0.05);
-    }
-    
-    /* Tab styling */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 2px;
-    }
-    .stTabs [data-baseweb="tab"] {
-        padding: 0.75rem 1rem;
-        border-radius: 10px 10px 0 0;
-    }
-    .stTabs [data-baseweb="tab-panel"] {
-        padding: 1rem 0;
-    }
-    
-    /* Expanders styling */
-    .streamlit-expanderHeader {
-        font-weight: 600;
-        border-radius: 5px;
-    }
-    .streamlit-expanderContent {
-        border-radius: 0 0 5px 5px;
-    }
-    
-    /* Specific component styling */
-    .stAlert {
-        border-radius: 10px !important;
-    }
-    
-    /* Fix React error with inline JS handlers */
-    .mobile-nav-buttons button {
-        border: none;
-        cursor: pointer;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Shared stylesheet, served as a cached static file (see utils/stylesheet.py)
+inject_stylesheet("app")
+run_timer.lap("styles")
 
 # Initialize database
 initialize_database()
+start_maintenance_scheduler()
+start_session_reaper()
+run_timer.lap("database")
 
 # Session state initialization
 if 'authenticated' not in st.session_state:
@@ -154,148 +64,6 @@ if 'show_splash' not in st.session_state:
 # Splash Screen with developer credit
 if st.session_state.show_splash and not st.session_state.authenticated:
     st.markdown(f"""
-    <style>
-        .splash-container {{
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            height: 100vh;
-            text-align: center;
-            padding: 2rem;
-            background: linear-gradient(135deg, #4361EE 0%, #3A0CA3 100%);
-            color: white;
-            border-radius: 12px;
-            margin-bottom: 20px;
-            box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-            position: relative;
-            overflow: hidden;
-        }}
-        /* Decorative background elements */
-        .splash-container::before {{
-            content: '';
-            position: absolute;
-            top: -50px;
-            left: -50px;
-            width: 200px;
-            height: 200px;
-            border-radius: 50%;
-            background: rgba(255,255,255,0.05);
-            z-index: 0;
-        }}
-        .splash-container::after {{
-            content: '';
-            position: absolute;
-            bottom: -50px;
-            right: -50px;
-            width: 150px;
-            height: 150px;
-            border-radius: 50%;
-            background: rgba(255,255,255,0.05);
-            z-index: 0;
-        }}
-        .splash-content {{
-            position: relative;
-            z-index: 1;
-            width: 100%;
-            max-width: 800px;
-        }}
-        .splash-title {{
-            font-size: 3.8rem;
-            margin-bottom: 0.5rem;
-            font-weight: 700;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            letter-spacing: -0.5px;
-            text-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        .splash-version {{
-            font-size: 0.85rem;
-            margin-top: 0.5rem;
-            opacity: 0.7;
-            background: rgba(255,255,255,0.1);
-            padding: 5px 10px;
-            border-radius: 30px;
-            display: inline-block;
-            backdrop-filter: blur(5px);
-        }}
-        .splash-subtitle {{
-            font-size: 1.7rem;
-            margin: 1.5rem 0;
-            opacity: 0.9;
-            font-weight: 300;
-        }}
-        .splash-features {{
-            font-size: 1.1rem;
-            max-width: 600px;
-            margin: 0 auto 2rem auto;
-            line-height: 1.6;
-            opacity: 0.8;
-        }}
-        .developer-credit {{
-            margin-top: 3.5rem;
-            font-size: 1rem;
-            opacity: 0.8;
-            padding: 1rem;
-            border-top: 1px solid rgba(255,255,255,0.1);
-            width: 80%;
-        }}
-        .social-links {{
-            display: flex;
-            justify-content: center;
-            gap: 20px;
-            margin-top: 12px;
-        }}
-        .social-links a {{
-            color: white;
-            text-decoration: none;
-            transition: all 0.3s;
-            padding: 5px 10px;
-            border-radius: 5px;
-            background: rgba(255,255,255,0.1);
-        }}
-        .social-links a:hover {{
-            background: rgba(255,255,255,0.2);
-            transform: translateY(-2px);
-        }}
-        .enter-button {{
-            margin-top: 25px;
-            padding: 12px 32px;
-            background-color: white;
-            color: #4361EE;
-            border: none;
-            border-radius: 30px;
-            cursor: pointer;
-            font-weight: 600;
-            font-size: 1.1rem;
-            transition: all 0.3s;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        }}
-        .enter-button:hover {{
-            transform: translateY(-3px);
-            box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-        }}
-        
-        /* Responsive adjustments */
-        @media (max-width: 768px) {{
-            .splash-title {{
-                font-size: 2.8rem;
-            }}
-            .splash-subtitle {{
-                font-size: 1.3rem;
-            }}
-        }}
-        @media (max-width: 480px) {{
-            .splash-title {{
-                font-size: 2.2rem;
-            }}
-            .splash-subtitle {{
-                font-size: 1.1rem;
-            }}
-            .splash-features {{
-                font-size: 0.95rem;
-            }}
-        }}
-    </style>
     <div class="splash-container">
         <div class="splash-content">
             <div class="splash-title">Welcome to {app_name}</div>
@@ -323,6 +91,7 @@ if st.session_state.show_splash and not st.session_state.authenticated:
     if st.button("Enter App"):
         st.session_state.show_splash = False
         st.rerun()
+    run_timer.lap("splash")
 
 # Authentication with enhanced UI design
 if not st.session_state.authenticated and not st.session_state.show_splash:
@@ -338,116 +107,8 @@ if not st.session_state.authenticated and not st.session_state.show_splash:
     </div>
     """, unsafe_allow_html=True)
     
-    # Add enhanced UI styles
-    st.markdown("""
-    <style>
-        /* Auth container styling */
-        .auth-container {
-            max-width: 900px;
-            margin: 0 auto;
-            background-color: white;
-            border-radius: 12px;
-            box-shadow: 0 4px 20px rgba(0, 0, 0, 0.05);
-            overflow: hidden;
-            border: 1px solid #f0f0f0;
-        }
-        
-        /* Tab styling */
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 0;
-            background-color: #f8f9fa;
-            padding: 10px 10px 0 10px;
-        }
-        .stTabs [data-baseweb="tab"] {
-            height: 50px;
-            white-space: pre-wrap;
-            border-radius: 10px 10px 0 0;
-            font-weight: 500;
-            letter-spacing: 0.3px;
-            background-color: #f0f2f5;
-            margin-right: 4px;
-        }
-        .stTabs [data-baseweb="tab"][aria-selected="true"] {
-            background-color: white;
-            box-shadow: 0 0 10px rgba(0, 0, 0, 0.05);
-            position: relative;
-            top: 1px;
-        }
-        .stTabs [data-baseweb="tab-panel"] {
-            padding: 2rem 1rem;
-            background: white;
-        }
-        
-        /* Input field styling */
-        .stTextInput, .stPasswordInput {
-            margin-bottom: 15px;
-        }
-        .stTextInput > div > div > input, .stPasswordInput > div > div > input {
-            font-size: 16px !important;
-            padding: 12px 15px !important;
-            border-radius: 8px !important;
-            border: 1px solid #e0e0e0 !important;
-            background-color: #f9f9f9 !important;
-            transition: all 0.2s ease !important;
-        }
-        .stTextInput > div > div > input:focus, .stPasswordInput > div > div > input:focus {
-            background-color: white !important;
-            border-color: #4361EE !important;
-            box-shadow: 0 0 0 3px rgba(67, 97, 238, 0.15) !important;
-        }
-        
-        /* Form sections */
-        .form-header {
-            font-weight: 600;
-            margin-bottom: 1.5rem;
-            color: #2c3e50;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            position: relative;
-        }
-        .form-header:after {
-            content: '';
-            position: absolute;
-            bottom: -8px;
-            left: 0;
-            height: 3px;
-            width: 40px;
-            background: #4361EE;
-            border-radius: 3px;
-        }
-        
-        /* Button styling */
-        .stButton > button {
-            height: 48px !important;
-            font-size: 1rem !important;
-            font-weight: 500 !important;
-            letter-spacing: 0.5px !important;
-            border-radius: 8px !important;
-            border: none !important;
-            transition: all 0.2s ease !important;
-            box-shadow: 0 2px 5px rgba(0, 0, 0, 0.1) !important;
-        }
-        .stButton > button:hover {
-            transform: translateY(-2px) !important;
-            box-shadow: 0 5px 15px rgba(0, 0, 0, 0.1) !important;
-        }
-        .stButton > button[data-baseweb="button"] {
-            background-color: #4361EE !important;
-        }
-        
-        /* Responsive layout */
-        @media (max-width: 768px) {
-            .stTabs [data-baseweb="tab-list"] {
-                padding: 5px 5px 0 5px;
-            }
-            .stTabs [data-baseweb="tab-panel"] {
-                padding: 1.5rem 0.5rem;
-            }
-            .main .block-container {
-                padding: 1rem 0.5rem !important;
-            }
-        }
-    </style>
-    """, unsafe_allow_html=True)
+    # Styles for the login and registration forms
+    inject_stylesheet("auth")
     
     # Create better tabs with enhanced UI
     tab1, tab2 = st.tabs(["Login", "Register"])
@@ -534,50 +195,9 @@ if not st.session_state.authenticated and not st.session_state.show_splash:
                 </ul>
             </div>
             """, unsafe_allow_html=True)
+    run_timer.lap("login")
 
 else:
-    # Mobile detection for responsive navigation 
-    st.markdown("""
-    <style>
-        /* Mobile-friendly sidebar */
-        @media (max-width: 640px) {
-            section[data-testid="stSidebar"] {
-                width: 80% !important;
-                min-width: unset !important;
-            }
-            /* Mobile quick navigation */
-            .mobile-nav-buttons {
-                display: flex;
-                flex-wrap: wrap;
-                gap: 0.5rem;
-                margin-bottom: 1rem;
-            }
-            .mobile-nav-buttons button {
-                flex: 1 0 auto;
-                min-width: 80px;
-                padding: 0.5rem;
-                font-size: 0.8rem !important;
-                height: auto !important;
-                white-space: nowrap;
-            }
-            /* Hide non-essential sidebar elements on small screens */
-            .sidebar-optional {
-                display: none !important;
-            }
-        }
-        
-        /* Hide mobile navigation on larger screens */
-        .mobile-nav-buttons {
-            display: none;
-        }
-        @media (max-width: 640px) {
-            .mobile-nav-buttons {
-                display: flex;
-            }
-        }
-    </style>
-    """, unsafe_allow_html=True)
-    
     # Enhanced sidebar UI for authenticated users
     st.sidebar.markdown(f"""
     <div style="padding: 1rem 0.5rem; margin-bottom: 1rem; border-radius: 10px; background: linear-gradient(135deg, #4361EE 0%, #3A0CA3 100%);">
@@ -586,37 +206,6 @@ else:
     </div>
     """, unsafe_allow_html=True)
     
-    # Enhanced navigation with better styling
-    st.sidebar.markdown("""
-    <style>
-        /* Style for navigation */
-        [data-testid="stRadio"] > div {
-            padding: 0.5rem;
-            background-color: white;
-            border-radius: 10px;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.05);
-        }
-        [data-testid="stRadio"] label {
-            padding: 0.5rem 0.8rem !important;
-            margin-bottom: 0.3rem;
-            border-radius: 6px;
-            transition: all 0.2s;
-            line-height: 1.4;
-        }
-        [data-testid="stRadio"] label:hover {
-            background-color: rgba(67, 97, 238, 0.05);
-        }
-        [data-testid="stRadio"] label div:first-child {
-            height: 20px;
-            width: 20px;
-        }
-        [data-testid="stRadio"] label div:first-child div {
-            height: 12px;
-            width: 12px;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-    
     # Add section title
     st.sidebar.markdown('<div style="margin: 1rem 0 0.5rem 0.5rem; font-size: 0.85rem; font-weight: 600; color: #666;">MAIN MENU</div>', 
                        unsafe_allow_html=True)
@@ -645,39 +234,6 @@ else:
         
     # Create mobile navigation buttons using Streamlit components instead of HTML
     st.markdown("""
-    <style>
-        /* Mobile navigation styling */
-        .mobile-nav-grid {
-            display: grid;
-            grid-template-columns: repeat(5, 1fr);
-            gap: 8px;
-            margin-bottom: 20px;
-            background: #f8f9fa;
-            padding: 10px;
-            border-radius: 10px;
-        }
-        .mobile-nav-grid .stButton button {
-            padding: 4px !important;
-            font-size: 12px !important;
-            height: auto !important;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            gap: 2px;
-        }
-        .mobile-nav-grid .stButton button p {
-            margin: 0;
-        }
-        .nav-icon {
-            font-size: 1.2rem;
-        }
-        @media (min-width: 768px) {
-            .mobile-nav-container {
-                display: none;
-            }
-        }
-    </style>
-    
     <div class="mobile-nav-container">
         <div class="mobile-nav-title" style="text-align: center; margin-bottom: 5px; font-size: 0.8rem; color: #666;">
             Quick Navigation
@@ -744,25 +300,6 @@ else:
         if is_admin(st.session_state.user_id):
             # Only show on mobile
             st.markdown("""
-            <style>
-                .admin-actions {
-                    margin-top: 10px;
-                    background: rgba(67, 97, 238, 0.05);
-                    border-radius: 10px;
-                    padding: 10px;
-                }
-                .admin-title {
-                    font-size: 0.85rem;
-                    margin-bottom: 5px;
-                    color: #4361EE;
-                    font-weight: 600;
-                }
-                @media (min-width: 768px) {
-                    .admin-mobile-only {
-                        display: none;
-                    }
-                }
-            </style>
             <div class="admin-mobile-only">
                 <div class="admin-actions">
                     <div class="admin-title">Admin Actions</div>
@@ -793,25 +330,6 @@ else:
     <div style="margin: 1.5rem 0 0.5rem 0; height: 1px; background: linear-gradient(to right, rgba(0,0,0,0.05), rgba(0,0,0,0.1), rgba(0,0,0,0.05));"></div>
     """, unsafe_allow_html=True)
     
-    # Logout button with better styling
-    st.sidebar.markdown("""
-    <style>
-        .logout-button {
-            margin-top: 1rem;
-        }
-        .logout-button button {
-            background-color: #f8f9fa !important;
-            color: #666 !important;
-            border: 1px solid #e0e0e0 !important;
-            width: 100%;
-        }
-        .logout-button button:hover {
-            background-color: #f0f0f0 !important;
-            border-color: #d0d0d0 !important;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-    
     # Add app information before logout
     st.sidebar.markdown(f"""
     <div style="padding: 0.5rem; margin-bottom: 1rem; font-size: 0.8rem; color: #888; text-align: center;">
@@ -826,29 +344,23 @@ else:
         with col2:
             if st.button("🚪 Logout", key="logout_btn"):
                 st.session_state.authenticated = False
-        st.session_state.user_id = None
-        st.session_state.username = None
-        st.session_state.role = None
-        st.rerun()
+                st.session_state.user_id = None
+                st.session_state.username = None
+                st.session_state.role = None
+                st.rerun()
+    run_timer.lap("navigation")
     
     # Content based on navigation selection
     if navigation == "Home":
         st.title("Community Hub Dashboard")
+        dashboard = home_dashboard()
         
         # Display recent activities
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Recent Discussions")
-            conn = sqlite3.connect('community.db')
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT d.title, u.username, d.created_at 
-                FROM discussions d 
-                JOIN users u ON d.user_id = u.id 
-                ORDER BY d.created_at DESC LIMIT 5
-            """)
-            discussions = cursor.fetchall()
+            discussions = dashboard['discussions']
             
             if discussions:
                 for disc in discussions:
@@ -858,15 +370,7 @@ else:
                 
         with col2:
             st.subheader("Upcoming Events")
-            conn = sqlite3.connect('community.db')
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT title, event_date, location 
-                FROM events 
-                WHERE event_date >= ? 
-                ORDER BY event_date ASC LIMIT 5
-            """, (datetime.now().strftime('%Y-%m-%d'),))
-            events = cursor.fetchall()
+            events = dashboard['events']
             
             if events:
                 for event in events:
@@ -876,14 +380,7 @@ else:
         
         # Recent announcements
         st.subheader("Latest Announcements")
-        conn = sqlite3.connect('community.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT title, content, created_at 
-            FROM announcements 
-            ORDER BY created_at DESC LIMIT 3
-        """)
-        announcements = cursor.fetchall()
+        announcements = dashboard['announcements']
         
         if announcements:
             for announce in announcements:
@@ -892,52 +389,15 @@ else:
         else:
             st.info("No announcements have been posted yet.")
             
-        conn.close()
+        run_timer.lap("home")
+    else:
+        # Other pages are imported on first selection (see utils/page_registry.py)
+        render_page(navigation)
+        run_timer.lap("page")
 
 # Footer with mobile responsiveness
 st.markdown("---")
 st.markdown(f"""
-<style>
-    /* Footer Styles */
-    .footer-container {{
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        flex-wrap: wrap;
-        gap: 0.5rem;
-        padding: 0.5rem 0;
-    }}
-    .footer-copyright {{
-        margin-right: 1rem;
-    }}
-    .footer-links {{
-        display: flex;
-        gap: 0.5rem;
-    }}
-    /* Mobile adjustments */
-    @media (max-width: 640px) {{
-        .footer-container {{
-            flex-direction: column;
-            align-items: center;
-            text-align: center;
-        }}
-        .footer-copyright {{
-            margin-right: 0;
-            margin-bottom: 0.5rem;
-            font-size: 0.8rem;
-        }}
-        .footer-version {{
-            display: block;
-            font-size: 0.7rem;
-            margin-top: 0.2rem;
-        }}
-        .footer-links {{
-            flex-wrap: wrap;
-            justify-content: center;
-            font-size: 0.8rem;
-        }}
-    }}
-</style>
 <div class="footer-container">
     <div class="footer-copyright">
         © 2023 {app_name}. All rights reserved.
@@ -950,3 +410,5 @@ st.markdown(f"""
     </div>
 </div>
 """, unsafe_allow_html=True)
+run_timer.lap("footer")
+run_timer.finish()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for bulk user provisioning.
+
+Generates a cohort file, imports it into a throwaway database with the bulk
+pipeline (with and without a hashing process pool), compares that with
+creating the same accounts one at a time through utils.auth.create_user,
+and times a streaming export of the result. Finally checks that directory
+prefix searches match exactly the accounts starting with the prefix, for
+prefixes ending in characters around the letters (@, [ to `, {).
+
+    python benchmarks/bulk_import.py --users 100000 --hash-workers 4
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_cohort(path, count, offset=0, bad_every=0):
+    """Write a CSV cohort; every bad_every-th row is missing its password."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["username", "email", "password", "role", "bio", "interests"])
+        for i in range(offset, offset + count):
+            password = "" if bad_every and i % bad_every == 0 else f"pw-{i}-secret"
+            writer.writerow([f"member{i}", f"member{i}@example.com", password, "user",
+                             f"Member {i}", "Python, Community"])
+
+
+def fresh_database(workdir, name):
+    """Point the app at a new empty database and return its path."""
+    import utils.database
+    db_path = os.path.join(workdir, f"{name}.db")
+    utils.database.DB_PATH = db_path
+    utils.database.initialize_database()
+    return db_path
+
+
+# Names that sort next to each other once NOCASE folds them; a search for
+# each prefix must find exactly the names starting with it
+PREFIX_NAMES = ["john", "john_x", "john@x", "JOHN@y", "john[x", "john`x", "john^x", "johnA", "johnz", "john{x"]
+PREFIXES = ["john", "john@", "JOHN@", "john[", "john^", "john_", "john`", "johnz", "john{"]
+
+
+def check_prefix_search():
+    """Create PREFIX_NAMES and compare the directory's counts with plain prefix matching."""
+    from utils.auth import create_user
+    from utils.user_directory import count_users
+    for name in PREFIX_NAMES:
+        create_user(name, f"{name}@example.com", f"pw-{name}")
+    problems = []
+    for field, values in [("username", PREFIX_NAMES), ("email", [f"{n}@example.com" for n in PREFIX_NAMES])]:
+        for prefix in PREFIXES:
+            expected = sum(value.lower().startswith(prefix.lower()) for value in values)
+            found = count_users(prefix, field)
+            if found != expected:
+                problems.append(f"{field} prefix {prefix!r}: {found} matches, expected {expected}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk user import throughput benchmark")
+    parser.add_argument("--users", type=int, default=100000, help="Rows in the bulk cohort")
+    parser.add_argument("--baseline-users", type=int, default=2000,
+                        help="Rows created one at a time for the baseline (extrapolated)")
+    parser.add_argument("--hash-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bulk_import_")
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    from utils.bulk_users import import_users, iter_user_export
+
+    cohort = os.path.join(workdir, "cohort.csv")
+    write_cohort(cohort, args.users, bad_every=1000)
+    print(f"cohort: {args.users} rows ({args.users // 1000} invalid) in {cohort}")
+
+    results = {}
+    for label, workers in [("bulk, in-process hashing", 0), (f"bulk, {args.hash_workers} hash workers", args.hash_workers)]:
+        fresh_database(workdir, f"bulk_{workers}")
+        started = time.perf_counter()
+        with open(cohort, newline="") as f:
+            result = import_users(f, batch_size=args.batch_size, hash_workers=workers)
+        elapsed = time.perf_counter() - started
+        results[label] = result['created'] / elapsed
+        print(f"{label}: {result['created']} created, {len(result['errors'])} errors in {elapsed:.2f}s "
+              f"({result['created'] / elapsed:,.0f} users/s)")
+
+    # Re-importing the same file must reject every row without creating anything
+    started = time.perf_counter()
+    with open(cohort, newline="") as f:
+        result = import_users(f, batch_size=args.batch_size)
+    print(f"re-import of same cohort: {result['created']} created, {len(result['errors'])} rejected "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    exported = sum(len(chunk) for chunk in iter_user_export('csv'))
+    print(f"streaming CSV export: {exported / 1e6:.1f} MB in {time.perf_counter() - started:.2f}s")
+
+    # Baseline: the admin form's path, one create_user call per account
+    fresh_database(workdir, "community")
+    from utils.auth import create_user
+    started = time.perf_counter()
+    for i in range(args.baseline_users):
+        create_user(f"single{i}", f"single{i}@example.com", f"pw-{i}")
+    elapsed = time.perf_counter() - started
+    rate = args.baseline_users / elapsed
+    print(f"one at a time (create_user): {args.baseline_users} in {elapsed:.2f}s ({rate:,.0f} users/s, "
+          f"~{args.users / rate / 60:.1f} min for {args.users})")
+
+    best = max(results.values())
+    print(f"speedup of best bulk path over one at a time: {best / rate:.0f}x")
+
+    problems = check_prefix_search()
+    print(f"directory prefix search: {len(PREFIXES) * 2 - len(problems)} of {len(PREFIXES) * 2} prefixes ok")
+    for problem in problems:
+        print(f"  FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
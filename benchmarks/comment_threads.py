@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Load test for threaded comments: members build one long thread of comments
+and nested replies, then some of them are purged with the background purge
+job, taking their comments out of the middle and the top of reply trees.
+
+Runs against a throwaway database and checks, before and after the purge,
+that walking the thread's pages and opening every reply tree reaches each
+comment exactly once, that replies to deleted comments carry the "In reply
+to a deleted comment" note, and that the reply and comment counters match
+a recount.
+
+    python benchmarks/comment_threads.py --comments 5000 --purge 3
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ORPHAN_NOTE = '<div class="comment-meta">In reply to a deleted comment</div>'
+
+
+def walk_thread(discussion_id):
+    """Every comment the thread view can reach: {id: html shown for it}, plus the number of pages."""
+    from utils.comments import comment_page, thread_replies
+    shown = {}
+    pages = 0
+    direction, path = 'first', None
+    while True:
+        page = comment_page(discussion_id, direction, path)
+        pages += 1
+        for comment in page['comments']:
+            shown.setdefault(comment['id'], []).append(comment['html'])
+            if comment['reply_count']:
+                thread = thread_replies(discussion_id, comment['path'], comment['reply_count'])
+                for reply_id, _ in thread['replies']:
+                    start = thread['html'].index(f'id="comment-{reply_id}"')
+                    end = thread['html'].find('<div class="comment ', start)
+                    shown.setdefault(reply_id, []).append(thread['html'][start:end if end != -1 else None])
+        if not page['has_later']:
+            return shown, pages
+        direction, path = 'after', page['last']
+
+
+def check_thread(db_path, discussion_id):
+    started = time.perf_counter()
+    shown, pages = walk_thread(discussion_id)
+    elapsed = time.perf_counter() - started
+
+    conn = sqlite3.connect(db_path)
+    comments = {comment_id: (parent_id, path, reply_count) for comment_id, parent_id, path, reply_count in conn.execute(
+        "SELECT id, parent_id, path, reply_count FROM comments WHERE discussion_id = ?", (discussion_id,))}
+    comment_count = conn.execute("SELECT comment_count FROM discussions WHERE id = ?", (discussion_id,)).fetchone()[0]
+    conn.close()
+    paths = {path for _, path, _ in comments.values()}
+
+    problems = []
+    missing = set(comments) - set(shown)
+    if missing:
+        problems.append(f"{len(missing)} comments unreachable, e.g. {sorted(missing)[:5]}")
+    repeated = [comment_id for comment_id, htmls in shown.items() if len(htmls) > 1]
+    if repeated:
+        problems.append(f"{len(repeated)} comments shown more than once, e.g. {repeated[:5]}")
+    if comment_count != len(comments):
+        problems.append(f"comment_count {comment_count} != recount {len(comments)}")
+    wrong_notes = 0
+    wrong_counts = 0
+    orphans = 0
+    for comment_id, (parent_id, path, reply_count) in comments.items():
+        orphaned = path.rsplit('.', 1)[0] not in paths if '.' in path else False
+        orphans += orphaned
+        if comment_id in shown and (ORPHAN_NOTE in shown[comment_id][0]) != orphaned:
+            wrong_notes += 1
+        subtree = sum(1 for other in paths if other.startswith(path + '.'))
+        if reply_count != subtree:
+            wrong_counts += 1
+    if wrong_notes:
+        problems.append(f"{wrong_notes} comments with a missing or wrong deleted-parent note")
+    if wrong_counts:
+        problems.append(f"{wrong_counts} comments whose reply_count doesn't match their subtree")
+    return len(comments), orphans, pages, elapsed, problems
+
+
+def report(label, result):
+    count, orphans, pages, elapsed, problems = result
+    print(f"{label}: {count} comments ({orphans} replying to deleted ones) on {pages} pages, "
+          f"walked in {elapsed:.2f}s")
+    for problem in problems:
+        print(f"  FAIL: {problem}")
+    return bool(problems)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threaded comments load test")
+    parser.add_argument("--users", type=int, default=50, help="Members commenting")
+    parser.add_argument("--comments", type=int, default=3000, help="Comments in the thread")
+    parser.add_argument("--reply-share", type=float, default=0.6,
+                        help="Share of comments that reply to an earlier one")
+    parser.add_argument("--purge", type=int, default=5, help="Members purged after the thread is built")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="comment_threads_")
+    db_path = os.path.join(workdir, "community.db")
+    os.environ["COMMUNITY_DB"] = db_path
+    os.environ["MAINTENANCE_SCHEDULER"] = "0"
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+
+    from utils.comments import post_comment
+    from utils.database import initialize_database
+    from utils.purge import list_purge_jobs, start_purge
+
+    initialize_database()
+    conn = sqlite3.connect(db_path)
+    now = time.strftime('%Y-%m-%d %H:%M:%S')
+    conn.executemany(
+        "INSERT INTO users (username, email, password, salt, role, created_at) VALUES (?, ?, 'x', 'x', 'user', ?)",
+        [(f"member{i}", f"member{i}@example.com", now) for i in range(args.users)]
+    )
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE username LIKE 'member%'")]
+    discussion_id = conn.execute(
+        "INSERT INTO discussions (user_id, title, content, category, created_at, updated_at) "
+        "VALUES (?, 'Busy thread', 'Load test', 'General', ?, ?)", (user_ids[0], now, now)
+    ).lastrowid
+    conn.commit()
+    conn.close()
+
+    rng = random.Random(args.seed)
+    failed = False
+
+    # The case that first went missing: a reply whose top-level comment is purged
+    root_author, reply_author = user_ids[-2:]
+    root_id, _ = post_comment(discussion_id, root_author, "Top-level comment to be purged")
+    reply_id, _ = post_comment(discussion_id, reply_author, "Reply that must stay visible", root_id)
+
+    started = time.perf_counter()
+    posted = [root_id, reply_id]
+    for i in range(args.comments - len(posted)):
+        parent = rng.choice(posted) if rng.random() < args.reply_share else None
+        comment_id, _ = post_comment(discussion_id, rng.choice(user_ids[:-2]), f"Comment {i}", parent)
+        posted.append(comment_id)
+    elapsed = time.perf_counter() - started
+    print(f"posted {len(posted)} comments in {elapsed:.2f}s ({len(posted) / elapsed:.0f}/s)")
+    failed |= report("before purge", check_thread(db_path, discussion_id))
+
+    purged = [root_author] + rng.sample(user_ids[1:-2], args.purge - 1)
+    started = time.perf_counter()
+    for user_id in purged:
+        start_purge(user_id, requested_by="comment_threads")
+    while any(job['status'] in ('queued', 'running') for job in list_purge_jobs(len(purged))):
+        time.sleep(0.05)
+    print(f"purged {len(purged)} members in {time.perf_counter() - started:.2f}s: "
+          f"{', '.join(job['status'] for job in list_purge_jobs(len(purged)))}")
+    failed |= report("after purge", check_thread(db_path, discussion_id))
+
+    shown, _ = walk_thread(discussion_id)
+    if reply_id not in shown or ORPHAN_NOTE not in shown[reply_id][0]:
+        print(f"  FAIL: reply {reply_id} to the purged top-level comment isn't shown with its note")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
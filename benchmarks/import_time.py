@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Import-time report for app.py and each page.
+
+Runs each script's top-level imports (only the imports, nothing that needs
+a Streamlit session) in a fresh interpreter under `python -X importtime`,
+and reports the cold import cost, the number of modules loaded and the peak
+memory of that process, plus the heaviest packages behind each one. Imports
+deferred into functions don't count, which is the point: they are paid on
+first use, by the pages that need them.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 5 --top 15 --json imports.json
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = ["app.py"] + sorted(f"pages/{name}" for name in os.listdir(os.path.join(ROOT, "pages"))
+                              if name.endswith(".py"))
+
+# Printed by the child after its imports, so it can be told apart from -X importtime lines
+_MARKER = "import_time_report:"
+
+
+def top_level_imports(path):
+    """The script's module-level import statements, as source."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return [ast.get_source_segment(source, node) for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def parse_importtime(stderr):
+    """
+    -X importtime lines as (depth, self_us, cumulative_us, module). Nested
+    imports are indented two spaces per level under the module importing them.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return entries
+
+
+def measure(script):
+    """Import one script's dependencies in a fresh interpreter; returns its timings and footprint."""
+    code = "\n".join(top_level_imports(os.path.join(ROOT, script)) + [
+        "import resource, sys",
+        f"print({_MARKER!r}, len(sys.modules), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)",
+    ])
+    env = dict(os.environ, METRICS_PORT="0", MAINTENANCE_SCHEDULER="0", PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    report = [line for line in result.stdout.splitlines() if line.startswith(_MARKER)]
+    if result.returncode != 0 or not report:
+        raise RuntimeError(f"{script}: imports failed\n{result.stderr[-2000:]}")
+    _, modules, max_rss_kb = report[-1].split()
+    entries = parse_importtime(result.stderr)
+    top = [e for e in entries if e[0] == 0]
+    return {
+        "total_ms": sum(e[2] for e in top) / 1000,
+        "modules": int(modules),
+        "max_rss_mb": int(max_rss_kb) / 1024,
+        "packages": {name: cumulative / 1000 for _, _, cumulative, name in top},
+        "loaded": sorted({e[3].split(".")[0] for e in entries}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time per page, like python -X importtime")
+    parser.add_argument("scripts", nargs="*", help="Scripts to measure (default: app.py and every page)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per script; the fastest counts")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest top-level imports to list per script")
+    parser.add_argument("--watch", default="pandas,plotly,PIL,numpy,pyarrow,altair",
+                        help="Packages to flag as loaded or not per script")
+    parser.add_argument("--json", help="Write the report here")
+    args = parser.parse_args()
+
+    watched = [name for name in args.watch.split(",") if name]
+    report = {}
+    for script in args.scripts or SCRIPTS:
+        runs = [measure(script) for _ in range(args.runs)]
+        report[script] = min(runs, key=lambda run: run["total_ms"])
+
+    print(f"{'script':<26}{'import ms':>10}{'modules':>9}{'max RSS MB':>12}  heavy packages loaded")
+    for script, stats in report.items():
+        heavy = ", ".join(name for name in watched if name in stats["loaded"]) or "-"
+        print(f"{script:<26}{stats['total_ms']:>10.1f}{stats['modules']:>9}{stats['max_rss_mb']:>12.1f}  {heavy}")
+
+    for script, stats in report.items():
+        print(f"\n{script}: heaviest top-level imports (cumulative ms)")
+        for name, ms in sorted(stats["packages"].items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {ms:>9.1f}  {name}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
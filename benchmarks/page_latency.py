@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Per-page latency and throughput benchmark.
+
+Seeds a throwaway database (or copies --db), then renders every page
+headlessly with Streamlit's AppTest as a logged-in member, or as the admin
+for the admin pages, and reports latency percentiles and renders per
+second for each. A render is one full script run, the same work the
+server does for every interaction.
+
+AppTest runs one script at a time per process, which matches how a single
+Streamlit process is bound by the GIL; --processes runs that many copies
+side by side against the same database to show contention between
+server processes.
+
+    python benchmarks/page_latency.py --users 5000 --iterations 30
+    python benchmarks/page_latency.py --json after.json --baseline before.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = ["app.py"] + sorted(f"pages/{name}" for name in os.listdir(os.path.join(ROOT, "pages"))
+                            if name.endswith(".py"))
+ADMIN_PAGES = {"pages/admin.py", "pages/analytics.py"}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def pick_sessions(db_path):
+    """
+    Session state for each scenario: the admin, and the most active member
+    looking at the busiest discussion, event and conversation.
+    """
+    conn = sqlite3.connect(db_path)
+    admin = conn.execute("SELECT id, username FROM users WHERE role = 'admin' ORDER BY id LIMIT 1").fetchone()
+    member = conn.execute("""
+        SELECT u.id, u.username FROM users u JOIN user_stats s ON s.user_id = u.id
+        WHERE u.role = 'user' ORDER BY s.comments + s.discussions DESC, u.id LIMIT 1
+    """).fetchone() or admin
+    discussion = conn.execute(
+        "SELECT discussion_id FROM comments GROUP BY discussion_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    event = conn.execute(
+        "SELECT event_id FROM rsvps GROUP BY event_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    partner = conn.execute("""
+        SELECT CASE WHEN sender_id = ? THEN receiver_id ELSE sender_id END AS other
+        FROM messages WHERE sender_id = ? OR receiver_id = ?
+        GROUP BY other ORDER BY COUNT(*) DESC LIMIT 1
+    """, (member[0],) * 3).fetchone()
+    conn.close()
+
+    def login(user, role):
+        return {"authenticated": True, "user_id": user[0], "username": user[1], "role": role,
+                "show_splash": False}
+
+    scenarios = []
+    for page in PAGES:
+        user, role = (admin, "admin") if page in ADMIN_PAGES else (member, "user")
+        scenarios.append((page, page, login(user, role)))
+    if discussion:
+        scenarios.append(("pages/discussions.py", "discussions (open thread)",
+                          dict(login(member, "user"), show_comments=discussion[0])))
+    if event:
+        scenarios.append(("pages/events.py", "events (event details)",
+                          dict(login(member, "user"), view_event_details=event[0])))
+    if partner:
+        scenarios.append(("pages/messages.py", "messages (conversation)",
+                          dict(login(member, "user"), selected_conversation=partner[0])))
+    return scenarios
+
+
+def measure(args):
+    """Render each scenario `iterations` times in this process; returns {name: (latencies, errors, seconds)}."""
+    workdir, scenarios, iterations, warmup = args
+    os.chdir(workdir)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    for page, name, state in scenarios:
+        at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=120)
+        for key, value in state.items():
+            at.session_state[key] = value
+        for _ in range(warmup):
+            at.run()
+        latencies = []
+        errors = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            render_started = time.perf_counter()
+            at.run()
+            latencies.append(time.perf_counter() - render_started)
+            errors.extend(e.message for e in at.exception)
+        results[name] = (latencies, errors, time.perf_counter() - started)
+    return results
+
+
+def compare(report, baseline, tolerance, floor_ms):
+    """Scenarios whose p95 regressed by more than `tolerance` (and floor_ms) against the baseline."""
+    regressions = []
+    for name, stats in report["pages"].items():
+        before = baseline.get("pages", {}).get(name)
+        if not before:
+            continue
+        limit = max(before["p95_ms"] * (1 + tolerance), before["p95_ms"] + floor_ms)
+        if stats["p95_ms"] > limit:
+            regressions.append((name, before["p95_ms"], stats["p95_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-page render latency and throughput benchmark")
+    parser.add_argument("--db", help="Benchmark a copy of this database instead of seeding one")
+    parser.add_argument("--users", type=int, default=2000, help="Members to seed when --db isn't given")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=20, help="Timed renders per page")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed renders per page first")
+    parser.add_argument("--processes", type=int, default=1, help="Benchmark processes sharing the database")
+    parser.add_argument("--interactions-per-minute", type=float, default=6,
+                        help="Assumed interactions per active member, for the capacity estimate")
+    parser.add_argument("--json", help="Write the report here")
+    parser.add_argument("--baseline", help="Earlier --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 regression (fraction)")
+    parser.add_argument("--floor-ms", type=float, default=5.0, help="Ignore p95 regressions smaller than this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="page_latency_")
+    db_path = os.path.join(workdir, "community.db")
+    # Set before any app module is imported, here or in the worker processes
+    os.environ["COMMUNITY_DB"] = db_path
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["MAINTENANCE_SCHEDULER"] = "0"
+    sys.path.insert(0, ROOT)
+
+    if args.db:
+        shutil.copy(args.db, db_path)
+        print(f"database: copy of {args.db}")
+    else:
+        from seed_data import seed_database
+        started = time.perf_counter()
+        inserted = seed_database(db_path, users=args.users, seed=args.seed)
+        print(f"database: seeded {sum(inserted.values()):,} rows for {args.users:,} members "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    scenarios = pick_sessions(db_path)
+    jobs = [(workdir, scenarios, args.iterations, args.warmup)] * args.processes
+    started = time.perf_counter()
+    if args.processes == 1:
+        runs = [measure(jobs[0])]
+    else:
+        with Pool(args.processes) as pool:
+            runs = pool.map(measure, jobs)
+    wall = time.perf_counter() - started
+
+    report = {"meta": {"users": args.users if not args.db else None, "db": args.db,
+                       "iterations": args.iterations, "processes": args.processes},
+              "pages": {}}
+    print(f"\n{'page':<32}{'renders':>8}{'errors':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'renders/s':>11}")
+    for _, name, _ in scenarios:
+        latencies = [t * 1000 for run in runs for t in run[name][0]]
+        errors = [e for run in runs for e in run[name][1]]
+        # Per-process rate, summed: the processes ran side by side
+        rate = sum(len(run[name][0]) / run[name][2] for run in runs)
+        stats = {"renders": len(latencies), "errors": len(errors), "p50_ms": percentile(latencies, 50),
+                 "p95_ms": percentile(latencies, 95), "p99_ms": percentile(latencies, 99),
+                 "max_ms": max(latencies), "renders_per_s": rate}
+        report["pages"][name] = stats
+        print(f"{name:<32}{stats['renders']:>8}{stats['errors']:>7}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}"
+              f"{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}{rate:>11.1f}")
+        if errors:
+            print(f"    first error: {errors[0]}")
+
+    total = sum(s["renders"] for s in report["pages"].values())
+    overall = total / wall
+    members = overall * 60 / args.interactions_per_minute
+    report["meta"].update(total_renders=total, wall_seconds=wall, renders_per_s=overall)
+    print(f"\n{total} renders in {wall:.1f}s: {overall:.1f} renders/s across {args.processes} process(es), "
+          f"about {members:.0f} concurrently active members at {args.interactions_per_minute:g} "
+          f"interactions/min each")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = any(s["errors"] for s in report["pages"].values())
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.floor_ms)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: p95 {before:.1f} ms -> {after:.1f} ms")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
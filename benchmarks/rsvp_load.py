@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Load test for the RSVP service: hundreds of members RSVP to one popular
+event at the same moment, then a share of them change their minds.
+
+Runs against a throwaway database and checks that the event is never
+overbooked, that the waitlist is promoted in order, and that the
+event_stats counters match the rsvps table.
+
+    python benchmarks/rsvp_load.py --users 500 --capacity 100
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_wave(set_rsvp, event_id, requests, workers):
+    """Fire all requests at once (released by a barrier) and time each call."""
+    barrier = threading.Barrier(min(workers, len(requests)))
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(item):
+        user_id, status = item
+        try:
+            barrier.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        started = time.perf_counter()
+        try:
+            set_rsvp(event_id, user_id, status)
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(worker, requests))
+    return time.perf_counter() - started, latencies, errors
+
+
+def check_invariants(db_path, event_id, capacity):
+    conn = sqlite3.connect(db_path)
+    counts = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM rsvps WHERE event_id = ? GROUP BY status", (event_id,)
+    ).fetchall())
+    stats = conn.execute(
+        "SELECT attending, maybe, not_attending, waitlisted FROM event_stats WHERE event_id = ?",
+        (event_id,)
+    ).fetchone()
+    duplicates = conn.execute(
+        "SELECT COUNT(*) FROM (SELECT user_id FROM rsvps WHERE event_id = ? GROUP BY user_id HAVING COUNT(*) > 1)",
+        (event_id,)
+    ).fetchone()[0]
+    conn.close()
+
+    expected = (counts.get('attending', 0), counts.get('maybe', 0),
+                counts.get('not_attending', 0), counts.get('waitlisted', 0))
+    problems = []
+    if tuple(stats) != expected:
+        problems.append(f"event_stats {tuple(stats)} != recount {expected}")
+    if expected[0] > capacity:
+        problems.append(f"overbooked: {expected[0]} attending for {capacity} seats")
+    if expected[3] and expected[0] < capacity:
+        problems.append(f"{expected[3]} waitlisted while {capacity - expected[0]} seats are open")
+    if duplicates:
+        problems.append(f"{duplicates} users have more than one RSVP row")
+    return expected, problems
+
+
+def report(label, elapsed, latencies, errors):
+    print(f"{label}: {len(latencies)} ok, {len(errors)} errors in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f} RSVPs/s) | "
+          f"p50 {percentile(latencies, 50) * 1000:.1f}ms "
+          f"p95 {percentile(latencies, 95) * 1000:.1f}ms "
+          f"p99 {percentile(latencies, 99) * 1000:.1f}ms")
+    for error in errors[:5]:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent RSVP load test")
+    parser.add_argument("--users", type=int, default=400, help="Members RSVPing at once")
+    parser.add_argument("--capacity", type=int, default=100, help="Seats at the popular event")
+    parser.add_argument("--workers", type=int, default=200, help="Concurrent threads")
+    parser.add_argument("--change-share", type=float, default=0.3,
+                        help="Share of members who change their RSVP in the second wave")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rsvp_load_")
+    db_path = os.path.join(workdir, "community.db")
+    os.environ["COMMUNITY_DB"] = db_path
+    sys.path.insert(0, ROOT)
+
+    from utils.database import initialize_database
+    from utils.rsvp import set_rsvp
+
+    initialize_database()
+    conn = sqlite3.connect(db_path)
+    now = time.strftime('%Y-%m-%d %H:%M:%S')
+    conn.executemany(
+        "INSERT INTO users (username, email, password, salt, role, created_at) VALUES (?, ?, 'x', 'x', 'user', ?)",
+        [(f"member{i}", f"member{i}@example.com", now) for i in range(args.users)]
+    )
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE username LIKE 'member%'")]
+    cursor = conn.execute(
+        "INSERT INTO events (user_id, title, description, event_date, event_time, location, capacity, created_at) "
+        "VALUES (?, 'Popular meetup', 'Load test', date('now', '+7 days'), '18:00:00', 'Main hall', ?, ?)",
+        (user_ids[0], args.capacity, now)
+    )
+    event_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    rng = random.Random(args.seed)
+    failed = False
+
+    # Wave 1: everyone tries to grab a seat at once
+    elapsed, latencies, errors = run_wave(set_rsvp, event_id, [(u, 'attending') for u in user_ids], args.workers)
+    report("wave 1 (all attend)", elapsed, latencies, errors)
+    counts, problems = check_invariants(db_path, event_id, args.capacity)
+    print(f"  attending={counts[0]} maybe={counts[1]} not_attending={counts[2]} waitlisted={counts[3]}")
+    expected_attending = min(args.capacity, args.users)
+    if counts[0] != expected_attending:
+        problems.append(f"expected {expected_attending} attending, found {counts[0]}")
+    failed |= bool(problems or errors)
+    for problem in problems:
+        print(f"  FAIL: {problem}")
+
+    # Wave 2: a share of members change their minds, freeing seats for the waitlist
+    changers = rng.sample(user_ids, int(len(user_ids) * args.change_share))
+    requests = [(u, rng.choice(['maybe', 'not_attending', 'attending'])) for u in changers]
+    elapsed, latencies, errors = run_wave(set_rsvp, event_id, requests, args.workers)
+    report("wave 2 (changes)", elapsed, latencies, errors)
+    counts, problems = check_invariants(db_path, event_id, args.capacity)
+    print(f"  attending={counts[0]} maybe={counts[1]} not_attending={counts[2]} waitlisted={counts[3]}")
+    failed |= bool(problems or errors)
+    for problem in problems:
+        print(f"  FAIL: {problem}")
+
+    print("RESULT:", "FAIL" if failed else "PASS")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
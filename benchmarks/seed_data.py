@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Seed a community database with synthetic members and content for
+benchmarks.
+
+Creates the schema with initialize_database(), then fills all nine content
+tables (users, profiles, discussions, comments, messages, events, RSVPs,
+resources, announcements) with data shaped like a real community:
+
+- activity per member follows a power law: a few members write most of the
+  discussions, comments and messages, most members barely post
+- a few discussions and events attract most of the comments and RSVPs;
+  comments nest as replies to recent comments in their thread
+- messages come in threads between pairs of members, in bursts of quick
+  replies separated by days of silence
+- events are spread over the past `days` and the next 90 days, mostly on
+  weekday evenings and weekends, with some weekly and monthly series
+
+Ids increase with created_at, as they do in the live app. The output is
+identical for the same --seed and --anchor. All members share the password
+BENCHMARK_PASSWORD.
+
+The load runs in one transaction with executemany, after dropping the
+secondary indexes and triggers; they are recreated afterwards and the
+derived tables (user_stats, event_stats, event_occurrences) and the
+comment counters rebuilt in one pass each; discussions' hot scores are
+computed as of the anchor. If the seeder dies halfway, the next initialize_database()
+recreates any missing index or trigger.
+
+    python benchmarks/seed_data.py --db /tmp/bench.db --rows 1000000
+    python benchmarks/seed_data.py --db /tmp/bench.db --users 5000 --seed 7
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+CATEGORIES = ["General", "Questions", "Announcements", "Events", "Resources"]
+RESOURCE_TYPES = ["Link", "Note"]
+RSVP_STATUSES = ["attending", "maybe", "not_attending"]
+RSVP_WEIGHTS = [6, 3, 1]
+LOCATIONS = ["Main Hall", "Room 101", "Online", "Cafe Corner", "Library", "Rooftop"]
+WORDS = ("community meetup python data design review help project idea weekly talk workshop "
+         "question answer release plan team learning open source notes slides recording "
+         "thanks great agree build test deploy feedback welcome update schedule venue "
+         "beginner advanced tutorial library framework bug fix feature docs share").split()
+
+# Average rows per member for each table
+DEFAULT_SCALE = {
+    "discussions": 2.0,
+    "comments": 20.0,
+    "messages": 40.0,
+    "events": 0.2,
+    "rsvps": 10.0,
+    "resources": 1.0,
+    "announcements": 0.002,
+}
+
+# Exponent of the activity power law; higher means more skewed
+ACTIVITY_SKEW = 0.8
+
+# Share of events that repeat weekly or monthly
+RECURRING_SHARE = 0.05
+
+# Share of comments that reply to one of the recent comments in their thread
+REPLY_SHARE = 0.4
+RECENT_COMMENTS = 20
+
+UPCOMING_DAYS = 90
+BATCH_SIZE = 50000
+
+
+def _fmt(seconds):
+    """Format seconds since the epoch as the app's naive timestamp text."""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(seconds))
+
+
+def _cumulative_power_law(rng, count, skew=ACTIVITY_SKEW):
+    """Cumulative Zipf weights over `count` items in random order, for rng.choices."""
+    weights = [1 / rank ** skew for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+def _text_pool(rng, size, min_words, max_words):
+    """Pre-built texts to draw from; generating text per row dominates otherwise."""
+    return [" ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words))).capitalize()
+            for _ in range(size)]
+
+
+def _defer_indexes_and_triggers(conn):
+    """Drop secondary indexes and triggers; returns their SQL for _restore."""
+    deferred = conn.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+        ORDER BY type
+    """).fetchall()
+    for kind, name, _ in deferred:
+        conn.execute(f"DROP {kind.upper()} {name}")
+    return deferred
+
+
+def _restore_indexes_and_triggers(conn, deferred):
+    for _, _, sql in deferred:
+        conn.execute(sql)
+
+
+def _insert(conn, sql, rows):
+    """executemany in fixed-size batches, so huge generators don't build one giant list."""
+    rows = iter(rows)
+    total = 0
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            return total
+        conn.executemany(sql, batch)
+        total += len(batch)
+
+
+def _thread_comments(rng, first_id, comments, commenters):
+    """
+    (id, discussion_id, user_id, created_at, parent_id, path) per comment.
+    Some reply to a recent comment in their thread, nesting up to the
+    app's depth limit.
+    """
+    from utils.database import COMMENT_MAX_DEPTH, COMMENT_PATH_DIGITS
+    recent = {}
+    for comment_id, ((at, discussion_id), user_id) in enumerate(zip(comments, commenters), first_id):
+        thread = recent.setdefault(discussion_id, [])
+        parent_id, path = None, f"{comment_id:0{COMMENT_PATH_DIGITS}d}"
+        if thread and rng.random() < REPLY_SHARE:
+            parent_id, parent_path = rng.choice(thread)
+            if parent_path.count(".") >= COMMENT_MAX_DEPTH - 1:
+                parent_path = parent_path.rsplit(".", 1)[0]
+                parent_id = int(parent_path.rsplit(".", 1)[-1])
+            path = f"{parent_path}.{path}"
+        thread.append((comment_id, path))
+        if len(thread) > RECENT_COMMENTS:
+            del thread[0]
+        yield comment_id, discussion_id, user_id, _fmt(at), parent_id, path
+
+
+def _generate_messages(rng, count, user_ids, activity, start, end):
+    """Bursty threads between pairs of members, in chronological order."""
+    messages = []
+    while len(messages) < count:
+        a, b = rng.choices(user_ids, cum_weights=activity, k=2)
+        if a == b:
+            continue
+        for _ in range(1 + int(rng.expovariate(1 / 2))):
+            at = rng.uniform(start, end)
+            sender, receiver = (a, b) if rng.random() < 0.5 else (b, a)
+            for _ in range(1 + int(rng.paretovariate(1.5))):
+                if at >= end:
+                    break
+                messages.append((at, sender, receiver))
+                at += rng.expovariate(1 / 90)
+                if rng.random() < 0.7:
+                    sender, receiver = receiver, sender
+    messages = sorted(messages[:count])
+    return messages
+
+
+def _event_date(rng, start_day, end_day):
+    """A date in [start_day, end_day], weighted towards Tue-Thu and the weekend."""
+    while True:
+        day = start_day + timedelta(days=rng.randint(0, (end_day - start_day).days))
+        if rng.random() < (0.3, 0.8, 0.8, 0.8, 0.5, 1.0, 0.7)[day.weekday()]:
+            return day
+
+
+def seed_database(db_path, users=1000, scale=None, seed=42, days=365, anchor=None, progress=print):
+    """
+    Fill db_path (created if missing) with synthetic data. `scale` overrides
+    entries of DEFAULT_SCALE; `anchor` (a date, default today) is "now" for
+    the generated timestamps. Returns {table: rows inserted}.
+    """
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import utils.database
+    from utils.auth import hash_password
+    from utils.recurrence import materialize_occurrences
+    from utils.trending import recompute_hot_scores
+
+    utils.database.DB_PATH = db_path
+    utils.database.initialize_database()
+    ratios = dict(DEFAULT_SCALE, **(scale or {}))
+    counts = {table: max(1, int(users * ratio)) for table, ratio in ratios.items()}
+    rng = random.Random(seed)
+    anchor = anchor or date.today()
+    end = (datetime.combine(anchor, datetime.min.time()) - datetime(1970, 1, 1)).total_seconds()
+    start = end - days * 86400
+    password_hash, salt = hash_password(BENCHMARK_PASSWORD, salt=f"{rng.getrandbits(128):032x}")
+    inserted = {}
+    phase_started = time.perf_counter()
+
+    def done(phase):
+        nonlocal phase_started
+        if progress:
+            progress(f"  {phase}: {time.perf_counter() - phase_started:.1f}s")
+        phase_started = time.perf_counter()
+
+    # Its own connection, not a pooled one: the bulk-load pragmas below must not
+    # outlive the seed, and leaving WAL mode needs the only open connection
+    utils.database.close_pool()
+    conn = sqlite3.connect(db_path)
+    conn.isolation_level = None
+    # Bulk-load settings: the file is rebuilt from scratch if the seed fails
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("BEGIN")
+    deferred = _defer_indexes_and_triggers(conn)
+
+    # Members, created over the first two thirds of the period
+    first_user = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM users").fetchone()[0]
+    joined = sorted(rng.uniform(start - days * 43200, end - days * 28800) for _ in range(users))
+    user_ids = range(first_user, first_user + users)
+    inserted["users"] = _insert(conn, """
+        INSERT INTO users (id, username, email, password, salt, role, created_at, last_login)
+        VALUES (?, ?, ?, ?, ?, 'user', ?, ?)
+    """, ((uid, f"member{uid}", f"member{uid}@example.com", password_hash, salt, _fmt(at),
+           _fmt(rng.uniform(max(at, end - 30 * 86400), end)))
+          for uid, at in zip(user_ids, joined)))
+    bios = _text_pool(rng, 2000, 5, 25)
+    inserted["profiles"] = _insert(conn, "INSERT INTO profiles (user_id, bio, interests) VALUES (?, ?, ?)",
+                                   ((uid, rng.choice(bios), ", ".join(rng.sample(WORDS, 3))) for uid in user_ids))
+    activity = _cumulative_power_law(rng, users)
+    done("users and profiles")
+
+    # Discussions by power-law authors; a few threads get most of the comments
+    titles = _text_pool(rng, 5000, 3, 9)
+    bodies = _text_pool(rng, 5000, 20, 120)
+    discussion_times = sorted(rng.uniform(start, end) for _ in range(counts["discussions"]))
+    authors = rng.choices(user_ids, cum_weights=activity, k=counts["discussions"])
+    first_discussion = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM discussions").fetchone()[0]
+    inserted["discussions"] = _insert(conn, """
+        INSERT INTO discussions (id, user_id, title, content, category, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, ((first_discussion + i, author, rng.choice(titles), rng.choice(bodies), rng.choice(CATEGORIES),
+           _fmt(at), _fmt(at)) for i, (author, at) in enumerate(zip(authors, discussion_times))))
+    done("discussions")
+
+    # Comments follow their discussion, most within the first days; some are replies
+    replies = _text_pool(rng, 10000, 3, 40)
+    popularity = _cumulative_power_law(rng, counts["discussions"])
+    threads = rng.choices(range(counts["discussions"]), cum_weights=popularity, k=counts["comments"])
+    comments = sorted(
+        (min(discussion_times[t] + rng.expovariate(1 / 86400), end), first_discussion + t)
+        for t in threads
+    )
+    commenters = rng.choices(user_ids, cum_weights=activity, k=len(comments))
+    first_comment = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM comments").fetchone()[0]
+    inserted["comments"] = _insert(conn, """
+        INSERT INTO comments (id, discussion_id, user_id, created_at, parent_id, path, content)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (row + (rng.choice(replies),) for row in _thread_comments(rng, first_comment, comments, commenters)))
+    del comments, commenters, threads
+    done("comments")
+
+    notes = _text_pool(rng, 10000, 1, 30)
+    messages = _generate_messages(rng, counts["messages"], user_ids, activity, start, end)
+    recent = end - 2 * 86400
+    inserted["messages"] = _insert(conn, """
+        INSERT INTO messages (sender_id, receiver_id, content, is_read, created_at) VALUES (?, ?, ?, ?, ?)
+    """, ((sender, receiver, rng.choice(notes), rng.random() < (0.5 if at > recent else 0.97), _fmt(at))
+          for at, sender, receiver in messages))
+    del messages
+    done("messages")
+
+    # Events over the past period and the coming months
+    first_event = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM events").fetchone()[0]
+    start_day, end_day = anchor - timedelta(days=days), anchor + timedelta(days=UPCOMING_DAYS)
+    events = []
+    for i, host in enumerate(rng.choices(user_ids, cum_weights=activity, k=counts["events"])):
+        day = _event_date(rng, start_day, end_day)
+        rule = None
+        if rng.random() < RECURRING_SHARE:
+            rule = rng.choice(["weekly", "weekly", "monthly"])
+        hour = rng.choice([10, 14, 18, 18, 19, 19, 20]) if day.weekday() < 5 else rng.choice([10, 11, 14, 15])
+        created = min(end, (datetime.combine(day, datetime.min.time()) - datetime(1970, 1, 1)).total_seconds()
+                      - rng.uniform(86400, 30 * 86400))
+        events.append((first_event + i, host, rng.choice(titles), rng.choice(bodies), day.isoformat(),
+                       f"{hour:02d}:{rng.choice(['00', '30'])}:00", rng.choice(LOCATIONS), _fmt(created),
+                       rng.choice([None, None, 20, 50, 100, 300]), rule,
+                       (day + timedelta(days=rng.choice([60, 120, 365]))).isoformat() if rule else None))
+    inserted["events"] = _insert(conn, """
+        INSERT INTO events (id, user_id, title, description, event_date, event_time, location, created_at,
+                            capacity, recurrence_rule, recurrence_until)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, events)
+    done("events")
+
+    # RSVPs: popular events draw most; attendance past capacity is waitlisted
+    event_popularity = _cumulative_power_law(rng, len(events))
+    pairs = set()
+    attempts = 0
+    while len(pairs) < counts["rsvps"] and attempts < counts["rsvps"] * 3:
+        batch = zip(rng.choices(range(len(events)), cum_weights=event_popularity, k=counts["rsvps"]),
+                    rng.choices(user_ids, cum_weights=activity, k=counts["rsvps"]))
+        for pair in batch:
+            pairs.add(pair)
+            if len(pairs) >= counts["rsvps"]:
+                break
+        attempts += counts["rsvps"]
+    attending = [0] * len(events)
+    rsvps = []
+    for index, user_id in sorted(pairs):
+        event = events[index]
+        status = rng.choices(RSVP_STATUSES, weights=RSVP_WEIGHTS)[0]
+        if status == "attending":
+            if event[8] is not None and attending[index] >= event[8]:
+                status = "waitlisted"
+            else:
+                attending[index] += 1
+        rsvps.append((event[0], user_id, status, event[7]))
+    inserted["rsvps"] = _insert(conn, "INSERT INTO rsvps (event_id, user_id, status, created_at) VALUES (?, ?, ?, ?)",
+                                rsvps)
+    del rsvps, pairs, events
+    done("rsvps")
+
+    resource_times = sorted(rng.uniform(start, end) for _ in range(counts["resources"]))
+    inserted["resources"] = _insert(conn, """
+        INSERT INTO resources (user_id, title, description, resource_type, url, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, ((user_id, rng.choice(titles), rng.choice(bodies), kind,
+           f"https://example.com/{rng.choice(WORDS)}/{i}" if kind == "Link" else None, _fmt(at))
+          for i, (user_id, kind, at) in enumerate(zip(
+              rng.choices(user_ids, cum_weights=activity, k=counts["resources"]),
+              rng.choices(RESOURCE_TYPES, k=counts["resources"]), resource_times))))
+
+    admin_id = conn.execute("SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1").fetchone()
+    inserted["announcements"] = _insert(conn, """
+        INSERT INTO announcements (user_id, title, content, created_at) VALUES (?, ?, ?, ?)
+    """, ((admin_id[0] if admin_id else first_user, rng.choice(titles), rng.choice(bodies), _fmt(at))
+          for at in sorted(rng.uniform(start, end) for _ in range(counts["announcements"]))))
+    done("resources and announcements")
+
+    _restore_indexes_and_triggers(conn, deferred)
+    done("indexes and triggers")
+    cursor = conn.cursor()
+    utils.database.rebuild_user_stats(cursor)
+    utils.database.rebuild_event_stats(cursor)
+    utils.database.rebuild_comment_replies(cursor)
+    utils.database.rebuild_discussion_comments(cursor)
+    conn.execute("""
+        INSERT OR IGNORE INTO event_occurrences (event_id, occurrence_date)
+        SELECT id, event_date FROM events WHERE recurrence_rule IS NULL
+    """)
+    conn.execute("UPDATE data_versions SET version = version + 1")
+    conn.execute("COMMIT")
+    done("derived counters")
+
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("ANALYZE")
+    conn.close()
+    materialize_occurrences(anchor + timedelta(days=UPCOMING_DAYS))
+    recompute_hot_scores(now=datetime.combine(anchor, datetime.min.time()))
+    done("analyze, recurring occurrences and hot scores")
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a community database with synthetic data")
+    parser.add_argument("--db", required=True, help="Database to create or extend")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--users", type=int, help="Members to create (default 1000)")
+    size.add_argument("--rows", type=int, help="Approximate total rows; sets --users from the per-member ratios")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=None,
+                        help="Date treated as today (YYYY-MM-DD); fix it for byte-identical reruns")
+    parser.add_argument("--days", type=int, default=365, help="How far back activity goes")
+    for table, ratio in DEFAULT_SCALE.items():
+        parser.add_argument(f"--{table}-per-user", type=float, default=ratio, dest=table)
+    args = parser.parse_args()
+
+    scale = {table: getattr(args, table) for table in DEFAULT_SCALE}
+    users = args.users or 1000
+    if args.rows:
+        users = max(1, int(args.rows / (2 + sum(scale.values()))))
+
+    started = time.perf_counter()
+    inserted = seed_database(os.path.abspath(args.db), users=users, scale=scale, seed=args.seed,
+                             days=args.days, anchor=args.anchor)
+    elapsed = time.perf_counter() - started
+    total = sum(inserted.values())
+    for table, rows in inserted.items():
+        print(f"{table:>14}: {rows:,}")
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import argparse
+import sqlite3
+import sys
+
+from utils.export import export_snapshot, EXPORT_TABLES
+
+# Command-line entry point for exporting columnar snapshots of community.db
+# so heavy analysis runs against the exported files, not the live database.
+
+def main():
+    parser = argparse.ArgumentParser(description="Export community.db tables and rollups to Parquet/Arrow files.")
+    parser.add_argument("--db", default="community.db", help="Path to the SQLite database")
+    parser.add_argument("--out", default="exports", help="Output directory")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet",
+                        help="Columnar file format (Parquet or Arrow IPC)")
+    parser.add_argument("--chunk-rows", type=int, default=50000,
+                        help="Maximum number of rows held in memory per chunk")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore watermarks and export every row")
+    parser.add_argument("--tables", nargs="+", choices=EXPORT_TABLES,
+                        help="Only export these tables")
+    parser.add_argument("--no-rollups", action="store_true", help="Skip the analytics rollups")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="Read the database directly instead of a private backup copy")
+    args = parser.parse_args()
+
+    try:
+        results = export_snapshot(
+            db_path=args.db,
+            out_dir=args.out,
+            file_format=args.format,
+            chunk_rows=args.chunk_rows,
+            incremental=not args.full,
+            tables=args.tables,
+            include_rollups=not args.no_rollups,
+            use_snapshot=not args.no_snapshot,
+        )
+    except (RuntimeError, OSError, sqlite3.Error) as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Export complete: {sum(results.values())} rows written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,551 @@
 #!/usr/bin/env python3
+"""
+Entry point for deployment services.
+
+    python launch.py                  # one Streamlit process, as before
+    python launch.py --workers 4      # four workers behind a sticky proxy
+
+With --workers, N Streamlit processes run on private ports and a small
+reverse proxy on --port spreads browser sessions over them. A Streamlit
+session lives in one process's memory, so the proxy pins each browser to
+its worker with a cookie; the websocket and HTTP requests such as uploads
+and media files all reach the same process. All workers share the WAL-mode
+community.db.
+
+The proxy health-checks each worker and replaces any that exit or stop
+answering. `kill -HUP <launcher pid>` replaces the workers one at a time:
+a fresh worker starts and must pass its health check before it takes new
+sessions, while the old one keeps serving its open connections for
+--drain-seconds. The launcher's state is at /_launcher/status (loopback
+clients only).
+
+Each Streamlit process warms itself up before it opens its port (see
+utils/warmup.py): page modules imported, connection pool filled, the hot
+queries and the Home dashboard cache run once. Health checks, and so
+routing, only reach a worker after that; --no-warmup skips it.
+"""
+import argparse
+import asyncio
+import json
 import os
+import secrets
+import signal
 import subprocess
 import sys
+import time
 
-# This file serves as an entry point for deployment services
-# It ensures the app is launched with the correct parameters
+ROOT = os.path.dirname(os.path.abspath(__file__))
 
-def main():
+STICKY_COOKIE = "hub_worker"
+HEALTH_PATH = "/_stcore/health"
+STATUS_PATH = "/_launcher/status"
+
+# Stylesheet bundles are content-hashed (utils/stylesheet.py), so their URLs
+# can be cached forever; Streamlit's static route sends no Cache-Control
+IMMUTABLE_PREFIX = "/app/static/css/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+HEAD_LIMIT = 65536
+COPY_CHUNK = 65536
+STARTUP_TIMEOUT = 90
+HEALTH_TIMEOUT = 5
+SHUTDOWN_TIMEOUT = 10
+
+# Hop-by-hop headers, which apply to one connection and are not forwarded
+HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "te", "trailer", "upgrade", "expect"}
+
+
+def _log(message):
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} launcher: {message}", file=sys.stderr, flush=True)
+
+
+def serve(streamlit_args, warm=True):
+    """
+    Run Streamlit in this process after warming it up (utils/warmup.py).
+    The server only opens its port, and so only answers health checks,
+    once warm-up has finished.
+    """
+    if warm:
+        from utils.warmup import warm_up
+        warm_up(log=_log)
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", "app.py", *streamlit_args]
+    sys.exit(cli.main())
+
+
+def run_single(warm=True):
+    if warm:
+        serve([])
     # Run Streamlit with the correct app file
     subprocess.run(["streamlit", "run", "app.py"])
 
+
+class Worker:
+    """One Streamlit process on a private port."""
+
+    def __init__(self, worker_id, slot, port, metrics_port):
+        self.id = worker_id
+        self.slot = slot
+        self.port = port
+        self.metrics_port = metrics_port
+        self.process = None
+        self.state = "starting"
+        self.connections = 0
+        self.assigned = 0
+        self.failures = 0
+        self.started_at = time.time()
+
+    def alive(self):
+        return self.process is not None and self.process.returncode is None
+
+    def status(self):
+        return {"id": self.id, "slot": self.slot, "port": self.port, "metrics_port": self.metrics_port,
+                "pid": self.process.pid if self.process else None, "state": self.state,
+                "connections": self.connections, "assigned": self.assigned, "failures": self.failures,
+                "uptime_seconds": round(time.time() - self.started_at)}
+
+
+class Launcher:
+    def __init__(self, args):
+        self.args = args
+        self.workers = {}
+        self.slots = [None] * args.workers
+        self.restarts = [0] * args.workers
+        self.next_id = 1
+        # Held while a slot's worker is being replaced, by the monitor or a rolling restart
+        self.replace_lock = asyncio.Lock()
+        self.stopping = asyncio.Event()
+        # Shared so XSRF cookies signed by one worker stay valid on another
+        self.cookie_secret = os.environ.get("STREAMLIT_SERVER_COOKIE_SECRET") or secrets.token_hex(32)
+        metrics_port = int(os.environ.get("METRICS_PORT", "9464"))
+        self.metrics_base = metrics_port if metrics_port else None
+
+    # --- workers ---------------------------------------------------------
+
+    def _free_port(self, base, attribute):
+        used = {getattr(w, attribute) for w in self.workers.values()}
+        port = base
+        while port in used:
+            port += 1
+        return port
+
+    async def _spawn(self, slot):
+        worker = Worker(self.next_id, slot, self._free_port(self.args.worker_base_port, "port"),
+                        self._free_port(self.metrics_base, "metrics_port") if self.metrics_base else None)
+        self.next_id += 1
+        self.workers[worker.id] = worker
+        env = dict(os.environ, STREAMLIT_SERVER_COOKIE_SECRET=self.cookie_secret,
+                   METRICS_PORT=str(worker.metrics_port or 0))
+        if slot != 0:
+            # Background maintenance runs in the first worker only
+            env["MAINTENANCE_SCHEDULER"] = "0"
+        command = [sys.executable, os.path.join(ROOT, "launch.py")]
+        if not self.args.warmup:
+            command.append("--no-warmup")
+        worker.process = await asyncio.create_subprocess_exec(
+            *command, "--worker",
+            "--server.port", str(worker.port), "--server.address", "127.0.0.1", "--server.headless", "true",
+            cwd=ROOT, env=env)
+        _log(f"worker {worker.id} (slot {slot}) starting on port {worker.port}, pid {worker.process.pid}")
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline and worker.alive():
+            if await self._healthy(worker):
+                worker.state = "serving"
+                _log(f"worker {worker.id} healthy")
+                return worker
+            await asyncio.sleep(0.5)
+        _log(f"worker {worker.id} failed to start")
+        await self._stop(worker)
+        return None
+
+    async def _healthy(self, worker):
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", worker.port),
+                                                    HEALTH_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        try:
+            writer.write(f"GET {HEALTH_PATH} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), HEALTH_TIMEOUT)
+            return status_line.split(b" ")[1:2] == [b"200"]
+        except (OSError, asyncio.TimeoutError):
+            return False
+        finally:
+            writer.close()
+
+    async def _stop(self, worker):
+        worker.state = "stopped"
+        if worker.alive():
+            worker.process.terminate()
+            try:
+                await asyncio.wait_for(worker.process.wait(), SHUTDOWN_TIMEOUT)
+            except asyncio.TimeoutError:
+                worker.process.kill()
+                await worker.process.wait()
+        self.workers.pop(worker.id, None)
+        _log(f"worker {worker.id} stopped")
+
+    async def _drain(self, worker):
+        """Let a replaced worker finish its open connections, then stop it."""
+        worker.state = "draining"
+        deadline = time.monotonic() + self.args.drain_seconds
+        while worker.connections and time.monotonic() < deadline and worker.alive():
+            await asyncio.sleep(0.5)
+        await self._stop(worker)
+
+    async def replace(self, slot, old, reason):
+        """
+        Start a new worker for a slot and retire `old` once the new one is
+        healthy. Does nothing if the slot no longer holds `old`.
+        """
+        async with self.replace_lock:
+            if self.stopping.is_set() or self.slots[slot] is not old:
+                return False
+            _log(f"replacing slot {slot}: {reason}")
+            new = await self._spawn(slot)
+            if new is None:
+                return False
+            self.slots[slot] = new
+            self.restarts[slot] += 1
+        if old is not None:
+            if old.alive():
+                asyncio.create_task(self._drain(old))
+            else:
+                await self._stop(old)
+        return True
+
+    async def rolling_restart(self):
+        _log("rolling restart")
+        for slot in range(len(self.slots)):
+            await self.replace(slot, self.slots[slot], "rolling restart")
+
+    async def monitor(self):
+        while not self.stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.args.health_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            for slot, worker in enumerate(self.slots):
+                if worker is None:
+                    await self.replace(slot, worker, "no worker")
+                elif not worker.alive():
+                    await self.replace(slot, worker, f"worker {worker.id} exited with {worker.process.returncode}")
+                elif await self._healthy(worker):
+                    worker.failures = 0
+                else:
+                    worker.failures += 1
+                    if worker.failures >= self.args.health_failures:
+                        await self.replace(slot, worker, f"worker {worker.id} failed {worker.failures} health checks")
+
+    def route(self, cookie_id):
+        """
+        The worker pinned by the cookie if it's still up, else the serving
+        worker with the fewest open connections (then fewest sessions assigned).
+        """
+        worker = self.workers.get(cookie_id)
+        if worker is not None and worker.state in ("serving", "draining") and worker.alive():
+            return worker, False
+        serving = [w for w in self.slots if w is not None and w.state == "serving" and w.alive()]
+        if not serving:
+            return None, False
+        worker = min(serving, key=lambda w: (w.connections, w.assigned))
+        worker.assigned += 1
+        return worker, True
+
+    def status(self):
+        return {"pid": os.getpid(), "port": self.args.port, "restarts": self.restarts,
+                "workers": [w.status() for w in sorted(self.workers.values(), key=lambda w: w.id)]}
+
+    # --- proxy -----------------------------------------------------------
+
+    async def handle(self, client_reader, client_writer):
+        worker = None
+        try:
+            while True:
+                head = await _read_head(client_reader)
+                if head is None:
+                    return
+                method, target, version, headers = _parse_request(head)
+                if target == STATUS_PATH:
+                    await self._send_status(client_writer)
+                    return
+                picked, assigned = self.route(_cookie(headers, STICKY_COOKIE))
+                if picked is None:
+                    await _send_simple(client_writer, 503, "No healthy workers")
+                    return
+                if picked is not worker:
+                    if worker is not None:
+                        worker.connections -= 1
+                    worker = picked
+                    worker.connections += 1
+                keep_open = await self._forward(client_reader, client_writer, worker, assigned,
+                                                method, target, version, headers)
+                if not keep_open:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            if worker is not None:
+                worker.connections -= 1
+            client_writer.close()
+
+    async def _forward(self, client_reader, client_writer, worker, assigned, method, target, version, headers):
+        """Proxy one request; returns whether the client connection can carry another."""
+        upgrade = _header(headers, "upgrade").lower() == "websocket"
+        peer = client_writer.get_extra_info("peername")
+        forwarded = [(k, v) for k, v in headers if k.lower() not in HOP_HEADERS]
+        forwarded.append(("X-Forwarded-For", peer[0] if peer else ""))
+        if upgrade:
+            forwarded += [("Connection", "Upgrade"), ("Upgrade", _header(headers, "upgrade"))]
+        else:
+            forwarded.append(("Connection", "close"))
+        if _header(headers, "expect").lower() == "100-continue":
+            client_writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+        upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", worker.port,
+                                                                         limit=HEAD_LIMIT)
+        try:
+            upstream_writer.write(_build_head(f"{method} {target} {version}", forwarded))
+            if not upgrade:
+                await _copy_body(client_reader, upstream_writer, headers)
+            await upstream_writer.drain()
+
+            response = await _read_head(upstream_reader)
+            if response is None:
+                await _send_simple(client_writer, 502, "Worker closed the connection")
+                return False
+            status_line, response_headers = _split_head(response)
+            status = int(status_line.split(" ")[1])
+            response_headers = [(k, v) for k, v in response_headers
+                                if k.lower() not in HOP_HEADERS or (upgrade and status == 101)]
+            if assigned:
+                response_headers.append(("Set-Cookie", f"{STICKY_COOKIE}={worker.id}; Path=/; HttpOnly; SameSite=Lax"))
+            if status == 200 and target.startswith(IMMUTABLE_PREFIX):
+                response_headers = [(k, v) for k, v in response_headers if k.lower() != "cache-control"]
+                response_headers.append(("Cache-Control", IMMUTABLE_CACHE_CONTROL))
+
+            if upgrade and status == 101:
+                client_writer.write(_build_head(status_line, response_headers))
+                await client_writer.drain()
+                await _pipe_both(client_reader, client_writer, upstream_reader, upstream_writer)
+                return False
+
+            framing = _response_framing(method, status, response_headers)
+            keep_open = framing != "close" and version == "HTTP/1.1" and \
+                _header(headers, "connection").lower() != "close"
+            if not keep_open:
+                response_headers.append(("Connection", "close"))
+            client_writer.write(_build_head(status_line, response_headers))
+            await _copy_response_body(upstream_reader, client_writer, framing)
+            await client_writer.drain()
+            return keep_open
+        finally:
+            upstream_writer.close()
+
+    async def _send_status(self, writer):
+        peer = writer.get_extra_info("peername")
+        if not peer or peer[0] not in ("127.0.0.1", "::1"):
+            await _send_simple(writer, 404, "Not found")
+            return
+        body = json.dumps(self.status(), indent=2).encode()
+        writer.write(_build_head("HTTP/1.1 200 OK", [("Content-Type", "application/json"),
+                                                     ("Content-Length", str(len(body))),
+                                                     ("Connection", "close")]) + body)
+        await writer.drain()
+
+    # --- lifecycle -------------------------------------------------------
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+        loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.create_task(self.rolling_restart()))
+
+        # Create or migrate the schema here once, not in every worker's warm-up at the same moment
+        from utils.database import close_pool, initialize_database
+        initialize_database()
+        close_pool()
+
+        started = await asyncio.gather(*(self._spawn(slot) for slot in range(len(self.slots))))
+        for slot, worker in enumerate(started):
+            self.slots[slot] = worker
+        if not any(started):
+            _log("no worker started; giving up")
+            return 1
+
+        server = await asyncio.start_server(self.handle, self.args.host, self.args.port, limit=HEAD_LIMIT)
+        _log(f"proxy listening on {self.args.host}:{self.args.port} with {len(self.slots)} workers "
+             f"(pid {os.getpid()}; SIGHUP for a rolling restart)")
+        monitor = asyncio.create_task(self.monitor())
+        await self.stopping.wait()
+
+        _log("shutting down")
+        server.close()
+        monitor.cancel()
+        await asyncio.gather(*(self._stop(w) for w in list(self.workers.values())))
+        return 0
+
+
+async def _read_head(reader):
+    """Read a request or response head; None on a clean EOF before any byte."""
+    try:
+        return await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise
+
+
+def _split_head(head):
+    lines = head.decode("latin-1").split("\r\n")
+    headers = []
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers.append((name.strip(), value.strip()))
+    return lines[0], headers
+
+
+def _parse_request(head):
+    request_line, headers = _split_head(head)
+    method, target, version = request_line.split(" ", 2)
+    return method, target, version, headers
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return ""
+
+
+def _cookie(headers, name):
+    """The integer value of a cookie, or None."""
+    for key, value in headers:
+        if key.lower() != "cookie":
+            continue
+        for part in value.split(";"):
+            cookie_name, _, cookie_value = part.strip().partition("=")
+            if cookie_name == name and cookie_value.isdigit():
+                return int(cookie_value)
+    return None
+
+
+def _build_head(first_line, headers):
+    return (first_line + "\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers) + "\r\n").encode("latin-1")
+
+
+async def _send_simple(writer, status, message):
+    body = message.encode()
+    reason = {404: "Not Found", 502: "Bad Gateway", 503: "Service Unavailable"}.get(status, "Error")
+    writer.write(_build_head(f"HTTP/1.1 {status} {reason}", [("Content-Type", "text/plain"),
+                                                               ("Content-Length", str(len(body))),
+                                                               ("Connection", "close")]) + body)
+    await writer.drain()
+
+
+async def _copy_exact(reader, writer, length):
+    while length > 0:
+        data = await reader.read(min(COPY_CHUNK, length))
+        if not data:
+            raise asyncio.IncompleteReadError(b"", length)
+        writer.write(data)
+        length -= len(data)
+        await writer.drain()
+
+
+async def _copy_chunked(reader, writer):
+    while True:
+        size_line = await reader.readuntil(b"\r\n")
+        writer.write(size_line)
+        size = int(size_line.split(b";", 1)[0], 16)
+        if size == 0:
+            # Optional trailers, then the blank line ending the message
+            while True:
+                line = await reader.readuntil(b"\r\n")
+                writer.write(line)
+                if line == b"\r\n":
+                    return
+        await _copy_exact(reader, writer, size + 2)
+
+
+async def _copy_body(reader, writer, headers):
+    if "chunked" in _header(headers, "transfer-encoding").lower():
+        await _copy_chunked(reader, writer)
+    elif _header(headers, "content-length"):
+        await _copy_exact(reader, writer, int(_header(headers, "content-length")))
+
+
+def _response_framing(method, status, headers):
+    if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+        return "none"
+    if "chunked" in _header(headers, "transfer-encoding").lower():
+        return "chunked"
+    if _header(headers, "content-length"):
+        return int(_header(headers, "content-length"))
+    return "close"
+
+
+async def _copy_response_body(reader, writer, framing):
+    if framing == "chunked":
+        await _copy_chunked(reader, writer)
+    elif framing == "close":
+        while True:
+            data = await reader.read(COPY_CHUNK)
+            if not data:
+                return
+            writer.write(data)
+            await writer.drain()
+    elif framing != "none":
+        await _copy_exact(reader, writer, framing)
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(COPY_CHUNK)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _pipe_both(client_reader, client_writer, upstream_reader, upstream_writer):
+    """Relay a websocket in both directions until either side closes."""
+    await asyncio.gather(_pipe(client_reader, upstream_writer), _pipe(upstream_reader, client_writer))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Launch the Community Hub")
+    parser.add_argument("--workers", type=int, help="Run this many Streamlit workers behind a sticky proxy")
+    parser.add_argument("--host", default="0.0.0.0", help="Proxy address (with --workers)")
+    parser.add_argument("--port", type=int, default=8501, help="Proxy port (with --workers)")
+    parser.add_argument("--worker-base-port", type=int, default=8600, help="First private port for workers")
+    parser.add_argument("--health-interval", type=float, default=5, help="Seconds between health checks")
+    parser.add_argument("--health-failures", type=int, default=3,
+                        help="Consecutive failed health checks before a worker is replaced")
+    parser.add_argument("--drain-seconds", type=float, default=30,
+                        help="How long a replaced worker keeps serving its open connections")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false",
+                        help="Start serving without the warm-up phase")
+    # Used by the launcher to start each worker: the rest are Streamlit options
+    parser.add_argument("--worker", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        serve(args.worker, warm=args.warmup)
+    if not args.workers:
+        run_single(args.warmup)
+        return
+    sys.exit(asyncio.run(Launcher(args).run()))
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import time
+
+# Command-line entry point for bulk-importing accounts from CSV/JSONL and
+# streaming the user directory out to a file.
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import or export community users.")
+    parser.add_argument("--db", default="community.db", help="Path to the SQLite database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Create users from a CSV or JSONL file")
+    import_parser.add_argument("file", help="CSV (with a header row) or JSONL file")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension")
+    import_parser.add_argument("--batch-size", type=int, default=2000, help="Rows inserted per transaction")
+    import_parser.add_argument("--hash-workers", type=int, default=0,
+                               help="Processes used to hash passwords (0 hashes in this process)")
+    import_parser.add_argument("--errors", help="Write per-row errors to this CSV file")
+
+    export_parser = subparsers.add_parser("export", help="Write the user directory to a file")
+    export_parser.add_argument("out", help="Output file")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension")
+
+    args = parser.parse_args()
+    os.environ["COMMUNITY_DB"] = args.db
+    from utils.bulk_users import detect_format, import_users, iter_user_export, format_errors_csv
+
+    file_format = args.format or detect_format(args.file if args.command == "import" else args.out)
+    started = time.time()
+
+    if args.command == "import":
+        with open(args.file, newline="", encoding="utf-8") as f:
+            result = import_users(
+                f, file_format=file_format, batch_size=args.batch_size, hash_workers=args.hash_workers,
+                progress=lambda r: print(f"  {r['created']} created, {len(r['errors'])} errors", end="\r")
+            )
+        elapsed = time.time() - started
+        print()
+        print(f"Imported {result['created']} of {result['rows']} rows in {elapsed:.1f}s "
+              f"({result['created'] / max(elapsed, 1e-9):.0f} users/s), {len(result['errors'])} errors")
+        for line_number, username, message in result['errors'][:20]:
+            print(f"  line {line_number} ({username or '-'}): {message}")
+        if args.errors and result['errors']:
+            with open(args.errors, "w", newline="", encoding="utf-8") as f:
+                f.write(format_errors_csv(result['errors']))
+            print(f"Wrote all errors to {args.errors}")
+        sys.exit(1 if result['errors'] else 0)
+
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        for chunk in iter_user_export(file_format):
+            f.write(chunk)
+    print(f"Exported users to {args.out} in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
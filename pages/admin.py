@@ -1,8 +1,19 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
+from utils.database import get_connection
+import io
 from datetime import datetime
 from utils.auth import is_admin, hash_password
+from utils.bulk_users import import_users, iter_user_export, detect_format, format_errors_csv
+from utils.cache import cache_stats, clear_cache
+from utils.maintenance import (create_snapshot, list_snapshots, find_snapshot, restore_snapshot, run_task,
+                               start_maintenance_scheduler, database_status, last_runs, QUIET_HOURS)
+from utils.purge import start_purge, retry_purge, resume_purge_jobs, list_purge_jobs, PURGE_STEP_NAMES
+from utils.query_profiler import query_stats, slow_queries, reset_query_stats, SLOW_QUERY_MS
+from utils.session_memory import memory_report, reap_sessions
+from utils.render_metrics import (timed_page, render_stats, rerun_stats, reset_render_stats, metrics_endpoint,
+                                  start_profile_capture, profile_capture_status, profile_report, profile_dump)
+from utils.stylesheet import stylesheet_stats
+from utils.user_directory import list_users, count_users, user_picker, SORT_COLUMNS, DIRECTORY_COLUMNS
 
 # Initialize session state
 if 'authenticated' not in st.session_state:
@@ -14,6 +25,7 @@ if 'username' not in st.session_state:
 if 'role' not in st.session_state:
     st.session_state.role = None
 
+@timed_page("admin")
 def app():
     st.title("Admin Dashboard")
     
@@ -26,32 +38,55 @@ def app():
         st.error("You don't have permission to access this page.")
         st.stop()
     
+    # Deferred until an admin actually renders the page
+    import pandas as pd
+    
+    # Scheduled quick checks and snapshots run in a background thread
+    start_maintenance_scheduler()
+    
     # Admin dashboard with tabs for different management areas
-    tab1, tab2, tab3 = st.tabs(["User Management", "Content Management", "Site Settings"])
+    tab1, tab2, tab3, tab4 = st.tabs(["User Management", "Content Management", "Site Settings", "Performance"])
     
     with tab1:
         st.subheader("User Management")
         
-        # Get all users
-        conn = sqlite3.connect('community.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT u.id, u.username, u.email, u.role, u.created_at, u.last_login,
-                   (SELECT COUNT(*) FROM discussions WHERE user_id = u.id) as discussion_count,
-                   (SELECT COUNT(*) FROM comments WHERE user_id = u.id) as comment_count,
-                   (SELECT COUNT(*) FROM resources WHERE user_id = u.id) as resource_count
-            FROM users u
-            ORDER BY u.username
-        """)
-        users = cursor.fetchall()
-        
-        # Convert to DataFrame for better display
-        users_df = pd.DataFrame(users, columns=[
-            'ID', 'Username', 'Email', 'Role', 'Created At', 'Last Login',
-            'Discussions', 'Comments', 'Resources'
-        ])
+        # User directory: one page at a time, searched and sorted in SQL
+        col1, col2, col3, col4 = st.columns([3, 1, 2, 1])
+        with col1:
+            search_prefix = st.text_input("Search users", placeholder="Username or email starts with...")
+        with col2:
+            search_field = st.selectbox("Search in", ["username", "email"])
+        with col3:
+            sort_by = st.selectbox("Sort by", list(SORT_COLUMNS),
+                                   format_func=lambda x: x.replace('_', ' ').capitalize())
+        with col4:
+            page_size = st.selectbox("Per page", [25, 50, 100], index=1)
+        descending = st.checkbox("Descending")
+        
+        total_users = count_users(search_prefix, search_field)
+        page_count = max(1, -(-total_users // page_size))
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+        users = list_users(page=page, page_size=page_size, sort=sort_by, descending=descending,
+                                        prefix=search_prefix, field=search_field)
         
+        users_df = pd.DataFrame(users, columns=DIRECTORY_COLUMNS)
+        users_df.columns = ['ID', 'Username', 'Email', 'Role', 'Created At', 'Last Login',
+                            'Discussions', 'Comments', 'Resources', 'Events', 'RSVPs']
         st.write(users_df)
+        st.caption(f"{total_users} matching users")
+        
+        # Generated fresh for the click that asked for it, read in batches and
+        # not kept in session state; offered until the next interaction
+        if st.button("Export All Users (CSV)"):
+            st.download_button(
+                "Download users.csv",
+                data=b"".join(chunk.encode() for chunk in iter_user_export('csv')),
+                file_name="users.csv",
+                mime="text/csv"
+            )
+        
+        conn = get_connection()
+        cursor = conn.cursor()
         
         # User actions
         st.markdown("---")
@@ -59,7 +94,7 @@ def app():
         
         action = st.selectbox(
             "Select Action",
-            ["Create New User", "Edit User Role", "Reset User Password", "Delete User"]
+            ["Create New User", "Bulk Import Users", "Edit User Role", "Reset User Password", "Delete User"]
         )
         
         if action == "Create New User":
@@ -103,16 +138,39 @@ def app():
                     else:
                         st.warning("Please fill in all fields.")
         
+        elif action == "Bulk Import Users":
+            st.write("Upload a CSV with a header row, or a JSONL file with one user per line. "
+                     "Columns: username, email, password, and optionally role, bio and interests.")
+            import_file = st.file_uploader("User file", type=["csv", "jsonl"])
+            
+            if import_file is not None and st.button("Import Users"):
+                try:
+                    progress_text = st.empty()
+                    result = import_users(
+                        io.TextIOWrapper(import_file, encoding="utf-8", newline=""),
+                        file_format=detect_format(import_file.name),
+                        progress=lambda r: progress_text.write(f"{r['created']} users created so far...")
+                    )
+                    progress_text.empty()
+                    st.success(f"Created {result['created']} of {result['rows']} users.")
+                    if result['errors']:
+                        st.warning(f"{len(result['errors'])} rows were skipped.")
+                        st.write(pd.DataFrame(result['errors'][:100], columns=['Line', 'Username', 'Error']))
+                        st.download_button(
+                            "Download All Errors",
+                            data=format_errors_csv(result['errors']),
+                            file_name="import_errors.csv",
+                            mime="text/csv"
+                        )
+                except Exception as e:
+                    st.error(f"Error importing users: {e}")
+        
         elif action == "Edit User Role":
-            user_to_edit = st.selectbox(
-                "Select User",
-                users_df[['ID', 'Username']].values.tolist(),
-                format_func=lambda x: f"{x[1]} (ID: {x[0]})"
-            )
+            user_to_edit = user_picker("Find User", key="edit_role_user")
             
             new_role = st.selectbox("New Role", ["user", "admin"])
             
-            if st.button("Update Role"):
+            if st.button("Update Role", disabled=user_to_edit is None):
                 try:
                     cursor.execute("UPDATE users SET role = ? WHERE id = ?", 
                                   (new_role, user_to_edit[0]))
@@ -123,16 +181,11 @@ def app():
                     st.error(f"Error updating role: {e}")
         
         elif action == "Reset User Password":
-            user_to_reset = st.selectbox(
-                "Select User",
-                users_df[['ID', 'Username']].values.tolist(),
-                format_func=lambda x: f"{x[1]} (ID: {x[0]})",
-                key="reset_password_user"
-            )
+            user_to_reset = user_picker("Find User", key="reset_password_user")
             
             new_password = st.text_input("New Password", type="password")
             
-            if st.button("Reset Password"):
+            if st.button("Reset Password", disabled=user_to_reset is None):
                 if new_password:
                     try:
                         password_hash, salt = hash_password(new_password)
@@ -151,50 +204,45 @@ def app():
                     st.warning("Please enter a new password.")
         
         elif action == "Delete User":
-            user_to_delete = st.selectbox(
-                "Select User",
-                users_df[['ID', 'Username']].values.tolist(),
-                format_func=lambda x: f"{x[1]} (ID: {x[0]})",
-                key="delete_user"
-            )
+            user_to_delete = user_picker("Find User", key="delete_user")
             
             st.warning(f"Deleting a user will also delete all their content, including discussions, comments, resources, and events!")
             
-            if st.button("Delete User", key="confirm_delete_user"):
-                try:
-                    # Start a transaction
-                    cursor.execute("BEGIN TRANSACTION")
-                    
-                    # Delete all user data
-                    tables = [
-                        "comments", "discussions", "events", "messages", 
-                        "profiles", "resources", "rsvps", "announcements"
-                    ]
-                    
-                    for table in tables:
-                        try:
-                            # For tables with user_id
-                            cursor.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_to_delete[0],))
-                        except:
-                            # For tables with sender_id/receiver_id
-                            try:
-                                cursor.execute(f"DELETE FROM {table} WHERE sender_id = ? OR receiver_id = ?", 
-                                             (user_to_delete[0], user_to_delete[0]))
-                            except:
-                                pass
-                    
-                    # Finally delete the user
-                    cursor.execute("DELETE FROM users WHERE id = ?", (user_to_delete[0],))
-                    
-                    # Commit the transaction
-                    cursor.execute("COMMIT")
-                    
-                    st.success(f"User {user_to_delete[1]} has been deleted!")
-                    st.rerun()
-                except Exception as e:
-                    # Rollback in case of error
-                    cursor.execute("ROLLBACK")
-                    st.error(f"Error deleting user: {e}")
+            if st.button("Delete User", key="confirm_delete_user", disabled=user_to_delete is None):
+                if user_to_delete[0] == st.session_state.user_id:
+                    st.error("You can't delete your own account.")
+                else:
+                    try:
+                        # Deleted in small chunks by a background job; progress is shown below
+                        job_id = start_purge(user_to_delete[0], requested_by=st.session_state.user_id)
+                        if job_id:
+                            st.success(f"Deletion of {user_to_delete[1]} started (job {job_id}).")
+                        else:
+                            st.error("User not found.")
+                    except Exception as e:
+                        st.error(f"Error deleting user: {e}")
+            
+            # Pick up jobs interrupted by a restart, then show progress
+            resume_purge_jobs()
+            purge_jobs = list_purge_jobs()
+            if purge_jobs:
+                st.markdown("#### Deletion Jobs")
+                for job in purge_jobs:
+                    step_number = PURGE_STEP_NAMES.index(job['step']) + 1 if job['step'] in PURGE_STEP_NAMES else 0
+                    if job['status'] == 'done':
+                        progress = f"finished {job['finished_at']}"
+                    else:
+                        progress = f"step {step_number}/{len(PURGE_STEP_NAMES)} ({job['step'] or 'waiting'})"
+                    st.write(f"**{job['username']}** (job {job['id']}) - {job['status']} - {progress} - "
+                             f"{job['rows_deleted']} rows, {job['files_deleted']} files deleted")
+                    if job['status'] == 'failed':
+                        st.error(f"Job {job['id']} failed: {job['error']}")
+                        if st.button("Retry", key=f"retry_purge_{job['id']}"):
+                            retry_purge(job['id'])
+                            st.rerun()
+                if any(job['status'] in ('queued', 'running') for job in purge_jobs):
+                    if st.button("Refresh progress"):
+                        st.rerun()
     
     with tab2:
         st.subheader("Content Management")
@@ -273,9 +321,10 @@ def app():
         elif content_type == "Events":
             cursor.execute("""
                 SELECT e.id, e.title, u.username, e.event_date, e.location,
-                       (SELECT COUNT(*) FROM rsvps WHERE event_id = e.id) as rsvp_count
+                       COALESCE(s.attending + s.maybe + s.not_attending, 0) as rsvp_count
                 FROM events e
                 JOIN users u ON e.user_id = u.id
+                LEFT JOIN event_stats s ON s.event_id = e.id
                 ORDER BY e.event_date DESC
             """)
             events = cursor.fetchall()
@@ -364,6 +413,16 @@ def app():
         st.markdown("---")
         st.subheader("Database Maintenance")
         
+        if st.button("Run Quick Check"):
+            try:
+                result = run_task('quick_check')['quick_check']
+                if result == "ok":
+                    st.success("Quick check passed!")
+                else:
+                    st.error(f"Database issues found: {', '.join(result[:10])}")
+            except Exception as e:
+                st.error(f"Error checking database: {e}")
+        
         if st.button("Run Database Integrity Check"):
             try:
                 cursor.execute("PRAGMA integrity_check")
@@ -375,15 +434,277 @@ def app():
             except Exception as e:
                 st.error(f"Error checking database integrity: {e}")
         
-        if st.button("Vacuum Database"):
+        # Space and planner statistics are maintained in the background;
+        # these buttons run the same tasks immediately
+        db_status = database_status()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Database Size", f"{db_status['page_count'] * db_status['page_size'] / 1e6:.1f} MB")
+        col2.metric("Free Pages", db_status['freelist_count'])
+        col3.metric("Auto-vacuum", db_status['auto_vacuum'].capitalize())
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Reclaim Free Space", disabled=db_status['auto_vacuum'] != 'incremental'):
+                try:
+                    result = run_task('incremental_vacuum')
+                    st.success(f"Freed {result['pages_freed']} pages.")
+                except Exception as e:
+                    st.error(f"Error reclaiming free space: {e}")
+        with col2:
+            if st.button("Update Query Statistics"):
+                try:
+                    run_task('optimize')
+                    st.success("Query planner statistics updated!")
+                except Exception as e:
+                    st.error(f"Error updating statistics: {e}")
+        
+        if db_status['auto_vacuum'] != 'incremental':
+            st.info("Incremental auto-vacuum will be switched on automatically during quiet hours "
+                    f"({QUIET_HOURS.start}:00-{QUIET_HOURS.stop}:00). Switching now rewrites the whole "
+                    "database file and blocks writes while it runs.")
+            if st.button("Switch On Incremental Auto-vacuum Now"):
+                try:
+                    result = run_task('enable_auto_vacuum')
+                    st.success(f"Auto-vacuum is now {result['auto_vacuum']}; freed {result['pages_freed']} pages.")
+                except Exception as e:
+                    st.error(f"Error switching auto-vacuum mode: {e}")
+        
+        # Last run of each background maintenance task
+        task_runs = last_runs()
+        if task_runs:
+            st.markdown("#### Maintenance Log")
+            runs_df = pd.DataFrame([
+                (task, run['finished_at'], run['status'], f"{run['duration_ms'] / 1000:.2f}s",
+                 run['detail'].get('pages_freed', ''), run['detail'].get('error', ''))
+                for task, run in sorted(task_runs.items())
+            ], columns=['Task', 'Last Run', 'Status', 'Duration', 'Pages Freed', 'Error'])
+            st.write(runs_df)
+        
+        # Backups: online snapshots of the database plus uploads
+        st.markdown("---")
+        st.subheader("Backups")
+        
+        if st.button("Create Snapshot Now"):
             try:
-                conn.close()  # Need to close and reopen with special flag
-                conn = sqlite3.connect('community.db', isolation_level=None)
-                cursor = conn.cursor()
-                cursor.execute("VACUUM")
-                st.success("Database vacuumed successfully!")
+                progress_bar = st.progress(0.0)
+                manifest = create_snapshot(
+                    label=f"manual by {st.session_state.username}",
+                    progress=lambda done, total: progress_bar.progress(done / total if total else 1.0)
+                )
+                st.success(f"Snapshot {manifest['name']} created in {manifest['duration_seconds']}s "
+                           f"({manifest['db_bytes'] / 1e6:.1f} MB database, {manifest['upload_files']} upload files).")
+                if manifest['missing_uploads']:
+                    st.warning(f"{len(manifest['missing_uploads'])} referenced upload files were missing.")
             except Exception as e:
-                st.error(f"Error vacuuming database: {e}")
+                st.error(f"Error creating snapshot: {e}")
+        
+        snapshots = list_snapshots()
+        if snapshots:
+            snapshots_df = pd.DataFrame([
+                (m['name'], m['created_at'], m.get('label') or '', f"{m['db_bytes'] / 1e6:.1f} MB",
+                 m['upload_files'], 'ok' if m['quick_check'] == 'ok' else 'problems')
+                for m in snapshots
+            ], columns=['Snapshot', 'Created At', 'Label', 'Database', 'Upload Files', 'Quick Check'])
+            st.write(snapshots_df)
+            
+            # Point-in-time restore: the newest snapshot taken at or before the chosen moment
+            col1, col2 = st.columns(2)
+            with col1:
+                restore_date = st.date_input("Restore to date", value=datetime.now().date())
+            with col2:
+                restore_time = st.time_input("Restore to time", value=datetime.now().time(), step=60)
+            # The picker has minute resolution; include the whole chosen minute
+            point_in_time = datetime.combine(restore_date, restore_time).strftime('%Y-%m-%d %H:%M:59')
+            restore_target = find_snapshot(point_in_time)
+            
+            if restore_target is None:
+                st.info("No snapshot was taken at or before that time.")
+            else:
+                st.write(f"This restores snapshot **{restore_target['name']}** taken {restore_target['created_at']}. "
+                         "A snapshot of the current state is taken first.")
+                confirm_restore = st.checkbox("I understand that changes made after this snapshot will be rolled back")
+                if st.button("Restore Snapshot", disabled=not confirm_restore):
+                    try:
+                        result = restore_snapshot(restore_target['name'])
+                        st.success(f"Restored {result['restored']}. The previous state was saved as "
+                                   f"{result['safety_snapshot']}.")
+                    except Exception as e:
+                        st.error(f"Error restoring snapshot: {e}")
+        else:
+            st.info("No snapshots yet.")
+    
+    with tab4:
+        st.subheader("Slow Queries")
+        st.write(f"Timings of every SQL statement run by this server process since it started (or since the "
+                 f"last reset), grouped by statement shape. Statements over {SLOW_QUERY_MS:.0f} ms are logged "
+                 "below with their query plan.")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            order_labels = {"Total time": "total_ms", "p95": "p95_ms", "p99": "p99_ms", "Calls": "calls",
+                            "Slow calls": "slow_calls"}
+            order_by = st.selectbox("Sort by", list(order_labels))
+        with col2:
+            top_n = st.number_input("Statements shown", min_value=5, max_value=200, value=25, step=5)
+        
+        stats = query_stats(order_by=order_labels[order_by])[:int(top_n)]
+        if stats:
+            stats_df = pd.DataFrame([
+                (s['fingerprint'], s['calls'], round(s['total_ms'], 1), round(s['mean_ms'], 2), round(s['p50_ms'], 2),
+                 round(s['p95_ms'], 2), round(s['p99_ms'], 2), round(s['max_ms'], 2), s['rows'], s['slow_calls'])
+                for s in stats
+            ], columns=['Statement', 'Calls', 'Total ms', 'Mean ms', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms',
+                        'Rows', 'Slow Calls'])
+            st.dataframe(stats_df)
+            
+            for s in stats:
+                if s['plan']:
+                    with st.expander(f"Plan: {s['fingerprint'][:100]}"):
+                        st.code(s['plan'], language=None)
+        else:
+            st.info("No queries recorded yet.")
+        
+        st.markdown("#### Slow Query Log")
+        slow = slow_queries()
+        if slow:
+            slow_df = pd.DataFrame([
+                (q['at'], round(q['duration_ms'], 1), q['rows'], q['fingerprint'])
+                for q in slow
+            ], columns=['At', 'Duration ms', 'Rows', 'Statement'])
+            st.dataframe(slow_df)
+        else:
+            st.info(f"No statements over {SLOW_QUERY_MS:.0f} ms yet.")
+        
+        if st.button("Reset Query Statistics"):
+            reset_query_stats()
+            st.rerun()
+        
+        # Time spent in each phase of app.py and in each page's app()
+        st.markdown("---")
+        st.subheader("Render Timing")
+        
+        reruns = rerun_stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Active Sessions", reruns['active_sessions'])
+        col2.metric("Reruns per Session (mean / max)",
+                    f"{reruns['session_reruns_mean']:.1f} / {reruns['session_reruns_max']}")
+        col3.metric("Reruns in This Session", reruns['this_session'])
+        
+        timings = render_stats()
+        if timings:
+            timings_df = pd.DataFrame([
+                (t['script'], t['phase'], t['count'], round(t['mean_ms'], 1), round(t['p50_ms'], 1),
+                 round(t['p95_ms'], 1), round(t['p99_ms'], 1), round(t['max_ms'], 1))
+                for t in timings
+            ], columns=['Script', 'Phase', 'Runs', 'Mean ms', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms'])
+            st.dataframe(timings_df)
+        
+        endpoint, reason = metrics_endpoint()
+        if endpoint:
+            st.caption(f"Prometheus metrics: {endpoint} (JSON at {endpoint}.json)")
+        else:
+            st.caption(f"Metrics endpoint not running: {reason}")
+        
+        if st.button("Reset Render Timing"):
+            reset_render_stats()
+            st.rerun()
+        
+        # cProfile capture of the next few page renders, from any session
+        st.markdown("#### Profile Page Renders")
+        col1, col2 = st.columns(2)
+        with col1:
+            capture_renders = st.number_input("Renders to capture", min_value=1, max_value=100, value=10)
+        with col2:
+            capture_page = st.selectbox("Page", ["Any page", "admin", "analytics", "announcements", "discussions",
+                                                 "events", "messages", "profile", "resources"])
+        if st.button("Start Capture"):
+            start_profile_capture(int(capture_renders), None if capture_page == "Any page" else capture_page)
+            st.success("Capture armed; the next matching page renders will be profiled.")
+        
+        capture = profile_capture_status()
+        if capture['armed_at']:
+            st.write(f"Capture armed at {capture['armed_at']}: {capture['captured']} renders captured, "
+                     f"{capture['remaining']} to go.")
+            report = profile_report()
+            if report:
+                with st.expander("Profile (top functions by cumulative time)"):
+                    st.code(report, language=None)
+                dump = profile_dump()
+                if dump:
+                    st.download_button("Download .prof", data=dump, file_name="page_renders.prof",
+                                       mime="application/octet-stream")
+        
+        # Process-wide query cache (utils/cache.py): hit rates per cached function
+        st.markdown("#### Query Cache")
+        cache = cache_stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Entries", f"{cache['entries']:,}")
+        col2.metric("Memory", f"{cache['bytes'] / 1024:,.0f} KB of {cache['max_bytes'] / 1048576:,.0f} MB")
+        lookups = sum(site['hits'] + site['misses'] for site in cache['sites'])
+        col3.metric("Hit Rate", f"{sum(site['hits'] for site in cache['sites']) / lookups:.1%}" if lookups else "-")
+        if cache['sites']:
+            st.dataframe(pd.DataFrame([
+                (site['name'], site['hits'], site['misses'], f"{site['hit_rate']:.1%}", site['entries'],
+                 site['bytes'], site['evictions'], site['invalidations'])
+                for site in cache['sites']
+            ], columns=['Function', 'Hits', 'Misses', 'Hit Rate', 'Entries', 'Bytes', 'Evictions', 'Invalidations']))
+        else:
+            st.info("No cached calls yet in this process.")
+        if st.button("Clear Query Cache"):
+            clear_cache()
+            st.rerun()
+        
+        # st.session_state held by this process's open sessions (utils/session_memory.py)
+        st.markdown("#### Session Memory")
+        sessions = memory_report()
+        idle_limit = sessions['idle_evict_seconds']
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Open Sessions", len(sessions['sessions']))
+        col2.metric("Session State", f"{sessions['total_bytes'] / 1024:,.0f} KB")
+        col3.metric("Uploaded Files", f"{sessions['uploaded_bytes'] / 1024:,.0f} KB")
+        st.caption(f"Idle sessions are cleared after {idle_limit // 60} minutes." if idle_limit else
+                   "Idle session eviction is off.")
+        if sessions['max_bytes']:
+            st.caption(f"Sessions are trimmed to {sessions['max_bytes'] // 1024:,} KB of state, largest keys first.")
+        if sessions['pages']:
+            st.dataframe(pd.DataFrame([
+                (p['page'], p['keys'], p['bytes']) for p in sessions['pages']
+            ], columns=['Page', 'Keys', 'Bytes']))
+            st.dataframe(pd.DataFrame([
+                (k['key'], k['page'], k['sessions'], k['bytes'], k['max_bytes']) for k in sessions['keys']
+            ], columns=['Key', 'Page', 'Sessions', 'Bytes', 'Max per Session']))
+        evictions = sessions['evictions']
+        st.write(f"Evicted since start: {evictions['idle_sessions']:,} idle sessions "
+                 f"({evictions['idle_bytes'] / 1024:,.0f} KB of state, {evictions['uploaded_bytes'] / 1024:,.0f} KB "
+                 f"of uploads), {evictions['capped_sessions']:,} sessions trimmed to the cap "
+                 f"({evictions['capped_bytes'] / 1024:,.0f} KB).")
+        if evictions['reaper_failures']:
+            failed_at, error = sessions['reaper_error']
+            st.warning(f"{evictions['reaper_failures']:,} background reaper passes failed; the last one at "
+                       f"{datetime.fromtimestamp(failed_at).strftime('%Y-%m-%d %H:%M:%S')}: {error}")
+        if st.button("Evict Idle Sessions Now"):
+            reap_sessions()
+            st.rerun()
+        
+        # CSS each rerun used to resend inline, against the bundle reference sent now
+        st.markdown("#### Stylesheets")
+        bundles = stylesheet_stats()
+        inline_bytes = sum(b['inline_bytes'] for b in bundles)
+        rerun_bytes = sum(b['rerun_bytes'] for b in bundles)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Inline CSS (before)", f"{inline_bytes:,} B")
+        col2.metric("CSS per Rerun (now)", f"{rerun_bytes:,} B")
+        col3.metric("Saved per Rerun", f"{inline_bytes - rerun_bytes:,} B")
+        st.dataframe(pd.DataFrame([
+            (b['bundle'], b['file'] or '-', b['inline_bytes'], b['minified_bytes'], b['rerun_bytes'],
+             'Yes' if b['static_serving'] else 'No')
+            for b in bundles
+        ], columns=['Bundle', 'File', 'Source Bytes', 'Minified Bytes', 'Bytes per Rerun', 'Served Statically']))
+        for b in bundles:
+            if b['error']:
+                st.warning(f"Couldn't write the {b['bundle']} bundle ({b['error']}); its CSS is sent inline.")
+        if not any(b['static_serving'] for b in bundles):
+            st.info("Static serving is off (server.enableStaticServing), so bundles are sent inline, minified.")
     
     conn.close()
 
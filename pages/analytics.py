@@ -1,10 +1,9 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from utils.database import get_connection
 from datetime import datetime, timedelta
 from utils.auth import is_admin
+from utils.render_metrics import timed_page
+from utils.user_directory import top_users
 
 # Initialize session state
 if 'authenticated' not in st.session_state:
@@ -16,6 +15,7 @@ if 'username' not in st.session_state:
 if 'role' not in st.session_state:
     st.session_state.role = None
 
+@timed_page("analytics")
 def app():
     st.title("Community Analytics")
     
@@ -28,8 +28,13 @@ def app():
         st.error("You don't have permission to access this page.")
         st.stop()
     
+    # The charting stack loads on the first analytics render, not at import
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
     # Database connection
-    conn = sqlite3.connect('community.db')
+    conn = get_connection()
     
     # Time period selector
     time_period = st.selectbox(
@@ -212,18 +217,21 @@ def app():
         else:
             st.info(f"No discussion activity data available for the selected period ({time_period}).")
         
-        # Top contributors (users with most discussions/comments)
-        cursor.execute("""
-            SELECT u.username, COUNT(d.id) as discussion_count
-            FROM users u
-            JOIN discussions d ON u.id = d.user_id
-            WHERE date(d.created_at) >= ?
-            GROUP BY u.id
-            ORDER BY discussion_count DESC
-            LIMIT 10
-        """, (start_date,))
-        
-        top_discussion_creators = cursor.fetchall()
+        # Top contributors (users with most discussions/comments); all-time
+        # totals are read straight from the maintained user_stats counters
+        if time_period == "All time":
+            top_discussion_creators = top_users('discussions')
+        else:
+            cursor.execute("""
+                SELECT u.username, COUNT(d.id) as discussion_count
+                FROM users u
+                JOIN discussions d ON u.id = d.user_id
+                WHERE date(d.created_at) >= ?
+                GROUP BY u.id
+                ORDER BY discussion_count DESC
+                LIMIT 10
+            """, (start_date,))
+            top_discussion_creators = cursor.fetchall()
         
         if top_discussion_creators:
             st.subheader("Top Discussion Contributors")
@@ -255,16 +263,15 @@ def app():
         col2.metric("New Events", new_events)
         col3.metric("Upcoming Events", upcoming_events)
         
-        # RSVP statistics
+        # RSVP statistics (read from the maintained per-event counters)
         cursor.execute("""
             SELECT e.title, 
-                  SUM(CASE WHEN r.status = 'attending' THEN 1 ELSE 0 END) as attending,
-                  SUM(CASE WHEN r.status = 'maybe' THEN 1 ELSE 0 END) as maybe,
-                  SUM(CASE WHEN r.status = 'not_attending' THEN 1 ELSE 0 END) as not_attending
+                  COALESCE(s.attending, 0) as attending,
+                  COALESCE(s.maybe, 0) as maybe,
+                  COALESCE(s.not_attending, 0) as not_attending
             FROM events e
-            LEFT JOIN rsvps r ON e.id = r.event_id
+            LEFT JOIN event_stats s ON s.event_id = e.id
             WHERE date(e.event_date) >= ?
-            GROUP BY e.id
             ORDER BY e.event_date ASC
             LIMIT 10
         """, (start_date,))
@@ -344,17 +351,19 @@ def app():
             st.info("No resource type data available.")
         
         # Resource contributions by user
-        cursor.execute("""
-            SELECT u.username, COUNT(r.id) as resource_count
-            FROM users u
-            JOIN resources r ON u.id = r.user_id
-            WHERE date(r.created_at) >= ?
-            GROUP BY u.id
-            ORDER BY resource_count DESC
-            LIMIT 10
-        """, (start_date,))
-        
-        top_resource_contributors = cursor.fetchall()
+        if time_period == "All time":
+            top_resource_contributors = top_users('resources')
+        else:
+            cursor.execute("""
+                SELECT u.username, COUNT(r.id) as resource_count
+                FROM users u
+                JOIN resources r ON u.id = r.user_id
+                WHERE date(r.created_at) >= ?
+                GROUP BY u.id
+                ORDER BY resource_count DESC
+                LIMIT 10
+            """, (start_date,))
+            top_resource_contributors = cursor.fetchall()
         
         if top_resource_contributors:
             contrib_df = pd.DataFrame(top_resource_contributors, columns=['username', 'resources'])
@@ -1,7 +1,9 @@
 import streamlit as st
-import sqlite3
+from utils.cache import cached, invalidate
+from utils.database import get_connection
 from datetime import datetime
 from utils.auth import is_admin
+from utils.render_metrics import timed_page
 
 # Initialize session state
 if 'authenticated' not in st.session_state:
@@ -13,6 +15,39 @@ if 'username' not in st.session_state:
 if 'role' not in st.session_state:
     st.session_state.role = None
 
+@cached(tags=('announcements', 'users'))
+def list_announcements(time_filter, today):
+    """Announcements for a time filter, newest first, with their authors."""
+    query = """
+        SELECT a.id, a.title, a.content, a.created_at, u.username
+        FROM announcements a
+        JOIN users u ON a.user_id = u.id
+    """
+    
+    # Add WHERE clauses for time filter
+    params = []
+    
+    if time_filter == "Today":
+        query += " WHERE date(a.created_at) = ?"
+        params.append(today)
+    elif time_filter == "This Week":
+        query += " WHERE date(a.created_at) >= date(?, '-7 days')"
+        params.append(today)
+    elif time_filter == "This Month":
+        query += " WHERE date(a.created_at) >= date(?, '-30 days')"
+        params.append(today)
+    
+    # Order by most recent first
+    query += " ORDER BY a.created_at DESC"
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    announcements = cursor.fetchall()
+    conn.close()
+    return announcements
+
+@timed_page("announcements")
 def app():
     st.title("Community Announcements")
     
@@ -33,37 +68,8 @@ def app():
     tab1, tab2 = st.tabs(["View Announcements", "Create Announcement"])
     
     with tab1:
-        # Construct the query based on filters
-        query = """
-            SELECT a.id, a.title, a.content, a.created_at, u.username
-            FROM announcements a
-            JOIN users u ON a.user_id = u.id
-        """
-        
-        # Add WHERE clauses for time filter
-        params = []
-        
-        if time_filter != "All Time":
-            today = datetime.now().strftime('%Y-%m-%d')
-            if time_filter == "Today":
-                query += " WHERE date(a.created_at) = ?"
-                params.append(today)
-            elif time_filter == "This Week":
-                query += " WHERE date(a.created_at) >= date(?, '-7 days')"
-                params.append(today)
-            elif time_filter == "This Month":
-                query += " WHERE date(a.created_at) >= date(?, '-30 days')"
-                params.append(today)
-        
-        # Order by most recent first
-        query += " ORDER BY a.created_at DESC"
-        
-        # Execute query and display results
-        conn = sqlite3.connect('community.db')
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        announcements = cursor.fetchall()
-        conn.close()
+        # Cached per (filter, day) until an announcement is posted or deleted
+        announcements = list_announcements(time_filter, datetime.now().strftime('%Y-%m-%d'))
         
         if not announcements:
             st.info("No announcements found for the selected time period.")
@@ -77,11 +83,12 @@ def app():
                     # Only show delete button for admins
                     if is_admin(st.session_state.user_id):
                         if st.button("Delete Announcement", key=f"delete_{announce_id}"):
-                            conn = sqlite3.connect('community.db')
+                            conn = get_connection()
                             cursor = conn.cursor()
                             cursor.execute("DELETE FROM announcements WHERE id = ?", (announce_id,))
                             conn.commit()
                             conn.close()
+                            invalidate('announcements')
                             st.success("Announcement deleted.")
                             st.rerun()
     
@@ -101,7 +108,7 @@ def app():
                 if submit:
                     if title and content:
                         try:
-                            conn = sqlite3.connect('community.db')
+                            conn = get_connection()
                             cursor = conn.cursor()
                             
                             now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -112,6 +119,7 @@ def app():
                             
                             conn.commit()
                             conn.close()
+                            invalidate('announcements')
                             
                             st.success("Announcement posted successfully!")
                             # Clear form and refresh
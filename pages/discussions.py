@@ -1,5 +1,9 @@
 import streamlit as st
-import sqlite3
+from utils.cache import cached, invalidate
+from utils.comments import open_replies, post_comment, render_comments, show_latest_comments
+from utils.database import get_connection
+from utils.render_metrics import timed_page
+from utils.trending import TRENDING_FEED_SIZE
 from datetime import datetime
 
 # Initialize session state
@@ -12,6 +16,17 @@ if 'username' not in st.session_state:
 if 'role' not in st.session_state:
     st.session_state.role = None
 
+@cached(tags=('discussions',))
+def discussion_categories():
+    """Categories in use, for the filter and the new discussion form."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT category FROM discussions ORDER BY category")
+    categories = [cat[0] for cat in cursor.fetchall()]
+    conn.close()
+    return categories
+
+@timed_page("discussions")
 def app():
     st.title("Community Discussions")
     
@@ -22,15 +37,8 @@ def app():
     # Sidebar for filters
     st.sidebar.subheader("Filter Discussions")
     
-    # Get categories for filter
-    conn = sqlite3.connect('community.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT category FROM discussions ORDER BY category")
-    categories = [cat[0] for cat in cursor.fetchall()]
-    conn.close()
-    
-    # Add "All" option to categories
-    categories = ["All"] + categories
+    # Get categories for filter, with an "All" option
+    categories = ["All"] + discussion_categories()
     
     # Category filter
     selected_category = st.sidebar.selectbox("Category", categories)
@@ -44,7 +52,7 @@ def app():
     # Sort options
     sort_option = st.sidebar.selectbox(
         "Sort By", 
-        ["Newest First", "Oldest First", "Most Comments"]
+        ["Newest First", "Oldest First", "Most Comments", "Trending"]
     )
     
     # Main content area with tabs
@@ -54,10 +62,9 @@ def app():
         # Construct the query based on filters
         query = """
             SELECT d.id, d.title, d.content, d.category, d.created_at, 
-                   u.username, COUNT(c.id) as comment_count
+                   u.username, d.comment_count
             FROM discussions d
             JOIN users u ON d.user_id = u.id
-            LEFT JOIN comments c ON d.id = c.discussion_id
         """
         
         # Add WHERE clauses for filters
@@ -83,18 +90,20 @@ def app():
         if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
         
-        # Group by and order by
-        query += " GROUP BY d.id"
-        
         if sort_option == "Newest First":
             query += " ORDER BY d.created_at DESC"
         elif sort_option == "Oldest First":
             query += " ORDER BY d.created_at ASC"
         elif sort_option == "Most Comments":
-            query += " ORDER BY comment_count DESC"
+            query += " ORDER BY d.comment_count DESC"
+        elif sort_option == "Trending":
+            # Scores are refreshed by the maintenance scheduler (utils/trending.py);
+            # the feed is the top of idx_discussions_hot
+            query += " ORDER BY d.hot_score DESC, d.created_at DESC LIMIT ?"
+            params.append(TRENDING_FEED_SIZE)
         
         # Execute query and display results
-        conn = sqlite3.connect('community.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute(query, params)
         discussions = cursor.fetchall()
@@ -115,42 +124,24 @@ def app():
                     
                     # Display comments if button is clicked
                     if 'show_comments' in st.session_state and st.session_state.show_comments == disc_id:
-                        cursor.execute("""
-                            SELECT c.content, u.username, c.created_at
-                            FROM comments c
-                            JOIN users u ON c.user_id = u.id
-                            WHERE c.discussion_id = ?
-                            ORDER BY c.created_at ASC
-                        """, (disc_id,))
-                        comments = cursor.fetchall()
-                        
                         st.subheader("Comments")
-                        if comments:
-                            for comment in comments:
-                                st.text_area(
-                                    f"{comment[1]} on {comment[2][:10]}",
-                                    comment[0],
-                                    height=80,
-                                    key=f"comment_{comment[2]}",
-                                    disabled=True
-                                )
-                        else:
-                            st.info("No comments yet. Be the first to comment!")
+                        shown = dict(render_comments(disc_id))
                         
-                        # Add comment form
+                        # Add comment form; replies can go to any comment shown above
                         with st.form(key=f"add_comment_form_{disc_id}", clear_on_submit=True):
+                            reply_to = st.selectbox("Reply to", [None] + list(shown),
+                                                    format_func=lambda c: "New comment" if c is None else shown[c])
                             comment_text = st.text_area("Add a comment", height=100)
                             submit_comment = st.form_submit_button("Post Comment")
                             
                             if submit_comment and comment_text:
                                 # Insert comment into database
                                 try:
-                                    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                    cursor.execute("""
-                                        INSERT INTO comments (discussion_id, user_id, content, created_at)
-                                        VALUES (?, ?, ?, ?)
-                                    """, (disc_id, st.session_state.user_id, comment_text, now))
-                                    conn.commit()
+                                    _, root_id = post_comment(disc_id, st.session_state.user_id, comment_text, reply_to)
+                                    if reply_to is None:
+                                        show_latest_comments(disc_id)
+                                    else:
+                                        open_replies(disc_id, root_id)
                                     st.success("Comment posted successfully!")
                                     st.rerun()
                                 except Exception as e:
@@ -162,11 +153,7 @@ def app():
         st.subheader("Start a New Discussion")
         
         # Get available categories or add a new one
-        conn = sqlite3.connect('community.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT category FROM discussions ORDER BY category")
-        existing_categories = [cat[0] for cat in cursor.fetchall()]
-        conn.close()
+        existing_categories = discussion_categories()
         
         # If no categories exist yet, provide defaults
         if not existing_categories:
@@ -194,17 +181,19 @@ def app():
             if submit_discussion:
                 if title and content and category:
                     try:
-                        conn = sqlite3.connect('community.db')
+                        conn = get_connection()
                         cursor = conn.cursor()
                         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                         
+                        # A fresh post scores 1 (see utils/trending.py), so it trends before the next recompute
                         cursor.execute("""
-                            INSERT INTO discussions (user_id, title, content, category, created_at, updated_at)
-                            VALUES (?, ?, ?, ?, ?, ?)
+                            INSERT INTO discussions (user_id, title, content, category, created_at, updated_at, hot_score)
+                            VALUES (?, ?, ?, ?, ?, ?, 1)
                         """, (st.session_state.user_id, title, content, category, now, now))
                         
                         conn.commit()
                         conn.close()
+                        invalidate('discussions')
                         
                         st.success("Discussion posted successfully!")
                         # Clear form and refresh discussions
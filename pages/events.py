@@ -1,8 +1,11 @@
 import streamlit as st
-import sqlite3
+from utils.database import get_connection
 from datetime import datetime, timedelta
-import pandas as pd
-import plotly.express as px
+from utils.rsvp import set_event_capacity, set_rsvp
+from utils.calendar_view import get_calendar, events_data_version
+from utils.recurrence import (DEFAULT_HORIZON_DAYS, materialize_occurrences, describe_recurrence,
+                              get_occurrence_rsvp, set_occurrence_rsvp)
+from utils.render_metrics import timed_page
 
 # Initialize session state
 if 'authenticated' not in st.session_state:
@@ -14,6 +17,7 @@ if 'username' not in st.session_state:
 if 'role' not in st.session_state:
     st.session_state.role = None
 
+@timed_page("events")
 def app():
     st.title("Community Events")
     
@@ -24,6 +28,8 @@ def app():
     # Initialize session state for event details view
     if 'view_event_details' not in st.session_state:
         st.session_state.view_event_details = None
+    if 'view_event_occurrence' not in st.session_state:
+        st.session_state.view_event_occurrence = None
     
     # Sidebar for calendar view
     st.sidebar.subheader("Calendar View")
@@ -38,16 +44,7 @@ def app():
     
     if view_option == "Day":
         selected_date = st.sidebar.date_input("Select Date", today)
-        date_filter = selected_date.strftime('%Y-%m-%d')
-        
-        events_query = """
-            SELECT e.id, e.title, e.event_date, e.event_time, e.location, u.username
-            FROM events e
-            JOIN users u ON e.user_id = u.id
-            WHERE e.event_date = ?
-            ORDER BY e.event_date ASC, e.event_time ASC
-        """
-        params = (date_filter,)
+        range_start = range_end = selected_date.strftime('%Y-%m-%d')
         
     elif view_option == "Week":
         start_of_week = today - timedelta(days=today.weekday())
@@ -56,21 +53,10 @@ def app():
         selected_start = st.sidebar.date_input("Start of Week", start_of_week)
         selected_end = selected_start + timedelta(days=6)
         
-        events_query = """
-            SELECT e.id, e.title, e.event_date, e.event_time, e.location, u.username
-            FROM events e
-            JOIN users u ON e.user_id = u.id
-            WHERE e.event_date BETWEEN ? AND ?
-            ORDER BY e.event_date ASC, e.event_time ASC
-        """
-        params = (selected_start.strftime('%Y-%m-%d'), selected_end.strftime('%Y-%m-%d'))
+        range_start = selected_start.strftime('%Y-%m-%d')
+        range_end = selected_end.strftime('%Y-%m-%d')
         
     elif view_option == "Month":
-        # Calculate first and last day of current month
-        current_month = today.replace(day=1)
-        next_month = (current_month.replace(day=28) + timedelta(days=4)).replace(day=1)
-        last_day = next_month - timedelta(days=1)
-        
         # Month selector
         months = ["January", "February", "March", "April", "May", "June", 
                  "July", "August", "September", "October", "November", "December"]
@@ -85,24 +71,12 @@ def app():
         else:
             end_date = datetime(selected_year, month_index + 1, 1).date() - timedelta(days=1)
         
-        events_query = """
-            SELECT e.id, e.title, e.event_date, e.event_time, e.location, u.username
-            FROM events e
-            JOIN users u ON e.user_id = u.id
-            WHERE e.event_date BETWEEN ? AND ?
-            ORDER BY e.event_date ASC, e.event_time ASC
-        """
-        params = (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        range_start = start_date.strftime('%Y-%m-%d')
+        range_end = end_date.strftime('%Y-%m-%d')
         
     else:  # All Upcoming
-        events_query = """
-            SELECT e.id, e.title, e.event_date, e.event_time, e.location, u.username
-            FROM events e
-            JOIN users u ON e.user_id = u.id
-            WHERE e.event_date >= ?
-            ORDER BY e.event_date ASC, e.event_time ASC
-        """
-        params = (today.strftime('%Y-%m-%d'),)
+        range_start = today.strftime('%Y-%m-%d')
+        range_end = None
     
     # Main content - Tabs for browsing and creating events
     tab1, tab2 = st.tabs(["Browse Events", "Create Event"])
@@ -111,27 +85,39 @@ def app():
         # If we're viewing event details
         if st.session_state.view_event_details is not None:
             event_id = st.session_state.view_event_details
-            conn = sqlite3.connect('community.db')
+            conn = get_connection()
             cursor = conn.cursor()
             
             # Get event details
             cursor.execute("""
                 SELECT e.title, e.description, e.event_date, e.event_time, e.location, 
-                       u.username, e.user_id
+                       u.username, e.user_id, e.capacity,
+                       COALESCE(s.attending, 0), COALESCE(s.waitlisted, 0),
+                       e.recurrence_rule, e.recurrence_interval, e.recurrence_until
                 FROM events e
                 JOIN users u ON e.user_id = u.id
+                LEFT JOIN event_stats s ON s.event_id = e.id
                 WHERE e.id = ?
             """, (event_id,))
             event = cursor.fetchone()
             
             if event:
-                title, description, event_date, event_time, location, creator, creator_id = event
+                (title, description, event_date, event_time, location, creator, creator_id,
+                 capacity, attending_count, waitlisted_count,
+                 recurrence_rule, recurrence_interval, recurrence_until) = event
+                occurrence_date = st.session_state.view_event_occurrence or event_date
                 
                 st.subheader(title)
-                st.write(f"**Date:** {event_date}")
+                st.write(f"**Date:** {occurrence_date}")
+                if recurrence_rule:
+                    st.write(f"**Repeats:** {describe_recurrence(recurrence_rule, recurrence_interval, recurrence_until)} "
+                             f"(series starts {event_date})")
                 st.write(f"**Time:** {event_time}")
                 st.write(f"**Location:** {location}")
                 st.write(f"**Organizer:** {creator}")
+                if capacity is not None:
+                    st.write(f"**Capacity:** {attending_count} / {capacity} attending"
+                             + (f" ({waitlisted_count} on waitlist)" if waitlisted_count else ""))
                 
                 st.markdown("---")
                 st.subheader("Event Description")
@@ -150,6 +136,8 @@ def app():
                 
                 # RSVP section
                 st.subheader("RSVP")
+                if current_status == "waitlisted":
+                    st.info("This event is full. You're on the waitlist and will be moved to attending when a seat opens.")
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
@@ -170,27 +158,45 @@ def app():
                     else:
                         new_status = "not_attending"
                     
-                    # Update or insert RSVP
+                    # Atomic upsert; full events put the user on the waitlist
                     try:
-                        if rsvp_status:
-                            cursor.execute("""
-                                UPDATE rsvps 
-                                SET status = ? 
-                                WHERE event_id = ? AND user_id = ?
-                            """, (new_status, event_id, st.session_state.user_id))
+                        stored_status, _ = set_rsvp(event_id, st.session_state.user_id, new_status)
+                        if stored_status is None:
+                            # Deleted by its organizer since this page was rendered
+                            st.error("This event no longer exists.")
                         else:
-                            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            cursor.execute("""
-                                INSERT INTO rsvps (event_id, user_id, status, created_at)
-                                VALUES (?, ?, ?, ?)
-                            """, (event_id, st.session_state.user_id, new_status, now))
-                        
-                        conn.commit()
-                        st.success(f"You have RSVP'd as {new_status.replace('_', ' ')}!")
-                        st.rerun()
+                            if stored_status == "waitlisted":
+                                st.warning("This event is full. You've been added to the waitlist.")
+                            else:
+                                st.success(f"You have RSVP'd as {stored_status.replace('_', ' ')}!")
+                            st.rerun()
                     except Exception as e:
                         st.error(f"Error updating RSVP: {e}")
                 
+                # Per-occurrence overrides for recurring events
+                if recurrence_rule:
+                    effective_status, is_override = get_occurrence_rsvp(
+                        event_id, occurrence_date, st.session_state.user_id
+                    )
+                    st.markdown(f"**Only on {occurrence_date}:** "
+                                + (f"{effective_status.replace('_', ' ')} (override)" if is_override
+                                   else "following your series RSVP"))
+                    occurrence_choice = st.selectbox(
+                        "Change RSVP for this date only",
+                        ["Use series RSVP", "attending", "maybe", "not_attending"],
+                        index=["Use series RSVP", "attending", "maybe", "not_attending"].index(
+                            effective_status if is_override else "Use series RSVP"),
+                        format_func=lambda x: x.replace('_', ' ').capitalize() if x != "Use series RSVP" else x,
+                        key=f"occurrence_rsvp_{event_id}_{occurrence_date}"
+                    )
+                    if st.button("Save for this date"):
+                        try:
+                            set_occurrence_rsvp(event_id, occurrence_date, st.session_state.user_id,
+                                                None if occurrence_choice == "Use series RSVP" else occurrence_choice)
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error updating RSVP: {e}")
+                
                 # Attendee list
                 st.markdown("---")
                 st.subheader("Attendees")
@@ -209,6 +215,7 @@ def app():
                     attending_list = [a[0] for a in attendees if a[1] == "attending"]
                     maybe_list = [a[0] for a in attendees if a[1] == "maybe"]
                     not_attending_list = [a[0] for a in attendees if a[1] == "not_attending"]
+                    waitlist = [a[0] for a in attendees if a[1] == "waitlisted"]
                     
                     col1, col2, col3 = st.columns(3)
                     
@@ -226,12 +233,28 @@ def app():
                         st.write("**Not Attending:**")
                         for user in not_attending_list:
                             st.write(f"- {user}")
+                    
+                    if waitlist:
+                        st.write(f"**Waitlist:** {', '.join(waitlist)}")
                 else:
                     st.info("No RSVPs yet. Be the first to RSVP!")
                 
-                # Delete button (only for creator or admin)
+                # Capacity and delete buttons (only for creator or admin)
                 if st.session_state.user_id == creator_id or st.session_state.role == "admin":
                     st.markdown("---")
+                    new_capacity = st.number_input("Capacity (0 for unlimited)", min_value=0,
+                                                   value=capacity or 0, step=1, key=f"capacity_{event_id}")
+                    if st.button("Update Capacity"):
+                        try:
+                            # Seats opened by a larger capacity go to the waitlist in order;
+                            # a smaller one only stops new RSVPs, nobody is moved out
+                            promoted = set_event_capacity(event_id, int(new_capacity) or None)
+                            st.success("Capacity updated."
+                                       + (f" {len(promoted)} moved from the waitlist to attending." if promoted else ""))
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error updating capacity: {e}")
+                    
                     if st.button("Delete Event", type="secondary"):
                         try:
                             # Delete RSVPs first to maintain referential integrity
@@ -241,6 +264,7 @@ def app():
                             conn.commit()
                             st.success("Event deleted successfully!")
                             st.session_state.view_event_details = None
+                            st.session_state.view_event_occurrence = None
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error deleting event: {e}")
@@ -248,6 +272,7 @@ def app():
                 # Back button
                 if st.button("Back to Events List"):
                     st.session_state.view_event_details = None
+                    st.session_state.view_event_occurrence = None
                     st.rerun()
             
             else:
@@ -258,64 +283,34 @@ def app():
             conn.close()
             
         else:
-            # Display events based on filter
-            conn = sqlite3.connect('community.db')
-            cursor = conn.cursor()
+            # Expand recurring series into the occurrence index up to this window
+            horizon = range_end or (today + timedelta(days=DEFAULT_HORIZON_DAYS)).strftime('%Y-%m-%d')
+            materialize_occurrences(horizon)
             
-            cursor.execute(events_query, params)
-            events = cursor.fetchall()
+            # Rendered once per (view, range, data version) and reused across reruns
+            calendar_html, event_options = get_calendar(
+                view_option, range_start, range_end, events_data_version(), today=today
+            )
             
-            if not events:
+            if not event_options:
                 st.info("No events found for the selected period.")
             else:
-                # Create a simple calendar view
-                events_df = pd.DataFrame(events, columns=["id", "title", "date", "time", "location", "organizer"])
+                st.markdown(calendar_html, unsafe_allow_html=True)
                 
-                if view_option in ["Week", "Month"]:
-                    # Group events by date
-                    unique_dates = sorted(events_df["date"].unique())
-                    
-                    for date in unique_dates:
-                        st.subheader(f"Events on {date}")
-                        
-                        day_events = events_df[events_df["date"] == date]
-                        
-                        for _, event in day_events.iterrows():
-                            col1, col2 = st.columns([2, 1])
-                            
-                            with col1:
-                                st.write(f"**{event['title']}**")
-                                st.write(f"Time: {event['time']} | Location: {event['location']}")
-                            
-                            with col2:
-                                if st.button("View Details", key=f"view_{event['id']}"):
-                                    st.session_state.view_event_details = event['id']
-                                    st.rerun()
-                        
-                        st.markdown("---")
-                else:
-                    # Day or All view - simpler list
-                    for _, event in events_df.iterrows():
-                        cols = st.columns([2, 2, 1])
-                        
-                        with cols[0]:
-                            st.write(f"**{event['title']}**")
-                            st.write(f"Organizer: {event['organizer']}")
-                        
-                        with cols[1]:
-                            if view_option == "All Upcoming":
-                                st.write(f"Date: {event['date']}")
-                            st.write(f"Time: {event['time']}")
-                            st.write(f"Location: {event['location']}")
-                        
-                        with cols[2]:
-                            if st.button("View Details", key=f"view_{event['id']}"):
-                                st.session_state.view_event_details = event['id']
-                                st.rerun()
-                        
-                        st.markdown("---")
-            
-            conn.close()
+                # A single picker replaces one button per event card
+                st.markdown("---")
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    selected_event = st.selectbox(
+                        "Open event",
+                        event_options,
+                        format_func=lambda option: option[1]
+                    )
+                with col2:
+                    st.write("")
+                    if st.button("View Details", key="view_selected_event"):
+                        st.session_state.view_event_details, st.session_state.view_event_occurrence = selected_event[0]
+                        st.rerun()
     
     with tab2:
         st.subheader("Create a New Event")
@@ -333,38 +328,49 @@ def app():
                 event_time = st.time_input("Event Time")
             
             event_location = st.text_input("Location")
+            event_capacity = st.number_input("Capacity (0 for unlimited)", min_value=0, value=0, step=1)
+            
+            # Recurrence: stored once on the event and expanded on demand
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                repeat_option = st.selectbox("Repeats", ["Does not repeat", "Daily", "Weekly", "Monthly"])
+            with col2:
+                repeat_interval = st.number_input("Every", min_value=1, max_value=52, value=1, step=1)
+            with col3:
+                repeat_until = st.date_input("Repeat until (optional)", value=None, min_value=today)
             
             submit_event = st.form_submit_button("Create Event")
             
             if submit_event:
                 if event_title and event_description and event_location:
                     try:
-                        conn = sqlite3.connect('community.db')
+                        conn = get_connection()
                         cursor = conn.cursor()
                         
                         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                         event_date_str = event_date.strftime('%Y-%m-%d')
                         event_time_str = event_time.strftime('%H:%M:%S')
                         
+                        recurrence_rule = None if repeat_option == "Does not repeat" else repeat_option.lower()
+                        
                         cursor.execute("""
                             INSERT INTO events (user_id, title, description, event_date, event_time, 
-                                              location, created_at)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                                              location, capacity, recurrence_rule, recurrence_interval,
+                                              recurrence_until, created_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         """, (st.session_state.user_id, event_title, event_description, 
-                              event_date_str, event_time_str, event_location, now))
+                              event_date_str, event_time_str, event_location,
+                              int(event_capacity) or None, recurrence_rule, int(repeat_interval),
+                              repeat_until.strftime('%Y-%m-%d') if recurrence_rule and repeat_until else None,
+                              now))
                         
                         conn.commit()
-                        
-                        # Auto-RSVP the creator as attending
                         event_id = cursor.lastrowid
-                        cursor.execute("""
-                            INSERT INTO rsvps (event_id, user_id, status, created_at)
-                            VALUES (?, ?, ?, ?)
-                        """, (event_id, st.session_state.user_id, "attending", now))
-                        
-                        conn.commit()
                         conn.close()
                         
+                        # Auto-RSVP the creator as attending
+                        set_rsvp(event_id, st.session_state.user_id, "attending")
+                        
                         st.success("Event created successfully!")
                     except Exception as e:
                         st.error(f"Error creating event: {e}")
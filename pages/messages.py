@@ -1,6 +1,14 @@
 import streamlit as st
-import sqlite3
+import html
+from utils.cache import cached, invalidate
+from utils.database import get_connection
 from datetime import datetime
+from utils.render_metrics import timed_page
+from utils.stylesheet import inject_stylesheet
+from utils.user_directory import user_picker
+
+# Messages shown per window of a conversation; "Show earlier messages" adds another
+MESSAGE_WINDOW = 50
 
 # Initialize session state
 if 'authenticated' not in st.session_state:
@@ -12,30 +20,11 @@ if 'username' not in st.session_state:
 if 'role' not in st.session_state:
     st.session_state.role = None
 
-def app():
-    st.title("Direct Messages")
-    
-    if not st.session_state.authenticated:
-        st.warning("Please login to use the messaging system.")
-        st.stop()
-    
-    # Initialize session state for selected user conversation
-    if 'selected_conversation' not in st.session_state:
-        st.session_state.selected_conversation = None
-    
-    # Get list of users for messaging
-    conn = sqlite3.connect('community.db')
+@cached(tags=('users', 'messages:{0}'))
+def conversation_summary(user_id):
+    """Every other member with the time of the latest message exchanged and the unread count."""
+    conn = get_connection()
     cursor = conn.cursor()
-    
-    # Get all users except current user
-    cursor.execute("""
-        SELECT id, username FROM users 
-        WHERE id != ? 
-        ORDER BY username
-    """, (st.session_state.user_id,))
-    users = cursor.fetchall()
-    
-    # Get conversation summary (latest message with each user)
     cursor.execute("""
         SELECT 
             u.id,
@@ -49,8 +38,76 @@ def app():
         WHERE u.id != ?
         GROUP BY u.id
         ORDER BY latest_time DESC NULLS LAST, u.username
-    """, (st.session_state.user_id, st.session_state.user_id, st.session_state.user_id, st.session_state.user_id))
+    """, (user_id, user_id, user_id, user_id))
     conversations = cursor.fetchall()
+    conn.close()
+    return conversations
+
+def last_message_id(cursor, user_id, other_id):
+    """Id of the newest message between two users, None if they haven't exchanged any."""
+    cursor.execute("""
+        SELECT MAX(id) FROM messages
+        WHERE (sender_id = ? AND receiver_id = ?) OR (sender_id = ? AND receiver_id = ?)
+    """, (user_id, other_id, other_id, user_id))
+    return cursor.fetchone()[0]
+
+def _bubble(content, created_at, mine):
+    # Escaped and kept on one line: a blank line would end the HTML block
+    # and hand the rest of the conversation to the markdown parser
+    text = html.escape(content).replace('\r\n', '\n').replace('\n', '<br>')
+    side = 'mine' if mine else 'theirs'
+    return f'<div class="msg msg-{side}"><p>{text}</p><small>{html.escape(str(created_at))}</small></div>'
+
+@cached()
+def conversation_html(user_id, other_id, last_id, limit):
+    """
+    The latest `limit` messages up to `last_id` between two users as one
+    HTML block, as seen by user_id, and whether older messages exist. A new
+    message changes last_id, so entries never need invalidating.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT * FROM (
+            SELECT id, sender_id, content, created_at FROM messages
+            WHERE sender_id = ? AND receiver_id = ? AND id <= ?
+            ORDER BY created_at DESC LIMIT ?
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT id, sender_id, content, created_at FROM messages
+            WHERE sender_id = ? AND receiver_id = ? AND id <= ?
+            ORDER BY created_at DESC LIMIT ?
+        )
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    """, (user_id, other_id, last_id, limit + 1, other_id, user_id, last_id, limit + 1, limit + 1))
+    rows = cursor.fetchall()
+    conn.close()
+    has_earlier = len(rows) > limit
+    bubbles = [_bubble(content, created_at, sender_id == user_id)
+               for _, sender_id, content, created_at in reversed(rows[:limit])]
+    return f'<div class="msg-thread">{"".join(bubbles)}</div>', has_earlier
+
+@timed_page("messages")
+def app():
+    st.title("Direct Messages")
+    
+    if not st.session_state.authenticated:
+        st.warning("Please login to use the messaging system.")
+        st.stop()
+    
+    # Initialize session state for selected user conversation
+    if 'selected_conversation' not in st.session_state:
+        st.session_state.selected_conversation = None
+    if 'message_window' not in st.session_state:
+        st.session_state.message_window = MESSAGE_WINDOW
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # Get conversation summary (latest message with each user)
+    conversations = conversation_summary(st.session_state.user_id)
     
     # Layout with sidebar for conversations list
     st.sidebar.subheader("Conversations")
@@ -71,16 +128,16 @@ def app():
         
         if st.sidebar.button(button_label, key=f"convo_{user_id}"):
             st.session_state.selected_conversation = user_id
+            st.session_state.message_window = MESSAGE_WINDOW
             st.rerun()
     
     # Main content area - display selected conversation or new message form
     if st.session_state.selected_conversation == "new":
         st.subheader("New Message")
         
-        # User selection dropdown
-        selected_user = st.selectbox("Select User", 
-                                   [(u[0], u[1]) for u in users],
-                                   format_func=lambda x: x[1])
+        # Typeahead user search; only matching users are loaded
+        selected_user = user_picker("Find User", key="new_message_user",
+                                    exclude_id=st.session_state.user_id)
         
         # Message input
         with st.form("new_message_form", clear_on_submit=True):
@@ -95,10 +152,12 @@ def app():
                         VALUES (?, ?, ?, ?, ?)
                     """, (st.session_state.user_id, selected_user[0], message_text, 0, now))
                     conn.commit()
+                    invalidate(f"messages:{st.session_state.user_id}", f"messages:{selected_user[0]}")
                     
                     st.success(f"Message sent to {selected_user[1]}!")
                     # Switch to the conversation with this user
                     st.session_state.selected_conversation = selected_user[0]
+                    st.session_state.message_window = MESSAGE_WINDOW
                     st.rerun()
                 except Exception as e:
                     st.error(f"Error sending message: {e}")
@@ -111,16 +170,9 @@ def app():
         if conversation_user:
             st.subheader(f"Conversation with {conversation_user[0]}")
             
-            # Get messages for this conversation
-            cursor.execute("""
-                SELECT m.id, m.sender_id, m.content, m.is_read, m.created_at, u.username
-                FROM messages m
-                JOIN users u ON m.sender_id = u.id
-                WHERE (m.sender_id = ? AND m.receiver_id = ?) OR (m.sender_id = ? AND m.receiver_id = ?)
-                ORDER BY m.created_at
-            """, (st.session_state.user_id, st.session_state.selected_conversation, 
-                  st.session_state.selected_conversation, st.session_state.user_id))
-            messages = cursor.fetchall()
+            # Only the newest id is read on each run; the rendered window is
+            # cached until a message arrives
+            last_id = last_message_id(cursor, st.session_state.user_id, st.session_state.selected_conversation)
             
             # Mark unread messages as read
             cursor.execute("""
@@ -128,43 +180,23 @@ def app():
                 SET is_read = 1
                 WHERE sender_id = ? AND receiver_id = ? AND is_read = 0
             """, (st.session_state.selected_conversation, st.session_state.user_id))
+            marked_read = cursor.rowcount
             conn.commit()
+            if marked_read:
+                invalidate(f"messages:{st.session_state.user_id}")
             
-            # Display messages
-            message_container = st.container()
-            
-            with message_container:
-                if not messages:
-                    st.info("No messages yet. Start the conversation!")
-                else:
-                    for msg in messages:
-                        msg_id, sender_id, content, is_read, created_at, sender_name = msg
-                        
-                        # Style the message based on sender
-                        if sender_id == st.session_state.user_id:
-                            # Message from current user
-                            col1, col2 = st.columns([4, 1])
-                            with col1:
-                                st.markdown(f"""
-                                <div style="background-color: #E1F5FE; padding: 10px; border-radius: 10px; margin-bottom: 10px;">
-                                    <p>{content}</p>
-                                    <small>{created_at}</small>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            with col2:
-                                st.write("")
-                        else:
-                            # Message from the other user
-                            col1, col2 = st.columns([1, 4])
-                            with col1:
-                                st.write("")
-                            with col2:
-                                st.markdown(f"""
-                                <div style="background-color: #F5F5F5; padding: 10px; border-radius: 10px; margin-bottom: 10px;">
-                                    <p>{content}</p>
-                                    <small>{created_at}</small>
-                                </div>
-                                """, unsafe_allow_html=True)
+            # Display messages as a single HTML element
+            if last_id is None:
+                st.info("No messages yet. Start the conversation!")
+            else:
+                thread, has_earlier = conversation_html(st.session_state.user_id,
+                                                        st.session_state.selected_conversation,
+                                                        last_id, st.session_state.message_window)
+                if has_earlier and st.button("Show earlier messages"):
+                    st.session_state.message_window += MESSAGE_WINDOW
+                    st.rerun()
+                inject_stylesheet("messages")
+                st.markdown(thread, unsafe_allow_html=True)
             
             # Reply form
             with st.form("reply_form", clear_on_submit=True):
@@ -179,6 +211,8 @@ def app():
                             VALUES (?, ?, ?, ?, ?)
                         """, (st.session_state.user_id, st.session_state.selected_conversation, reply_text, 0, now))
                         conn.commit()
+                        invalidate(f"messages:{st.session_state.user_id}",
+                                   f"messages:{st.session_state.selected_conversation}")
                         
                         st.success("Message sent!")
                         st.rerun()
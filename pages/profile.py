@@ -1,9 +1,10 @@
 import streamlit as st
-import sqlite3
-from PIL import Image
+from utils.database import get_connection
 import os
 from utils.auth import get_user_profile, update_profile
 from utils.file_handler import save_profile_photo
+from utils.render_metrics import timed_page
+from utils.user_directory import get_user_stats
 
 # Initialize session state
 if 'authenticated' not in st.session_state:
@@ -15,6 +16,7 @@ if 'username' not in st.session_state:
 if 'role' not in st.session_state:
     st.session_state.role = None
 
+@timed_page("profile")
 def app():
     st.title("User Profile")
     
@@ -38,8 +40,7 @@ def app():
         st.subheader("Profile Photo")
         if photo_path and os.path.exists(photo_path):
             try:
-                img = Image.open(photo_path)
-                st.image(img, width=200)
+                st.image(photo_path, width=200)
             except Exception as e:
                 st.error(f"Error loading profile image: {e}")
                 st.image("https://via.placeholder.com/200?text=No+Photo", width=200)
@@ -77,10 +78,19 @@ def app():
     st.markdown("---")
     st.header("Your Activity")
     
+    # Activity counts come from the maintained user_stats row
+    stats = get_user_stats(st.session_state.user_id)
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Discussions", stats['discussions'])
+    col2.metric("Comments", stats['comments'])
+    col3.metric("Events Created", stats['events'])
+    col4.metric("Attending", stats['attending'])
+    col5.metric("Resources", stats['resources'])
+    
     tab1, tab2, tab3 = st.tabs(["Discussions", "Events", "Resources"])
     
     with tab1:
-        conn = sqlite3.connect('community.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, title, category, created_at 
@@ -98,7 +108,7 @@ def app():
         conn.close()
     
     with tab2:
-        conn = sqlite3.connect('community.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Events created by user
@@ -137,7 +147,7 @@ def app():
         conn.close()
     
     with tab3:
-        conn = sqlite3.connect('community.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, title, resource_type, created_at 
@@ -1,8 +1,10 @@
 import streamlit as st
-import sqlite3
+from utils.cache import cached
+from utils.database import get_connection
 from datetime import datetime
 import os
 from utils.file_handler import save_resource_file, save_resource_link
+from utils.render_metrics import timed_page
 
 # Initialize session state
 if 'authenticated' not in st.session_state:
@@ -14,6 +16,17 @@ if 'username' not in st.session_state:
 if 'role' not in st.session_state:
     st.session_state.role = None
 
+@cached(tags=('resources',))
+def resource_types():
+    """Resource types in use, for the filter."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT resource_type FROM resources ORDER BY resource_type")
+    types = [t[0] for t in cursor.fetchall()]
+    conn.close()
+    return types
+
+@timed_page("resources")
 def app():
     st.title("Community Resources")
     
@@ -25,11 +38,7 @@ def app():
     st.sidebar.subheader("Filter Resources")
     
     # Get resource types for filter
-    conn = sqlite3.connect('community.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT resource_type FROM resources ORDER BY resource_type")
-    types = [t[0] for t in cursor.fetchall()]
-    conn.close()
+    types = resource_types()
     
     # Add "All" option to types
     types = ["All"] + (types if types else ["File", "Link", "Note"])
@@ -83,7 +92,7 @@ def app():
             query += " ORDER BY r.title ASC"
         
         # Execute query and display results
-        conn = sqlite3.connect('community.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute(query, params)
         resources = cursor.fetchall()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+
+# Command-line entry point for checking and rebuilding the user_stats
+# counters from the content tables they summarize.
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild the per-user activity counters.")
+    parser.add_argument("--db", default="community.db", help="Path to the SQLite database")
+    parser.add_argument("--check", action="store_true",
+                        help="Only report drift; exit with status 1 if any counter is wrong")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if no drift is found")
+    parser.add_argument("--show", type=int, default=20, help="Number of drifted counters to list")
+    args = parser.parse_args()
+
+    os.environ["COMMUNITY_DB"] = args.db
+    from utils.database import get_connection, find_user_stats_drift, rebuild_user_stats
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    drift = find_user_stats_drift(cursor)
+    drift_count = len(drift['mismatched']) + len(drift['missing']) + len(drift['orphaned'])
+
+    print(f"{len(drift['mismatched'])} mismatched counters, {len(drift['missing'])} users without counters, "
+          f"{len(drift['orphaned'])} counters for deleted users")
+    for user_id, column, stored, expected in drift['mismatched'][:args.show]:
+        print(f"  user {user_id}: {column} is {stored}, expected {expected}")
+
+    if args.check:
+        conn.close()
+        sys.exit(1 if drift_count else 0)
+
+    if drift_count or args.force:
+        # Rebuild in one write transaction so readers never see partial counters
+        cursor.execute("BEGIN IMMEDIATE")
+        rebuild_user_stats(cursor)
+        conn.commit()
+        print("Rebuilt user_stats")
+    else:
+        print("user_stats is up to date; nothing to rebuild")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import sqlite3
+from utils.database import get_connection
 import hashlib
 import os
 import secrets
@@ -13,7 +13,7 @@ def hash_password(password, salt=None):
 
 def authenticate(username, password):
     """Authenticate a user with username and password."""
-    conn = sqlite3.connect('community.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Get user with matching username
@@ -39,7 +39,7 @@ def authenticate(username, password):
 
 def create_user(username, email, password, role="user"):
     """Create a new user account."""
-    conn = sqlite3.connect('community.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Check if username or email already exists
@@ -71,7 +71,7 @@ def create_user(username, email, password, role="user"):
 
 def is_admin(user_id):
     """Check if a user has admin role."""
-    conn = sqlite3.connect('community.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('SELECT role FROM users WHERE id = ?', (user_id,))
@@ -84,7 +84,7 @@ def is_admin(user_id):
 
 def get_user_profile(user_id):
     """Get a user's profile information."""
-    conn = sqlite3.connect('community.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -100,7 +100,7 @@ def get_user_profile(user_id):
 
 def update_profile(user_id, bio, interests, photo_path=None):
     """Update a user's profile information."""
-    conn = sqlite3.connect('community.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     if photo_path:
@@ -0,0 +1,201 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from utils.auth import hash_password
+from utils.database import get_connection, write_transaction
+from utils.maintenance import request_task
+
+IMPORT_FIELDS = ("username", "email", "password", "role", "bio", "interests")
+REQUIRED_FIELDS = ("username", "email", "password")
+USER_ROLES = ("user", "admin")
+
+EXPORT_COLUMNS = ("id", "username", "email", "role", "created_at", "last_login", "bio", "interests")
+
+def detect_format(file_name):
+    """Guess 'csv' or 'jsonl' from a file name."""
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return 'csv'
+
+def read_user_rows(stream, file_format='csv'):
+    """
+    Lazily yield (line_number, row_dict) from a CSV or JSONL text stream.
+    Rows that can't be parsed are yielded as (line_number, error_message).
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key.strip().lower(): (value or "").strip()
+                                    for key, value in row.items() if key}
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, "Expected a JSON object"
+                continue
+            yield line_number, {str(key).lower(): str(value).strip()
+                                for key, value in row.items() if value is not None}
+    else:
+        raise ValueError(f"Unknown import format: {file_format}")
+
+def _validate(row, seen_usernames, seen_emails):
+    """Return an error message for a row, or None if it can be imported."""
+    missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+    if missing:
+        return f"Missing {', '.join(missing)}"
+    if '@' not in row['email']:
+        return "Invalid email address"
+    # A blank role cell means 'user', as in _insert_batch
+    if (row.get('role') or 'user') not in USER_ROLES:
+        return f"Unknown role '{row['role']}'"
+    if row['username'] in seen_usernames:
+        return "Duplicate username in file"
+    if row['email'] in seen_emails:
+        return "Duplicate email in file"
+    return None
+
+def _hash_passwords(passwords, pool):
+    if pool is None:
+        return [hash_password(password) for password in passwords]
+    return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+def _insert_batch(batch, created_at):
+    """
+    Insert one batch of validated, hashed rows in a single write transaction.
+    Rows that clash with existing accounts are skipped and returned as errors.
+    """
+    errors = []
+    with write_transaction() as conn:
+        usernames = [row['username'] for _, row, _ in batch]
+        emails = [row['email'] for _, row, _ in batch]
+        taken_usernames = {r[0] for r in conn.execute(
+            f"SELECT username FROM users WHERE username IN ({', '.join('?' * len(usernames))})", usernames)}
+        taken_emails = {r[0] for r in conn.execute(
+            f"SELECT email FROM users WHERE email IN ({', '.join('?' * len(emails))})", emails)}
+
+        users = []
+        profiles = []
+        for line_number, row, (password_hash, salt) in batch:
+            if row['username'] in taken_usernames:
+                errors.append((line_number, row['username'], "Username already exists"))
+            elif row['email'] in taken_emails:
+                errors.append((line_number, row['username'], "Email already exists"))
+            else:
+                users.append((row['username'], row['email'], password_hash, salt,
+                              row.get('role') or 'user', created_at))
+                profiles.append((row.get('bio', ''), row.get('interests', ''), row['username']))
+
+        conn.executemany("""
+            INSERT INTO users (username, email, password, salt, role, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, users)
+        conn.executemany("""
+            INSERT INTO profiles (user_id, bio, interests)
+            SELECT id, ?, ? FROM users WHERE username = ?
+        """, profiles)
+    return len(users), errors
+
+def import_users(stream, file_format='csv', batch_size=2000, hash_workers=0, progress=None):
+    """
+    Create accounts and empty profiles from a CSV or JSONL stream.
+
+    Rows are validated, their passwords hashed (in a process pool when
+    hash_workers > 0) and inserted with executemany, one short transaction
+    per batch. Bad rows never stop the import; they are reported instead.
+    Returns {'rows': n, 'created': n, 'errors': [(line_number, username, message)]}.
+    """
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    result = {'rows': 0, 'created': 0, 'errors': []}
+    seen_usernames = set()
+    seen_emails = set()
+    pending = []
+    pool = ProcessPoolExecutor(max_workers=hash_workers) if hash_workers else None
+
+    def flush():
+        hashes = _hash_passwords([row['password'] for _, row in pending], pool)
+        created, errors = _insert_batch([(line, row, h) for (line, row), h in zip(pending, hashes)], created_at)
+        result['created'] += created
+        result['errors'].extend(errors)
+        pending.clear()
+        if progress:
+            progress(result)
+
+    try:
+        for line_number, row in read_user_rows(stream, file_format):
+            result['rows'] += 1
+            if isinstance(row, str):
+                result['errors'].append((line_number, None, row))
+                continue
+            error = _validate(row, seen_usernames, seen_emails)
+            if error:
+                result['errors'].append((line_number, row.get('username'), error))
+                continue
+            seen_usernames.add(row['username'])
+            seen_emails.add(row['email'])
+            pending.append((line_number, row))
+            if len(pending) >= batch_size:
+                flush()
+        if pending:
+            flush()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    result['errors'].sort(key=lambda error: error[0])
+    if result['created']:
+        # Let the planner see the new row counts
+        request_task('optimize')
+    return result
+
+def iter_user_export(file_format='csv', batch_size=5000):
+    """
+    Stream the user directory as CSV or JSONL text chunks, one chunk per
+    fetched batch, without loading every user into memory. Passwords and
+    salts are never exported.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.execute("""
+            SELECT u.id, u.username, u.email, u.role, u.created_at, u.last_login, p.bio, p.interests
+            FROM users u
+            LEFT JOIN profiles p ON p.user_id = u.id
+            ORDER BY u.id
+        """)
+        if file_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if file_format == 'csv':
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+        if file_format == 'csv' and buffer.getvalue():
+            # Header only, for an empty directory
+            yield buffer.getvalue()
+    finally:
+        conn.close()
+
+def format_errors_csv(errors):
+    """Per-row import errors as CSV text for download."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(("line", "username", "error"))
+    writer.writerows(errors)
+    return buffer.getvalue()
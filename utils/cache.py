@@ -0,0 +1,148 @@
+import functools
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from utils.database import get_connection
+
+# Process-wide read-through cache for slowly changing query results, shared
+# by every session. Entries are evicted least recently used first once the
+# pickled size of all values passes CACHE_MAX_MB, and expire after their TTL.
+CACHE_MAX_BYTES = int(float(os.environ.get('CACHE_MAX_MB', '64')) * 1024 * 1024)
+DEFAULT_TTL_SECONDS = 300
+
+# Tags are rows of the data_versions table, bumped by triggers or by
+# invalidate(). An entry is stale once any of its tags has moved on. Each
+# process re-reads a tag's version at most this often, so a write made in
+# another worker shows up here within that window.
+VERSION_CHECK_SECONDS = float(os.environ.get('CACHE_VERSION_CHECK_SECONDS', '1'))
+
+_entries = OrderedDict()
+_bytes = 0
+_sites = {}
+_versions = {}
+_lock = threading.Lock()
+
+def _site(name):
+    site = _sites.get(name)
+    if site is None:
+        site = _sites[name] = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'uncacheable': 0}
+    return site
+
+def _drop(key):
+    global _bytes
+    entry = _entries.pop(key)
+    _bytes -= entry['size']
+    return entry
+
+def _tag_versions(tags):
+    """Current version of each tag, re-reading from the database only those not checked recently."""
+    now = time.monotonic()
+    with _lock:
+        stale = [tag for tag in tags
+                 if tag not in _versions or now - _versions[tag][1] >= VERSION_CHECK_SECONDS]
+    if stale:
+        conn = get_connection()
+        placeholders = ','.join('?' * len(stale))
+        found = dict(conn.execute(f'SELECT name, version FROM data_versions WHERE name IN ({placeholders})',
+                                  stale).fetchall())
+        conn.close()
+        with _lock:
+            for tag in stale:
+                _versions[tag] = (found.get(tag, 0), now)
+    with _lock:
+        return tuple(_versions[tag][0] for tag in tags)
+
+def _lookup(name, key, tags, ttl, compute):
+    global _bytes
+    versions = _tag_versions(tags)
+    now = time.monotonic()
+    with _lock:
+        site = _site(name)
+        entry = _entries.get(key)
+        if entry is not None:
+            if entry['versions'] == versions and entry['expires'] > now:
+                site['hits'] += 1
+                _entries.move_to_end(key)
+                return entry['value']
+            _drop(key)
+        site['misses'] += 1
+
+    value = compute()
+    size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    with _lock:
+        if size > CACHE_MAX_BYTES:
+            site['uncacheable'] += 1
+            return value
+        if key in _entries:
+            _drop(key)
+        _entries[key] = {'name': name, 'value': value, 'tags': tags, 'versions': versions,
+                         'expires': now + ttl, 'size': size}
+        _bytes += size
+        while _bytes > CACHE_MAX_BYTES:
+            oldest = next(iter(_entries))
+            _site(_drop(oldest)['name'])['evictions'] += 1
+    return value
+
+def cached(tags=(), ttl=DEFAULT_TTL_SECONDS, name=None):
+    """
+    Decorator caching a function's result per arguments. `tags` name the
+    data the result depends on; a tag may use the call's arguments as
+    format fields, e.g. 'messages:{0}' for a per-user tag. Results are shared
+    across sessions, so callers must not mutate them.
+    """
+    def decorator(func):
+        site = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (site, args, tuple(sorted(kwargs.items())))
+            entry_tags = tuple(tag.format(*args, **kwargs) for tag in tags)
+            return _lookup(site, key, entry_tags, ttl, lambda: func(*args, **kwargs))
+
+        wrapper.cache_site = site
+        return wrapper
+    return decorator
+
+def invalidate(*tags):
+    """
+    Mark everything cached under these tags as stale, in this process at
+    once and in other processes on their next version check. Call after
+    the write has committed.
+    """
+    conn = get_connection()
+    conn.executemany("""
+        INSERT INTO data_versions (name, version) VALUES (?, 1)
+        ON CONFLICT (name) DO UPDATE SET version = version + 1
+    """, [(tag,) for tag in tags])
+    conn.commit()
+    conn.close()
+    tags = set(tags)
+    with _lock:
+        for tag in tags:
+            _versions.pop(tag, None)
+        for key in [key for key, entry in _entries.items() if tags.intersection(entry['tags'])]:
+            _site(_drop(key)['name'])['invalidations'] += 1
+
+def clear_cache():
+    """Drop every entry (counters are kept)."""
+    global _bytes
+    with _lock:
+        _entries.clear()
+        _versions.clear()
+        _bytes = 0
+
+def cache_stats():
+    """Totals and, per cached function, hits, misses, evictions, invalidations and current entries."""
+    with _lock:
+        per_site = {name: dict(counters, entries=0, bytes=0) for name, counters in _sites.items()}
+        for entry in _entries.values():
+            per_site[entry['name']]['entries'] += 1
+            per_site[entry['name']]['bytes'] += entry['size']
+        total_bytes, total_entries = _bytes, len(_entries)
+    sites = []
+    for name, site in sorted(per_site.items()):
+        lookups = site['hits'] + site['misses']
+        sites.append(dict(site, name=name, hit_rate=site['hits'] / lookups if lookups else 0.0))
+    return {'max_bytes': CACHE_MAX_BYTES, 'bytes': total_bytes, 'entries': total_entries, 'sites': sites}
@@ -0,0 +1,148 @@
+import calendar
+import html
+from itertools import groupby
+import streamlit as st
+from utils.database import get_connection, get_data_version
+from utils.recurrence import describe_recurrence
+
+EVENT_COLUMNS = ("id", "title", "date", "time", "location", "organizer", "attending",
+                 "recurrence_rule", "recurrence_interval", "recurrence_until")
+
+CALENDAR_CSS = """
+<style>
+    .cal-grid { width: 100%; border-collapse: collapse; table-layout: fixed; margin-bottom: 1rem; }
+    .cal-grid th { padding: 0.3rem; font-size: 0.8rem; color: #666; text-align: left; }
+    .cal-grid td { vertical-align: top; height: 5.5rem; padding: 0.3rem; border: 1px solid #eee; font-size: 0.8rem; }
+    .cal-grid td.cal-outside { background: #fafafa; color: #bbb; }
+    .cal-grid td.cal-today { border: 2px solid #4361EE; }
+    .cal-day-number { font-weight: 600; margin-bottom: 0.2rem; }
+    .cal-chip { background: rgba(67, 97, 238, 0.1); border-radius: 4px; padding: 1px 4px; margin-bottom: 2px;
+                white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+    .cal-more { color: #888; font-size: 0.75rem; }
+    .cal-day-heading { font-size: 1.1rem; font-weight: 600; margin: 1rem 0 0.5rem 0; color: #2c3e50; }
+    .cal-event { border-left: 4px solid #4361EE; background: white; padding: 0.5rem 0.8rem; margin-bottom: 0.5rem;
+                 border-radius: 6px; box-shadow: 0 1px 3px rgba(0,0,0,0.08); }
+    .cal-event-title { font-weight: 600; }
+    .cal-event-meta { font-size: 0.85rem; color: #555; }
+    @media (max-width: 640px) {
+        .cal-grid td { height: 3.5rem; font-size: 0.7rem; }
+        .cal-chip { display: none; }
+    }
+</style>
+"""
+
+def load_events(start_date, end_date=None):
+    """
+    Fetch event occurrences between start_date and end_date (inclusive;
+    open-ended when end_date is None), already sorted by date and time.
+    Recurring events must be materialized up to end_date beforehand
+    (see utils.recurrence.materialize_occurrences).
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    query = """
+        SELECT e.id, e.title, o.occurrence_date, e.event_time, e.location, u.username,
+               COALESCE(s.attending, 0), e.recurrence_rule, e.recurrence_interval, e.recurrence_until
+        FROM event_occurrences o
+        JOIN events e ON e.id = o.event_id
+        JOIN users u ON e.user_id = u.id
+        LEFT JOIN event_stats s ON s.event_id = e.id
+        WHERE o.occurrence_date >= ?
+    """
+    params = [start_date]
+    if end_date is not None:
+        query += " AND o.occurrence_date <= ?"
+        params.append(end_date)
+    query += " ORDER BY o.occurrence_date ASC, e.event_time ASC"
+    cursor.execute(query, params)
+    events = [dict(zip(EVENT_COLUMNS, row)) for row in cursor.fetchall()]
+    conn.close()
+    return events
+
+def bucket_events_by_day(events):
+    """
+    Group date-sorted events into day buckets in a single pass.
+    Returns a list of (date, [events]) in date order.
+    """
+    return [(date, list(day_events)) for date, day_events in groupby(events, key=lambda e: e["date"])]
+
+def _event_card(event, show_date):
+    meta = []
+    if show_date:
+        meta.append(f"Date: {html.escape(event['date'])}")
+    meta.append(f"Time: {html.escape(str(event['time']))}")
+    meta.append(f"Location: {html.escape(event['location'])}")
+    meta.append(f"Organizer: {html.escape(event['organizer'])}")
+    meta.append(f"Attending: {event['attending']}")
+    repeats = describe_recurrence(event["recurrence_rule"], event["recurrence_interval"], event["recurrence_until"])
+    if repeats:
+        meta.append(f"Repeats: {html.escape(repeats)}")
+    return (
+        '<div class="cal-event">'
+        f'<div class="cal-event-title">{html.escape(event["title"])}</div>'
+        f'<div class="cal-event-meta">{" | ".join(meta)}</div>'
+        '</div>'
+    )
+
+def render_event_list(buckets, group_by_day=True, show_date=False):
+    """Render day buckets as one HTML block of event cards."""
+    parts = []
+    for date, day_events in buckets:
+        if group_by_day:
+            parts.append(f'<div class="cal-day-heading">Events on {html.escape(date)}</div>')
+        parts.extend(_event_card(event, show_date) for event in day_events)
+    return "".join(parts)
+
+def render_month_grid(year, month, buckets, today=None, max_per_day=3):
+    """Render a month calendar grid from precomputed day buckets."""
+    by_day = dict(buckets)
+    weeks = calendar.Calendar(firstweekday=0).monthdatescalendar(year, month)
+    parts = ['<table class="cal-grid"><tr>']
+    parts.extend(f"<th>{name}</th>" for name in calendar.day_abbr)
+    parts.append("</tr>")
+    for week in weeks:
+        parts.append("<tr>")
+        for day in week:
+            classes = []
+            if day.month != month:
+                classes.append("cal-outside")
+            if today is not None and day == today:
+                classes.append("cal-today")
+            day_events = by_day.get(day.strftime('%Y-%m-%d'), [])
+            chips = "".join(
+                f'<div class="cal-chip" title="{html.escape(e["title"])}">'
+                f'{html.escape(str(e["time"])[:5])} {html.escape(e["title"])}</div>'
+                for e in day_events[:max_per_day]
+            )
+            if len(day_events) > max_per_day:
+                chips += f'<div class="cal-more">+{len(day_events) - max_per_day} more</div>'
+            parts.append(f'<td class="{" ".join(classes)}"><div class="cal-day-number">{day.day}</div>{chips}</td>')
+        parts.append("</tr>")
+    parts.append("</table>")
+    return "".join(parts)
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def get_calendar(view, start_date, end_date, data_version, today=None):
+    """
+    Load and render a calendar view once per (view, range, data version).
+
+    Returns (html, event_options) where event_options is a list of
+    ((event_id, occurrence_date), label) tuples for the event picker.
+    """
+    events = load_events(start_date, end_date)
+    buckets = bucket_events_by_day(events)
+
+    if view == "Month":
+        year, month = int(start_date[:4]), int(start_date[5:7])
+        body = render_month_grid(year, month, buckets, today=today) + render_event_list(buckets)
+    elif view == "Week":
+        body = render_event_list(buckets)
+    else:
+        body = render_event_list(buckets, group_by_day=False, show_date=(view == "All Upcoming"))
+
+    options = [((e["id"], e["date"]), f"{e['date']} {str(e['time'])[:5]} - {e['title']}") for e in events]
+    return (CALENDAR_CSS + body if events else ""), options
+
+def events_data_version():
+    """Current version of the events data, bumped on every event or RSVP change."""
+    return get_data_version("events")
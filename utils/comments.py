@@ -0,0 +1,234 @@
+import html
+import streamlit as st
+from datetime import datetime
+from utils.cache import cached, invalidate
+from utils.database import COMMENT_MAX_DEPTH, get_connection
+from utils.stylesheet import inject_stylesheet
+
+# Top-level comments per page of a thread
+COMMENTS_PER_PAGE = 50
+
+# Replies loaded at a time when a collapsed thread is opened
+REPLIES_PER_LOAD = 100
+
+# Pages of top-level comments are addressed by a keyset cursor on their
+# materialized path, (discussion_id, direction, path), rather than an
+# offset, so a page deep into a long thread costs the same index range scan
+# as the first one:
+#   first / last   - the oldest or newest page
+#   after / before - the page after or before the comment at `path`
+_PAGE_QUERIES = {
+    'first': ("", "ASC"),
+    'after': ("AND c.path > ?", "ASC"),
+    'before': ("AND c.path < ?", "DESC"),
+    'last': ("", "DESC"),
+}
+
+def _text_html(text):
+    # Escaped and kept on one line: a blank line would end the HTML block
+    # and hand the rest of the page to the markdown parser
+    return html.escape(text).replace('\r\n', '\n').replace('\n', '<br>')
+
+def _comment_html(comment_id, username, content, created_at, depth, orphaned):
+    note = '<div class="comment-meta">In reply to a deleted comment</div>' if orphaned else ''
+    return (f'<div class="comment depth-{depth}" id="comment-{comment_id}">{note}'
+            f'<div class="comment-meta"><b>{html.escape(username)}</b> on {html.escape(created_at[:16])}</div>'
+            f'<p>{_text_html(content)}</p></div>')
+
+def _comments(rows, root_depth=0):
+    """(id, username, content, created_at, path, parent_id, parent_exists, reply_count) rows as dicts with their html."""
+    comments = []
+    for comment_id, username, content, created_at, path, parent_id, parent_exists, reply_count in rows:
+        if parent_id is None:
+            # A path below the top level means its thread's top was deleted
+            depth, orphaned = 0, '.' in path
+        else:
+            depth, orphaned = path.count('.') - root_depth, not parent_exists
+        comments.append({
+            'id': comment_id,
+            'path': path,
+            'reply_count': reply_count,
+            'label': f"{username}: {content[:40]}",
+            'html': _comment_html(comment_id, username, content, created_at, depth, orphaned),
+        })
+    return comments
+
+_COLUMNS = """
+    SELECT c.id, u.username, c.content, c.created_at, c.path, c.parent_id, p.id IS NOT NULL, c.reply_count
+    FROM comments c
+    JOIN users u ON u.id = c.user_id
+    LEFT JOIN comments p ON p.id = c.parent_id
+"""
+
+@cached(tags=('users', 'comments:{0}'))
+def comment_page(discussion_id, direction='first', path=None, limit=COMMENTS_PER_PAGE):
+    """
+    One page of a thread's top-level comments, oldest first. Returns a dict
+    with the comments (id, path, reply_count, label, html), the paths of the
+    first and last one and whether there are earlier or later pages.
+    """
+    condition, order = _PAGE_QUERIES[direction]
+    params = [discussion_id] + ([path] if condition else []) + [limit + 1]
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        {_COLUMNS}
+        WHERE c.discussion_id = ? AND c.parent_id IS NULL {condition}
+        ORDER BY c.path {order}
+        LIMIT ?
+    """, params)
+    rows = cursor.fetchall()
+    conn.close()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if order == "DESC":
+        rows.reverse()
+        has_earlier, has_later = more, direction == 'before'
+    else:
+        has_earlier, has_later = direction == 'after', more
+    return {
+        'comments': _comments(rows),
+        'first': rows[0][4] if rows else None,
+        'last': rows[-1][4] if rows else None,
+        'has_earlier': has_earlier,
+        'has_later': has_later,
+    }
+
+@cached(tags=('users', 'comments:{0}'))
+def thread_replies(discussion_id, root_path, limit=REPLIES_PER_LOAD):
+    """
+    The replies below one comment, depth-first, from a single range scan of
+    its subtree. Returns the replies as one HTML block, their ids and labels
+    and whether the subtree has more than `limit`.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    # Descendants' paths start with root_path + '.', and '/' sorts right after '.'
+    cursor.execute(f"""
+        {_COLUMNS}
+        WHERE c.discussion_id = ? AND c.path > ? AND c.path < ?
+        ORDER BY c.path
+        LIMIT ?
+    """, (discussion_id, root_path + '.', root_path + '/', limit + 1))
+    rows = cursor.fetchall()
+    conn.close()
+    replies = _comments(rows[:limit], root_depth=root_path.count('.'))
+    return {
+        'html': f'<div class="comment-list">{"".join(r["html"] for r in replies)}</div>',
+        'replies': [(r['id'], r['label']) for r in replies],
+        'has_more': len(rows) > limit,
+    }
+
+def post_comment(discussion_id, user_id, content, parent_id=None):
+    """
+    Add a comment, or a reply to parent_id. Replies below the deepest level
+    attach to their parent's parent instead. The path and the ancestors'
+    reply counters are filled in by triggers. Returns (id, id of the
+    top-level comment of its thread).
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    if parent_id is not None:
+        cursor.execute("SELECT parent_id, path FROM comments WHERE id = ? AND discussion_id = ?",
+                       (parent_id, discussion_id))
+        parent = cursor.fetchone()
+        if parent is None:
+            parent_id = None
+        elif parent[1].count('.') >= COMMENT_MAX_DEPTH - 1:
+            parent_id = parent[0]
+    cursor.execute("""
+        INSERT INTO comments (discussion_id, user_id, content, created_at, parent_id)
+        VALUES (?, ?, ?, ?, ?)
+    """, (discussion_id, user_id, content, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), parent_id))
+    comment_id = cursor.lastrowid
+    cursor.execute("SELECT path FROM comments WHERE id = ?", (comment_id,))
+    segments = cursor.fetchone()[0].split('.')
+    # Usually the first segment, unless that comment was deleted and its
+    # replies promoted to the top level
+    prefixes = ['.'.join(segments[:n]) for n in range(1, len(segments) + 1)]
+    cursor.execute(f"""
+        SELECT id FROM comments
+        WHERE discussion_id = ? AND parent_id IS NULL AND path IN ({', '.join('?' * len(prefixes))})
+    """, [discussion_id] + prefixes)
+    root_id = cursor.fetchone()[0]
+    conn.commit()
+    conn.close()
+    invalidate(f"comments:{discussion_id}")
+    return comment_id, root_id
+
+def _thread_state(discussion_id):
+    """The page cursor and open threads of this session, reset when another discussion is opened."""
+    page_cursor = st.session_state.get('comment_cursor')
+    if not page_cursor or page_cursor[0] != discussion_id:
+        page_cursor = st.session_state.comment_cursor = (discussion_id, 'first', None)
+        st.session_state.open_threads = {}
+    elif 'open_threads' not in st.session_state:
+        st.session_state.open_threads = {}
+    return page_cursor, st.session_state.open_threads
+
+def show_latest_comments(discussion_id):
+    """Open a thread on its newest page, e.g. after posting to it."""
+    st.session_state.comment_cursor = (discussion_id, 'last', None)
+    st.session_state.open_threads = {}
+
+def open_replies(discussion_id, root_id):
+    """Expand the replies under a top-level comment, e.g. after replying in it."""
+    _thread_state(discussion_id)
+    st.session_state.open_threads.setdefault(root_id, REPLIES_PER_LOAD)
+
+def render_comments(discussion_id):
+    """
+    Render the current page of a thread's top-level comments, with buttons
+    to page through them and to open each one's replies. Runs of comments
+    render as one markdown element; replies are only loaded once opened.
+    Returns (id, label) of every comment shown, for the reply picker.
+    """
+    page_cursor, open_threads = _thread_state(discussion_id)
+    page = comment_page(*page_cursor)
+
+    if not page['comments']:
+        if page_cursor[1] != 'first':
+            # The page emptied under us (comments deleted); start over
+            st.session_state.comment_cursor = (discussion_id, 'first', None)
+            st.rerun()
+        st.info("No comments yet. Be the first to comment!")
+        return []
+
+    inject_stylesheet("discussions")
+    if page['has_earlier'] and st.button("Earlier comments", key=f"comments_earlier_{discussion_id}"):
+        st.session_state.comment_cursor = (discussion_id, 'before', page['first'])
+        st.rerun()
+
+    shown = []
+    pending = []
+    for comment in page['comments']:
+        shown.append((comment['id'], comment['label']))
+        pending.append(comment['html'])
+        replies = comment['reply_count']
+        if not replies:
+            continue
+        st.markdown(f'<div class="comment-list">{"".join(pending)}</div>', unsafe_allow_html=True)
+        pending = []
+        is_open = comment['id'] in open_threads
+        label = "Hide replies" if is_open else f"Show {replies} {'reply' if replies == 1 else 'replies'}"
+        if st.button(label, key=f"replies_{comment['id']}"):
+            if is_open:
+                del open_threads[comment['id']]
+            else:
+                open_threads[comment['id']] = REPLIES_PER_LOAD
+            st.rerun()
+        if is_open:
+            thread = thread_replies(discussion_id, comment['path'], open_threads[comment['id']])
+            st.markdown(thread['html'], unsafe_allow_html=True)
+            shown.extend(thread['replies'])
+            if thread['has_more'] and st.button("More replies", key=f"more_replies_{comment['id']}"):
+                open_threads[comment['id']] += REPLIES_PER_LOAD
+                st.rerun()
+    if pending:
+        st.markdown(f'<div class="comment-list">{"".join(pending)}</div>', unsafe_allow_html=True)
+
+    if page['has_later'] and st.button("Later comments", key=f"comments_later_{discussion_id}"):
+        st.session_state.comment_cursor = (discussion_id, 'after', page['last'])
+        st.rerun()
+    return shown
@@ -0,0 +1,42 @@
+import streamlit as st
+from datetime import date, datetime, timedelta
+from utils.database import get_connection, get_data_versions
+from utils.recurrence import DEFAULT_HORIZON_DAYS, materialize_occurrences
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _home_dashboard(today, discussions_version, events_version, announcements_version):
+    materialize_occurrences(date.fromisoformat(today) + timedelta(days=DEFAULT_HORIZON_DAYS))
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT d.title, u.username, d.created_at
+        FROM discussions d
+        JOIN users u ON d.user_id = u.id
+        ORDER BY d.created_at DESC LIMIT 5
+    """)
+    discussions = cursor.fetchall()
+    cursor.execute("""
+        SELECT e.title, o.occurrence_date, e.location
+        FROM event_occurrences o
+        JOIN events e ON e.id = o.event_id
+        WHERE o.occurrence_date >= ?
+        ORDER BY o.occurrence_date ASC, e.event_time ASC LIMIT 5
+    """, (today,))
+    events = cursor.fetchall()
+    cursor.execute("""
+        SELECT title, content, created_at
+        FROM announcements
+        ORDER BY created_at DESC LIMIT 3
+    """)
+    announcements = cursor.fetchall()
+    conn.close()
+    return {'discussions': discussions, 'events': events, 'announcements': announcements}
+
+def home_dashboard():
+    """
+    Recent discussions, upcoming events and latest announcements for the Home
+    page. Shared by every session and recomputed only when one of those data
+    sets changes or the day rolls over.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    return _home_dashboard(today, *get_data_versions('discussions', 'events', 'announcements'))
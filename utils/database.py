@@ -1,12 +1,213 @@
 import sqlite3
 import os
+import threading
+import weakref
+from contextlib import contextmanager
 from datetime import datetime
+from utils.query_profiler import PROFILING_ENABLED, ProfiledConnection
+
+# Path to the SQLite database; override with COMMUNITY_DB (e.g. for load tests)
+DB_PATH = os.environ.get('COMMUNITY_DB', 'community.db')
+
+# Source of truth for each user_stats counter: a query returning (user_id, total).
+# Used to rebuild the counters and to check them for drift.
+USER_STAT_SOURCES = {
+    'discussions': "SELECT user_id, COUNT(*) AS total FROM discussions GROUP BY user_id",
+    'comments': "SELECT user_id, COUNT(*) AS total FROM comments GROUP BY user_id",
+    'resources': "SELECT user_id, COUNT(*) AS total FROM resources GROUP BY user_id",
+    'events': "SELECT user_id, COUNT(*) AS total FROM events GROUP BY user_id",
+    'rsvps': "SELECT user_id, COUNT(*) AS total FROM rsvps GROUP BY user_id",
+    'attending': "SELECT user_id, COUNT(*) AS total FROM rsvps WHERE status = 'attending' GROUP BY user_id",
+}
+
+# Threaded comments store their position as a materialized path: the ids of
+# their ancestors and their own, each zero-padded to this many digits and
+# joined with '.', so sorting by path lists a thread depth-first and a
+# subtree is one contiguous range. Replies nest at most this many levels.
+COMMENT_PATH_DIGITS = 10
+COMMENT_MAX_DEPTH = 6
+
+# Idle connections kept per process. Opening one costs a schema parse on its
+# first statement; a pooled one already has the schema and its statement
+# cache. Set DB_POOL_SIZE=0 to open a new connection every time.
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+
+_pool = []
+_pool_lock = threading.Lock()
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Connection that goes back to the pool on close(). Callers keep the usual
+    open/close pattern; cursors still open at that point are closed so no
+    half-read statement pins an old snapshot for the next borrower.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._path = args[0] if args else kwargs.get('database')
+        self._timeout = kwargs.get('timeout', 5.0)
+        self._cursors = weakref.WeakSet()
+        self._in_pool = False
+
+    def cursor(self, *args):
+        cursor = super().cursor(*args)
+        self._cursors.add(cursor)
+        return cursor
+
+    def close(self):
+        _release(self)
+
+class ProfiledPooledConnection(PooledConnection, ProfiledConnection):
+    pass
+
+def _release(conn):
+    if conn._in_pool:
+        return
+    try:
+        for cursor in list(conn._cursors):
+            cursor.close()
+        conn._cursors.clear()
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        sqlite3.Connection.close(conn)
+        return
+    conn.isolation_level = ''
+    conn.row_factory = None
+    conn.text_factory = str
+    with _pool_lock:
+        if conn._path == DB_PATH and len(_pool) < POOL_SIZE:
+            conn._in_pool = True
+            _pool.append(conn)
+            return
+    sqlite3.Connection.close(conn)
+
+def _open_connection(timeout):
+    factory = ProfiledPooledConnection if PROFILING_ENABLED else PooledConnection
+    # Pooled connections move between Streamlit's script threads, one borrower at a time
+    conn = sqlite3.connect(DB_PATH, timeout=timeout, factory=factory, check_same_thread=False)
+    # WAL lets readers continue while a writer commits; NORMAL sync is safe in WAL mode
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+def get_connection(timeout=30):
+    """
+    Borrow a connection to the community database from the pool, or open one;
+    close() hands it back. Profiled unless QUERY_PROFILING=0.
+    """
+    stale = []
+    conn = None
+    with _pool_lock:
+        while _pool:
+            candidate = _pool.pop()
+            if candidate._path == DB_PATH:
+                conn = candidate
+                break
+            stale.append(candidate)
+    for old in stale:
+        sqlite3.Connection.close(old)
+    if conn is None:
+        return _open_connection(timeout)
+    conn._in_pool = False
+    if conn._timeout != timeout:
+        conn.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+        conn._timeout = timeout
+    return conn
+
+def prime_pool(size=None):
+    """
+    Fill the pool with connections that have already read the schema, so the
+    first requests a process serves don't each pay for it. Returns how many
+    connections are pooled.
+    """
+    size = POOL_SIZE if size is None else min(size, POOL_SIZE)
+    with _pool_lock:
+        missing = max(0, size - len(_pool))
+    conns = [_open_connection(30) for _ in range(missing)]
+    for conn in conns:
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        conn.close()
+    with _pool_lock:
+        return len(_pool)
+
+def close_pool():
+    """Close every idle pooled connection (e.g. before replacing the database file)."""
+    with _pool_lock:
+        conns = _pool[:]
+        _pool.clear()
+    for conn in conns:
+        sqlite3.Connection.close(conn)
+
+def pool_stats():
+    """Configured pool size and how many connections are idle in it."""
+    with _pool_lock:
+        return {'size': POOL_SIZE, 'idle': len(_pool)}
+
+# Writers in this process queue on a lock instead of spinning in SQLite's busy
+# handler; BEGIN IMMEDIATE still guards against writers in other processes.
+_write_lock = threading.Lock()
+
+@contextmanager
+def write_transaction():
+    """
+    Yield a connection inside a short BEGIN IMMEDIATE transaction, committed on
+    success and rolled back on error.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    try:
+        with _write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.close()
+
+def get_data_versions(*names):
+    """Return the current versions of several cached data sets, in the order given."""
+    conn = get_connection()
+    rows = dict(conn.execute('SELECT name, version FROM data_versions').fetchall())
+    conn.close()
+    return tuple(rows.get(name, 0) for name in names)
+
+def get_data_version(name):
+    """Return the current version number of a cached data set."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT version FROM data_versions WHERE name = ?', (name,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+def _table_exists(cursor, table):
+    """Check whether a table already exists in the database."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+def _add_column_if_missing(cursor, table, column, definition):
+    """Add a column to an existing table. Returns True if it was added."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column in [col[1] for col in cursor.fetchall()]:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
 
 def initialize_database():
     """Initialize database with required tables if they don't exist."""
-    conn = sqlite3.connect('community.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
+    # New databases can hand free pages back in small batches (see
+    # utils/maintenance.py); this has no effect once tables exist
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    
+    # Write-ahead logging so concurrent readers never block on writers
+    cursor.execute("PRAGMA journal_mode = WAL")
+    
     # Users table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
@@ -130,6 +331,482 @@ def initialize_database():
     )
     ''')
     
+    # Per-event RSVP counters, so event lists, admin tables and analytics
+    # never have to aggregate over rsvps
+    event_stats_existed = _table_exists(cursor, 'event_stats')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS event_stats (
+        event_id INTEGER PRIMARY KEY,
+        attending INTEGER NOT NULL DEFAULT 0,
+        maybe INTEGER NOT NULL DEFAULT 0,
+        not_attending INTEGER NOT NULL DEFAULT 0,
+        waitlisted INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (event_id) REFERENCES events (id)
+    )
+    ''')
+    
+    # Optional per-event capacity (NULL means unlimited) and the waitlist counter
+    _add_column_if_missing(cursor, 'events', 'capacity', 'INTEGER')
+    if _add_column_if_missing(cursor, 'event_stats', 'waitlisted', 'INTEGER NOT NULL DEFAULT 0'):
+        # Older counter triggers don't know about the waitlist; recreate them below
+        for trigger in ('event_stats_event_insert', 'event_stats_rsvp_insert',
+                        'event_stats_rsvp_update', 'event_stats_rsvp_delete'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        event_stats_existed = False
+    
+    # Waitlist promotion picks the earliest waitlisted RSVP for an event
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_rsvps_event_status
+    ON rsvps (event_id, status, created_at)
+    ''')
+    
+    # Keep event_stats current inside the same transaction as every RSVP write,
+    # including the upsert in utils/rsvp.py and cascading deletes. The guarded
+    # INSERT ... WHERE NOT EXISTS is used instead of INSERT OR IGNORE because an
+    # outer upsert's conflict handling overrides OR IGNORE inside triggers.
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS event_stats_event_insert
+    AFTER INSERT ON events
+    BEGIN
+        INSERT INTO event_stats (event_id)
+        SELECT NEW.id WHERE NOT EXISTS (SELECT 1 FROM event_stats WHERE event_id = NEW.id);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS event_stats_event_delete
+    AFTER DELETE ON events
+    BEGIN
+        DELETE FROM event_stats WHERE event_id = OLD.id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS event_stats_rsvp_insert
+    AFTER INSERT ON rsvps
+    BEGIN
+        INSERT INTO event_stats (event_id)
+        SELECT NEW.event_id WHERE NOT EXISTS (SELECT 1 FROM event_stats WHERE event_id = NEW.event_id);
+        UPDATE event_stats
+        SET attending = attending + (NEW.status = 'attending'),
+            maybe = maybe + (NEW.status = 'maybe'),
+            not_attending = not_attending + (NEW.status = 'not_attending'),
+            waitlisted = waitlisted + (NEW.status = 'waitlisted')
+        WHERE event_id = NEW.event_id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS event_stats_rsvp_update
+    AFTER UPDATE OF status, event_id ON rsvps
+    BEGIN
+        UPDATE event_stats
+        SET attending = attending - (OLD.status = 'attending'),
+            maybe = maybe - (OLD.status = 'maybe'),
+            not_attending = not_attending - (OLD.status = 'not_attending'),
+            waitlisted = waitlisted - (OLD.status = 'waitlisted')
+        WHERE event_id = OLD.event_id;
+        INSERT INTO event_stats (event_id)
+        SELECT NEW.event_id WHERE NOT EXISTS (SELECT 1 FROM event_stats WHERE event_id = NEW.event_id);
+        UPDATE event_stats
+        SET attending = attending + (NEW.status = 'attending'),
+            maybe = maybe + (NEW.status = 'maybe'),
+            not_attending = not_attending + (NEW.status = 'not_attending'),
+            waitlisted = waitlisted + (NEW.status = 'waitlisted')
+        WHERE event_id = NEW.event_id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS event_stats_rsvp_delete
+    AFTER DELETE ON rsvps
+    BEGIN
+        UPDATE event_stats
+        SET attending = attending - (OLD.status = 'attending'),
+            maybe = maybe - (OLD.status = 'maybe'),
+            not_attending = not_attending - (OLD.status = 'not_attending'),
+            waitlisted = waitlisted - (OLD.status = 'waitlisted')
+        WHERE event_id = OLD.event_id;
+    END
+    ''')
+    
+    # Backfill counters the first time the table is created
+    if not event_stats_existed:
+        rebuild_event_stats(cursor)
+    
+    # Recurring events: a rule stored on the series row, expanded on demand
+    if _add_column_if_missing(cursor, 'events', 'recurrence_rule', 'TEXT'):
+        # Recreated below so that extending the occurrence horizon doesn't bump versions
+        cursor.execute('DROP TRIGGER IF EXISTS events_version_update')
+    _add_column_if_missing(cursor, 'events', 'recurrence_interval', 'INTEGER NOT NULL DEFAULT 1')
+    _add_column_if_missing(cursor, 'events', 'recurrence_until', 'DATE')
+    _add_column_if_missing(cursor, 'events', 'materialized_until', 'DATE')
+    
+    # Materialized occurrence index used for every calendar range scan. Single
+    # events get their one row from a trigger; recurring series are expanded
+    # lazily by utils/recurrence.py up to the window being queried.
+    occurrences_existed = _table_exists(cursor, 'event_occurrences')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS event_occurrences (
+        event_id INTEGER NOT NULL,
+        occurrence_date DATE NOT NULL,
+        PRIMARY KEY (event_id, occurrence_date),
+        FOREIGN KEY (event_id) REFERENCES events (id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_event_occurrences_date
+    ON event_occurrences (occurrence_date, event_id)
+    ''')
+    
+    # Per-occurrence RSVP overrides on top of the series-level rsvps row
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS occurrence_rsvps (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id INTEGER NOT NULL,
+        occurrence_date DATE NOT NULL,
+        user_id INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        FOREIGN KEY (event_id) REFERENCES events (id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        UNIQUE(event_id, occurrence_date, user_id)
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS event_occurrences_single_insert
+    AFTER INSERT ON events
+    WHEN NEW.recurrence_rule IS NULL
+    BEGIN
+        INSERT INTO event_occurrences (event_id, occurrence_date) VALUES (NEW.id, NEW.event_date);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS event_occurrences_single_update
+    AFTER UPDATE OF event_date ON events
+    WHEN NEW.recurrence_rule IS NULL
+    BEGIN
+        UPDATE event_occurrences SET occurrence_date = NEW.event_date WHERE event_id = NEW.id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS event_occurrences_delete
+    AFTER DELETE ON events
+    BEGIN
+        DELETE FROM event_occurrences WHERE event_id = OLD.id;
+        DELETE FROM occurrence_rsvps WHERE event_id = OLD.id;
+    END
+    ''')
+    
+    # Index the existing single events the first time the table is created
+    if not occurrences_existed:
+        cursor.execute('''
+        INSERT OR IGNORE INTO event_occurrences (event_id, occurrence_date)
+        SELECT id, event_date FROM events WHERE recurrence_rule IS NULL
+        ''')
+    
+    # Per-user activity counters, kept current by triggers so any per-user
+    # count is a primary-key lookup instead of a count over the content tables
+    user_stats_existed = _table_exists(cursor, 'user_stats')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_stats (
+        user_id INTEGER PRIMARY KEY,
+        discussions INTEGER NOT NULL DEFAULT 0,
+        comments INTEGER NOT NULL DEFAULT 0,
+        resources INTEGER NOT NULL DEFAULT 0,
+        events INTEGER NOT NULL DEFAULT 0,
+        rsvps INTEGER NOT NULL DEFAULT 0,
+        attending INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+    for column in ('events', 'rsvps', 'attending'):
+        if _add_column_if_missing(cursor, 'user_stats', column, 'INTEGER NOT NULL DEFAULT 0'):
+            # New counters start at zero; backfill them below
+            user_stats_existed = False
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS user_stats_user_insert
+    AFTER INSERT ON users
+    BEGIN
+        INSERT INTO user_stats (user_id)
+        SELECT NEW.id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.id);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS user_stats_user_delete
+    AFTER DELETE ON users
+    BEGIN
+        DELETE FROM user_stats WHERE user_id = OLD.id;
+    END
+    ''')
+    for table in ('discussions', 'comments', 'resources', 'events'):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS user_stats_{table}_insert
+        AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO user_stats (user_id)
+            SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+            UPDATE user_stats SET {table} = {table} + 1 WHERE user_id = NEW.user_id;
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS user_stats_{table}_delete
+        AFTER DELETE ON {table}
+        BEGIN
+            UPDATE user_stats SET {table} = {table} - 1 WHERE user_id = OLD.user_id;
+        END
+        ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS user_stats_rsvps_insert
+    AFTER INSERT ON rsvps
+    BEGIN
+        INSERT INTO user_stats (user_id)
+        SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+        UPDATE user_stats
+        SET rsvps = rsvps + 1, attending = attending + (NEW.status = 'attending')
+        WHERE user_id = NEW.user_id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS user_stats_rsvps_update
+    AFTER UPDATE OF status, user_id ON rsvps
+    BEGIN
+        UPDATE user_stats
+        SET rsvps = rsvps - 1, attending = attending - (OLD.status = 'attending')
+        WHERE user_id = OLD.user_id;
+        INSERT INTO user_stats (user_id)
+        SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+        UPDATE user_stats
+        SET rsvps = rsvps + 1, attending = attending + (NEW.status = 'attending')
+        WHERE user_id = NEW.user_id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS user_stats_rsvps_delete
+    AFTER DELETE ON rsvps
+    BEGIN
+        UPDATE user_stats
+        SET rsvps = rsvps - 1, attending = attending - (OLD.status = 'attending')
+        WHERE user_id = OLD.user_id;
+    END
+    ''')
+    if not user_stats_existed:
+        rebuild_user_stats(cursor)
+    
+    # Case-insensitive prefix search on the user directory runs as a range scan
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_users_username_nocase
+    ON users (username COLLATE NOCASE)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_users_email_nocase
+    ON users (email COLLATE NOCASE)
+    ''')
+    
+    # Per-user lookups used by the purge job (utils/purge.py) to delete a
+    # user's rows in small chunks without scanning whole tables each time
+    for name, table, columns in [
+        ('idx_discussions_user', 'discussions', 'user_id'),
+        ('idx_comments_user', 'comments', 'user_id'),
+        ('idx_comments_discussion', 'comments', 'discussion_id'),
+        ('idx_events_user', 'events', 'user_id'),
+        ('idx_rsvps_user', 'rsvps', 'user_id'),
+        ('idx_occurrence_rsvps_user', 'occurrence_rsvps', 'user_id'),
+        ('idx_resources_user', 'resources', 'user_id'),
+        ('idx_messages_sender', 'messages', 'sender_id'),
+        ('idx_messages_receiver', 'messages', 'receiver_id'),
+        ('idx_announcements_user', 'announcements', 'user_id'),
+    ]:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+    
+    # Threaded comments (utils/comments.py): parent_id is the comment replied
+    # to, path the materialized path described at COMMENT_PATH_DIGITS and
+    # reply_count the number of comments below this one in its subtree.
+    _add_column_if_missing(cursor, 'comments', 'parent_id', 'INTEGER REFERENCES comments (id)')
+    if _add_column_if_missing(cursor, 'comments', 'path', 'TEXT'):
+        # Every existing comment is a top-level one
+        cursor.execute(f"UPDATE comments SET path = printf('%0{COMMENT_PATH_DIGITS}d', id)")
+    _add_column_if_missing(cursor, 'comments', 'reply_count', 'INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('DROP INDEX IF EXISTS idx_comments_thread')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_comments_path
+    ON comments (discussion_id, path)
+    ''')
+    # Pages of top-level comments skip over the replies between them
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_comments_roots
+    ON comments (discussion_id, path) WHERE parent_id IS NULL
+    ''')
+    # The path needs the new id, so it's filled in after the insert. The
+    # ancestors are the prefixes of a path ending at a segment boundary,
+    # each a lookup on idx_comments_path.
+    prefix_lengths = " UNION ALL ".join(
+        f"SELECT {(COMMENT_PATH_DIGITS + 1) * depth + COMMENT_PATH_DIGITS} AS n" for depth in range(COMMENT_MAX_DEPTH))
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS comments_thread_insert
+    AFTER INSERT ON comments
+    BEGIN
+        UPDATE comments
+        SET path = COALESCE((SELECT path || '.' FROM comments WHERE id = NEW.parent_id), '')
+                   || printf('%0{COMMENT_PATH_DIGITS}d', NEW.id)
+        WHERE id = NEW.id;
+        UPDATE comments SET reply_count = reply_count + 1
+        WHERE discussion_id = NEW.discussion_id AND path IN (
+            SELECT substr(c.path, 1, lengths.n) FROM comments c, ({prefix_lengths}) AS lengths
+            WHERE c.id = NEW.id AND lengths.n < length(c.path)
+        );
+    END
+    ''')
+    # Replies to a deleted comment keep their path, so only the count moves
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS comments_thread_delete
+    AFTER DELETE ON comments
+    BEGIN
+        UPDATE comments SET reply_count = reply_count - 1
+        WHERE discussion_id = OLD.discussion_id AND path IN (
+            SELECT substr(OLD.path, 1, lengths.n) FROM ({prefix_lengths}) AS lengths
+            WHERE lengths.n < length(OLD.path)
+        );
+    END
+    ''')
+    # Replies left without any ancestor when a top-level comment goes (e.g.
+    # in a user purge) become top-level themselves, keeping their path, so
+    # the thread's pages still reach them. Other replies to deleted comments
+    # stay reachable through the top-level comment above them.
+    orphans = f'''
+        parent_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM comments a, ({prefix_lengths}) AS lengths
+            WHERE a.discussion_id = comments.discussion_id AND lengths.n < length(comments.path)
+              AND a.path = substr(comments.path, 1, lengths.n)
+        )
+    '''
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'comments_thread_promote'")
+    if cursor.fetchone() is None:
+        # Orphans from deletes before this trigger existed
+        cursor.execute(f'UPDATE comments SET parent_id = NULL WHERE {orphans}')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS comments_thread_promote
+    AFTER DELETE ON comments
+    WHEN OLD.parent_id IS NULL
+    BEGIN
+        UPDATE comments SET parent_id = NULL
+        WHERE discussion_id = OLD.discussion_id AND path > OLD.path || '.' AND path < OLD.path || '/'
+          AND {orphans};
+    END
+    ''')
+    
+    # Discussion list (pages/discussions.py): comment_count is kept by
+    # triggers so the list needn't count every thread per request, and
+    # hot_score is recomputed in the background (utils/trending.py)
+    if _add_column_if_missing(cursor, 'discussions', 'comment_count', 'INTEGER NOT NULL DEFAULT 0'):
+        rebuild_discussion_comments(cursor)
+    _add_column_if_missing(cursor, 'discussions', 'hot_score', 'REAL NOT NULL DEFAULT 0')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS discussions_comments_insert
+    AFTER INSERT ON comments
+    BEGIN
+        UPDATE discussions SET comment_count = comment_count + 1 WHERE id = NEW.discussion_id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS discussions_comments_delete
+    AFTER DELETE ON comments
+    BEGIN
+        UPDATE discussions SET comment_count = comment_count - 1 WHERE id = OLD.discussion_id;
+    END
+    ''')
+    # The Trending feed is one walk down these, with or without a category;
+    # the created_at ones serve the other sorts and the score's activity window
+    for name, table, columns in [
+        ('idx_discussions_hot', 'discussions', 'hot_score, created_at'),
+        ('idx_discussions_category_hot', 'discussions', 'category, hot_score, created_at'),
+        ('idx_discussions_created', 'discussions', 'created_at'),
+        ('idx_comments_created', 'comments', 'created_at'),
+    ]:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+    
+    # One conversation in either direction, in time order (pages/messages.py)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_messages_pair
+    ON messages (sender_id, receiver_id, created_at)
+    ''')
+    
+    # Background user purge jobs; the step and counters are updated in the same
+    # transaction as each deleted chunk so an interrupted job resumes exactly
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS purge_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        username TEXT NOT NULL,
+        requested_by INTEGER,
+        status TEXT NOT NULL DEFAULT 'queued',
+        step TEXT,
+        rows_deleted INTEGER NOT NULL DEFAULT 0,
+        files_deleted INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        created_at TIMESTAMP NOT NULL,
+        heartbeat_at TIMESTAMP,
+        finished_at TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_purge_jobs_status
+    ON purge_jobs (status, heartbeat_at)
+    ''')
+    
+    # Log of maintenance tasks (utils/maintenance.py); a row with no
+    # finished_at is a task claimed by a running scheduler
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task TEXT NOT NULL,
+        status TEXT NOT NULL,
+        started_at TIMESTAMP NOT NULL,
+        finished_at TIMESTAMP,
+        duration_ms INTEGER,
+        detail TEXT
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_maintenance_runs_task
+    ON maintenance_runs (task, started_at)
+    ''')
+    
+    # Version counters for cached views; bumped by triggers so every process
+    # sees the same version and can key its caches on it
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS data_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    for name in ('events', 'discussions', 'announcements', 'resources', 'users'):
+        cursor.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)", (name,))
+    for trigger, table, action, name in [
+        ('events_version_insert', 'events', 'INSERT', 'events'),
+        ('events_version_update', 'events',
+         'UPDATE OF title, description, event_date, event_time, location, capacity, '
+         'recurrence_rule, recurrence_interval, recurrence_until', 'events'),
+        ('events_version_delete', 'events', 'DELETE', 'events'),
+        ('events_version_rsvp', 'event_stats', 'UPDATE', 'events'),
+        ('discussions_version_insert', 'discussions', 'INSERT', 'discussions'),
+        ('discussions_version_update', 'discussions', 'UPDATE OF title, user_id, created_at', 'discussions'),
+        ('discussions_version_delete', 'discussions', 'DELETE', 'discussions'),
+        ('announcements_version_insert', 'announcements', 'INSERT', 'announcements'),
+        ('announcements_version_update', 'announcements', 'UPDATE', 'announcements'),
+        ('announcements_version_delete', 'announcements', 'DELETE', 'announcements'),
+        ('resources_version_insert', 'resources', 'INSERT', 'resources'),
+        ('resources_version_update', 'resources', 'UPDATE', 'resources'),
+        ('resources_version_delete', 'resources', 'DELETE', 'resources'),
+        ('users_version_insert', 'users', 'INSERT', 'users'),
+        ('users_version_update', 'users', 'UPDATE OF username', 'users'),
+        ('users_version_delete', 'users', 'DELETE', 'users'),
+    ]:
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {trigger}
+        AFTER {action} ON {table}
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = '{name}';
+        END
+        ''')
+    
     # Create admin user if no users exist
     cursor.execute('SELECT COUNT(*) FROM users')
     user_count = cursor.fetchone()[0]
@@ -152,3 +829,86 @@ def initialize_database():
     
     conn.commit()
     conn.close()
+
+def rebuild_event_stats(cursor):
+    """Recompute every event's RSVP counters from the rsvps table."""
+    cursor.execute('DELETE FROM event_stats')
+    cursor.execute('''
+    INSERT INTO event_stats (event_id, attending, maybe, not_attending, waitlisted)
+    SELECT e.id,
+           COALESCE(SUM(r.status = 'attending'), 0),
+           COALESCE(SUM(r.status = 'maybe'), 0),
+           COALESCE(SUM(r.status = 'not_attending'), 0),
+           COALESCE(SUM(r.status = 'waitlisted'), 0)
+    FROM events e
+    LEFT JOIN rsvps r ON r.event_id = e.id
+    GROUP BY e.id
+    ''')
+
+def rebuild_user_stats(cursor):
+    """Recompute every user's activity counters from the content tables."""
+    cursor.execute('DELETE FROM user_stats')
+    cursor.execute('INSERT INTO user_stats (user_id) SELECT id FROM users')
+    # One grouped pass per counter rather than a count per user
+    for column, source in USER_STAT_SOURCES.items():
+        cursor.execute(f'''
+        UPDATE user_stats SET {column} = counts.total
+        FROM ({source}) AS counts
+        WHERE counts.user_id = user_stats.user_id
+        ''')
+
+def rebuild_comment_replies(cursor):
+    """Recompute every comment's reply_count from the paths below it."""
+    cursor.execute('UPDATE comments SET reply_count = 0')
+    cursor.execute('''
+    UPDATE comments SET reply_count = counts.total
+    FROM (
+        SELECT a.id, COUNT(*) AS total
+        FROM comments a
+        JOIN comments d ON d.discussion_id = a.discussion_id AND d.path > a.path || '.' AND d.path < a.path || '/'
+        GROUP BY a.id
+    ) AS counts
+    WHERE counts.id = comments.id
+    ''')
+
+def rebuild_discussion_comments(cursor):
+    """Recompute every discussion's comment_count from the comments table."""
+    cursor.execute('UPDATE discussions SET comment_count = 0')
+    cursor.execute('''
+    UPDATE discussions SET comment_count = counts.total
+    FROM (SELECT discussion_id, COUNT(*) AS total FROM comments GROUP BY discussion_id) AS counts
+    WHERE counts.discussion_id = discussions.id
+    ''')
+
+def find_user_stats_drift(cursor):
+    """
+    Compare user_stats with fresh counts from the content tables.
+    Returns a dict with 'mismatched' (user_id, column, stored, expected)
+    tuples, 'missing' user ids without a counter row and 'orphaned'
+    counter rows left behind by deleted users.
+    """
+    columns = list(USER_STAT_SOURCES)
+    joins = "\n".join(
+        f"LEFT JOIN ({source}) AS src_{column} ON src_{column}.user_id = u.id"
+        for column, source in USER_STAT_SOURCES.items()
+    )
+    cursor.execute(f'''
+    SELECT u.id, s.user_id IS NOT NULL,
+           {", ".join(f"s.{column}, COALESCE(src_{column}.total, 0)" for column in columns)}
+    FROM users u
+    LEFT JOIN user_stats s ON s.user_id = u.id
+    {joins}
+    ''')
+    drift = {'mismatched': [], 'missing': [], 'orphaned': []}
+    for row in cursor.fetchall():
+        user_id, has_row, values = row[0], row[1], row[2:]
+        if not has_row:
+            drift['missing'].append(user_id)
+            continue
+        for i, column in enumerate(columns):
+            stored, expected = values[2 * i], values[2 * i + 1]
+            if stored != expected:
+                drift['mismatched'].append((user_id, column, stored, expected))
+    cursor.execute('SELECT user_id FROM user_stats WHERE user_id NOT IN (SELECT id FROM users)')
+    drift['orphaned'] = [user_id for (user_id,) in cursor.fetchall()]
+    return drift
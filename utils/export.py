@@ -0,0 +1,377 @@
+import sqlite3
+import os
+import json
+import tempfile
+import time
+from datetime import datetime
+
+# Tables exported by the snapshot tool. Tables with a created_at column are
+# exported incrementally; the rest are always written in full.
+EXPORT_TABLES = [
+    'users', 'profiles', 'discussions', 'comments', 'events',
+    'rsvps', 'resources', 'messages', 'announcements'
+]
+
+# Columns that must never leave the live database
+EXCLUDED_COLUMNS = {
+    'users': ('password', 'salt'),
+}
+
+# Rollups mirror the aggregate queries in pages/analytics.py so the data team
+# no longer has to re-run them by hand against community.db.
+ROLLUPS = {
+    'daily_signups': ("""
+        SELECT date(created_at) as date, COUNT(*) as new_users
+        FROM users
+        GROUP BY date(created_at)
+        ORDER BY date(created_at)
+    """, [('date', 'date'), ('new_users', 'int')]),
+    'daily_logins_by_hour': ("""
+        SELECT date(last_login) as date, CAST(strftime('%H', last_login) AS INTEGER) as hour,
+               COUNT(*) as logins
+        FROM users
+        WHERE last_login IS NOT NULL
+        GROUP BY date, hour
+        ORDER BY date, hour
+    """, [('date', 'date'), ('hour', 'int'), ('logins', 'int')]),
+    'daily_discussions_by_category': ("""
+        SELECT date(created_at) as date, category, COUNT(*) as discussions
+        FROM discussions
+        GROUP BY date, category
+        ORDER BY date, category
+    """, [('date', 'date'), ('category', 'text'), ('discussions', 'int')]),
+    'daily_comments': ("""
+        SELECT date(created_at) as date, COUNT(*) as comments
+        FROM comments
+        GROUP BY date(created_at)
+        ORDER BY date(created_at)
+    """, [('date', 'date'), ('comments', 'int')]),
+    'event_rsvps': ("""
+        SELECT e.id as event_id, e.title, e.event_date,
+               COALESCE(s.attending, 0) as attending,
+               COALESCE(s.maybe, 0) as maybe,
+               COALESCE(s.not_attending, 0) as not_attending
+        FROM events e
+        LEFT JOIN event_stats s ON s.event_id = e.id
+        ORDER BY e.event_date
+    """, [('event_id', 'int'), ('title', 'text'), ('event_date', 'date'),
+          ('attending', 'int'), ('maybe', 'int'), ('not_attending', 'int')]),
+    'daily_resources_by_type': ("""
+        SELECT date(created_at) as date, resource_type, COUNT(*) as resources
+        FROM resources
+        GROUP BY date, resource_type
+        ORDER BY date, resource_type
+    """, [('date', 'date'), ('resource_type', 'text'), ('resources', 'int')]),
+    'user_contributions': ("""
+        SELECT u.id as user_id, u.username,
+               COALESCE(s.discussions, 0) as discussions,
+               COALESCE(s.comments, 0) as comments,
+               COALESCE(s.resources, 0) as resources,
+               COALESCE(s.events, 0) as events,
+               COALESCE(s.rsvps, 0) as rsvps
+        FROM users u
+        LEFT JOIN user_stats s ON s.user_id = u.id
+        ORDER BY u.id
+    """, [('user_id', 'int'), ('username', 'text'), ('discussions', 'int'),
+          ('comments', 'int'), ('resources', 'int'), ('events', 'int'), ('rsvps', 'int')]),
+}
+
+WATERMARK_FILE = '_watermarks.json'
+LOCK_FILE = '_export.lock'
+
+def _require_pyarrow():
+    """Import pyarrow lazily so the web app never depends on it."""
+    try:
+        import pyarrow
+        import pyarrow.compute
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("pyarrow is required for snapshot exports (pip install pyarrow).")
+
+def _column_kind(declared_type):
+    """Map a declared SQLite column type to an export column kind."""
+    declared_type = (declared_type or '').upper()
+    if declared_type == 'BOOLEAN':
+        return 'bool'
+    if 'INT' in declared_type:
+        return 'int'
+    if declared_type == 'TIMESTAMP':
+        return 'timestamp'
+    if declared_type == 'DATE':
+        return 'date'
+    return 'text'
+
+def _arrow_type(pa, kind):
+    return {
+        'bool': pa.bool_(),
+        'int': pa.int64(),
+        'timestamp': pa.timestamp('s'),
+        'date': pa.date32(),
+        'text': pa.string(),
+    }[kind]
+
+def _to_arrow_array(pa, values, kind):
+    """Build a typed Arrow array from one column of a fetched chunk."""
+    pc = pa.compute
+    if kind == 'timestamp':
+        raw = pa.array(values, type=pa.string())
+        return pc.strptime(raw, format='%Y-%m-%d %H:%M:%S', unit='s', error_is_null=True)
+    if kind == 'date':
+        raw = pa.array(values, type=pa.string())
+        parsed = pc.strptime(raw, format='%Y-%m-%d', unit='s', error_is_null=True)
+        return parsed.cast(pa.date32())
+    if kind == 'bool':
+        return pa.array([None if v is None else bool(v) for v in values], type=pa.bool_())
+    if kind == 'text':
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+    return pa.array(values, type=_arrow_type(pa, kind))
+
+class _ChunkWriter:
+    """Write record batches to a Parquet or Arrow IPC file."""
+
+    def __init__(self, pa, path, schema, file_format):
+        self.pa = pa
+        self.path = path
+        self.schema = schema
+        if file_format == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, schema, compression='zstd')
+        else:
+            self.sink = pa.OSFile(path, 'wb')
+            self.writer = pa.ipc.new_file(self.sink, schema)
+        self.file_format = file_format
+
+    def write(self, columns, kinds):
+        arrays = [_to_arrow_array(self.pa, values, kind) for values, kind in zip(columns, kinds)]
+        self.writer.write_batch(self.pa.record_batch(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        if self.file_format != 'parquet':
+            self.sink.close()
+
+def _stream_query(pa, cursor, sql, params, columns, kinds, path, file_format, chunk_rows):
+    """
+    Stream a query result to a columnar file, holding at most chunk_rows rows
+    in memory at a time. Returns (row_count, last_row).
+    """
+    schema = pa.schema([(name, _arrow_type(pa, kind)) for name, kind in zip(columns, kinds)])
+    writer = _ChunkWriter(pa, path, schema, file_format)
+    row_count = 0
+    last_row = None
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            writer.write([list(col) for col in zip(*rows)], kinds)
+            row_count += len(rows)
+            last_row = rows[-1]
+    except Exception:
+        # Closing would finalize a valid-looking file with only part of the rows
+        writer.close()
+        os.remove(path)
+        raise
+    writer.close()
+
+    # Don't leave empty part files behind for incremental runs
+    if row_count == 0:
+        os.remove(path)
+    return row_count, last_row
+
+def _load_watermarks(out_dir):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+def _save_watermarks(out_dir, watermarks):
+    # Write atomically so a crash mid-export never corrupts the watermarks
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(watermarks, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _acquire_lock(out_dir):
+    """
+    Claim out_dir for this run, so two runs never export the same rows.
+    A lock left behind by a process that no longer exists is taken over.
+    """
+    path = os.path.join(out_dir, LOCK_FILE)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(path) as f:
+                    pid = int(f.read().strip() or 0)
+                os.kill(pid, 0)
+            except (OSError, ValueError):
+                # Owner is gone (or the lock is unreadable); remove it and retry
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            raise RuntimeError(f"Another export (pid {pid}) is running into {out_dir}")
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return path
+    raise RuntimeError(f"Could not lock {out_dir}; remove {path} if no export is running")
+
+def _remove_parts(table_dir, keep=None):
+    """Delete a table's part files, except `keep`."""
+    for name in os.listdir(table_dir):
+        if name.startswith('part-') and name != keep:
+            os.remove(os.path.join(table_dir, name))
+
+def _snapshot_copy(db_path, dest_path, pages_per_step=256, sleep_seconds=0.005):
+    """
+    Copy the live database to dest_path with the sqlite3 backup API in small
+    steps, so the export reads a private, consistent copy.
+    """
+    source = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    dest = sqlite3.connect(dest_path)
+    try:
+        source.backup(dest, pages=pages_per_step, sleep=sleep_seconds)
+    finally:
+        dest.close()
+        source.close()
+
+def export_snapshot(db_path='community.db', out_dir='exports', file_format='parquet',
+                    chunk_rows=50000, incremental=True, tables=None, include_rollups=True,
+                    use_snapshot=True, log=print):
+    """
+    Export tables and analytics rollups to columnar files for offline analysis.
+
+    Each table is written to <out_dir>/<table>/part-<run>.<ext>. When incremental
+    is True, only rows created after the stored (created_at, id) watermark are
+    exported; otherwise earlier parts are replaced by a full export. Rows are
+    append-only from the exporter's point of view, so edits to existing rows
+    (e.g. last_login) only show up in full exports. Rollups are small and are
+    rewritten in full on every run.
+
+    Parts are written under a temporary name and moved into place complete,
+    and each table's watermark is saved as soon as its part is in place, so
+    a failed run leaves every table either as before or fully exported.
+    Only one run at a time may write to out_dir.
+    Returns a dict of {name: rows_written}.
+    """
+    pa = _require_pyarrow()
+    if file_format not in ('parquet', 'arrow'):
+        raise ValueError("file_format must be 'parquet' or 'arrow'")
+    extension = 'parquet' if file_format == 'parquet' else 'arrow'
+
+    os.makedirs(out_dir, exist_ok=True)
+    lock_path = _acquire_lock(out_dir)
+    try:
+        return _export_tables(pa, db_path, out_dir, file_format, extension, chunk_rows,
+                              incremental, tables, include_rollups, use_snapshot, log)
+    finally:
+        os.remove(lock_path)
+
+def _export_tables(pa, db_path, out_dir, file_format, extension, chunk_rows,
+                   incremental, tables, include_rollups, use_snapshot, log):
+    # Kept for full runs too: tables a failed full run didn't reach keep
+    # their parts, so they must keep their watermarks
+    watermarks = _load_watermarks(out_dir)
+    # Microseconds keep two runs in the same second from sharing part files
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    results = {}
+
+    snapshot_dir = None
+    source_path = db_path
+    if use_snapshot:
+        snapshot_dir = tempfile.mkdtemp(prefix='community_export_')
+        source_path = os.path.join(snapshot_dir, 'snapshot.db')
+        started = time.time()
+        _snapshot_copy(db_path, source_path)
+        log(f"Copied {db_path} to a private snapshot in {time.time() - started:.2f}s")
+
+    conn = sqlite3.connect(f'file:{source_path}?mode=ro', uri=True)
+    cursor = conn.cursor()
+    try:
+        # A single read transaction keeps every table consistent with the others
+        cursor.execute("BEGIN")
+
+        for table in tables or EXPORT_TABLES:
+            cursor.execute(f"PRAGMA table_info({table})")
+            table_info = cursor.fetchall()
+            if not table_info:
+                log(f"Skipping {table}: table does not exist")
+                continue
+
+            excluded = EXCLUDED_COLUMNS.get(table, ())
+            columns = [col[1] for col in table_info if col[1] not in excluded]
+            kinds = [_column_kind(col[2]) for col in table_info if col[1] not in excluded]
+            has_watermark = 'created_at' in columns and 'id' in columns
+
+            sql = f"SELECT {', '.join(columns)} FROM {table}"
+            params = []
+            mark = watermarks.get(table) if incremental else None
+            if has_watermark:
+                if mark:
+                    sql += " WHERE created_at > ? OR (created_at = ? AND id > ?)"
+                    params = [mark['created_at'], mark['created_at'], mark['id']]
+                sql += " ORDER BY created_at, id"
+
+            table_dir = os.path.join(out_dir, table)
+            os.makedirs(table_dir, exist_ok=True)
+            part_name = f"part-{run_id}.{extension}"
+            path = os.path.join(table_dir, part_name)
+            if os.path.exists(path):
+                raise RuntimeError(f"Export part already exists: {path}")
+            # Readers only pick up part-* files, never the one being written
+            tmp_path = os.path.join(table_dir, f".{part_name}.tmp")
+            row_count, last_row = _stream_query(pa, cursor, sql, params, columns, kinds,
+                                                tmp_path, file_format, chunk_rows)
+            if row_count:
+                os.replace(tmp_path, path)
+            if not has_watermark or not incremental:
+                # Full exports replace earlier parts, once the new one is in place
+                _remove_parts(table_dir, keep=part_name)
+            results[table] = row_count
+
+            if has_watermark and last_row is not None:
+                watermarks[table] = {
+                    'created_at': last_row[columns.index('created_at')],
+                    'id': last_row[columns.index('id')],
+                }
+            elif not incremental:
+                watermarks.pop(table, None)
+            _save_watermarks(out_dir, watermarks)
+            log(f"Exported {row_count} rows from {table}")
+
+        if include_rollups:
+            rollup_dir = os.path.join(out_dir, 'rollups')
+            os.makedirs(rollup_dir, exist_ok=True)
+            for name, (sql, spec) in ROLLUPS.items():
+                columns = [col for col, _ in spec]
+                kinds = [kind for _, kind in spec]
+                path = os.path.join(rollup_dir, f"{name}.{extension}")
+                tmp_path = path + '.tmp'
+                row_count, _ = _stream_query(pa, cursor, sql, [], columns, kinds,
+                                             tmp_path, file_format, chunk_rows)
+                if row_count:
+                    os.replace(tmp_path, path)
+                elif os.path.exists(path):
+                    os.remove(path)
+                results[f"rollups/{name}"] = row_count
+                log(f"Exported rollup {name} ({row_count} rows)")
+
+        cursor.execute("COMMIT")
+    finally:
+        conn.close()
+        if snapshot_dir:
+            for name in os.listdir(snapshot_dir):
+                os.remove(os.path.join(snapshot_dir, name))
+            os.rmdir(snapshot_dir)
+
+    # Full exports also record watermarks so later incremental runs continue from here
+    watermarks['_last_run'] = run_id
+    _save_watermarks(out_dir, watermarks)
+
+    return results
@@ -2,8 +2,8 @@ import os
 import base64
 import streamlit as st
 from datetime import datetime
-import sqlite3
-from PIL import Image
+from utils.cache import invalidate
+from utils.database import get_connection
 import io
 
 def save_uploaded_file(uploaded_file, directory='uploads', allowed_types=None):
@@ -62,6 +62,8 @@ def save_profile_photo(user_id, uploaded_file):
     
     # Process the image - resize if needed
     try:
+        # PIL is only needed here, so it's imported on first upload
+        from PIL import Image
         img = Image.open(uploaded_file)
         # Resize to a reasonable profile picture size
         img = img.resize((300, 300))
@@ -74,7 +76,7 @@ def save_profile_photo(user_id, uploaded_file):
         img.save(file_path, "JPEG")
         
         # Update the user's profile in the database
-        conn = sqlite3.connect('community.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE profiles
@@ -112,7 +114,7 @@ def save_resource_file(user_id, title, description, uploaded_file, resource_type
     
     # Add to database
     try:
-        conn = sqlite3.connect('community.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO resources (user_id, title, description, resource_type, file_path, created_at)
@@ -120,6 +122,7 @@ def save_resource_file(user_id, title, description, uploaded_file, resource_type
         ''', (user_id, title, description, resource_type, file_path, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
         conn.commit()
         conn.close()
+        invalidate('resources')
         return True
     except Exception as e:
         st.error(f"Error saving resource to database: {e}")
@@ -131,7 +134,7 @@ def save_resource_link(user_id, title, description, url, resource_type='link'):
     Returns True if successful, False otherwise.
     """
     try:
-        conn = sqlite3.connect('community.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO resources (user_id, title, description, resource_type, url, created_at)
@@ -139,6 +142,7 @@ def save_resource_link(user_id, title, description, url, resource_type='link'):
         ''', (user_id, title, description, resource_type, url, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
         conn.commit()
         conn.close()
+        invalidate('resources')
         return True
     except Exception as e:
         st.error(f"Error saving resource link to database: {e}")
@@ -0,0 +1,476 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+import utils.database as database
+from utils.database import get_connection, write_transaction
+from utils.trending import recompute_hot_scores
+
+BACKUP_DIR = 'backups'
+UPLOADS_DIR = 'uploads'
+MANIFEST_FILE = 'manifest.json'
+
+# Snapshots older than the newest SNAPSHOT_RETENTION are pruned automatically
+SNAPSHOT_RETENTION = 14
+
+# Pages copied per backup step and the pause between steps, so a backup never
+# holds the database for more than a moment at a time
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.005
+
+# Scheduled tasks: name -> interval. Due tasks are claimed through the
+# maintenance_runs table, so only one process runs each one.
+SCHEDULE = {
+    'quick_check': timedelta(hours=6),
+    'snapshot': timedelta(hours=24),
+    'optimize': timedelta(hours=6),
+    'incremental_vacuum': timedelta(hours=1),
+    'enable_auto_vacuum': timedelta(hours=24),
+    'hot_scores': timedelta(minutes=10),
+}
+SCHEDULER_POLL_SECONDS = 60
+
+# MAINTENANCE_SCHEDULER=0 keeps this process from running scheduled tasks
+# (e.g. in benchmarks, or in all but one of several server processes)
+SCHEDULER_ENABLED = os.environ.get('MAINTENANCE_SCHEDULER', '1') != '0'
+
+# Space reclamation only runs when nothing has been written for QUIET_SECONDS.
+# The one-time switch to incremental auto-vacuum rewrites the whole file, so
+# it additionally waits for QUIET_HOURS (local time).
+QUIET_SECONDS = 30
+QUIET_HOURS = range(2, 5)
+VACUUM_MAX_PAGES_PER_RUN = 5000
+
+# Caps the rows ANALYZE samples per index, keeping optimize runs short
+ANALYSIS_LIMIT = 1000
+
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+_scheduler_started = False
+_scheduler_lock = threading.Lock()
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def backup_database(dest_path, pages_per_step=BACKUP_PAGES_PER_STEP, sleep_seconds=BACKUP_STEP_SLEEP,
+                    progress=None):
+    """
+    Copy the live database to dest_path with the sqlite3 backup API in small
+    steps. Readers and writers carry on between steps; the copy is a
+    consistent image of the database as of the last step.
+    """
+    source = get_connection()
+    dest = sqlite3.connect(dest_path)
+    try:
+        source.backup(dest, pages=pages_per_step, sleep=sleep_seconds,
+                      progress=(lambda status, remaining, total: progress(total - remaining, total))
+                      if progress else None)
+    finally:
+        dest.close()
+        source.close()
+
+def _copy_uploads(source_dir, dest_dir):
+    """
+    Mirror an uploads tree. Upload files are never modified in place, so hard
+    links are used where possible and files are only copied across devices.
+    Returns (files, bytes).
+    """
+    files = 0
+    total_bytes = 0
+    if not os.path.isdir(source_dir):
+        return files, total_bytes
+    for root, _, names in os.walk(source_dir):
+        target_root = os.path.join(dest_dir, os.path.relpath(root, source_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for name in names:
+            source = os.path.join(root, name)
+            target = os.path.join(target_root, name)
+            if os.path.exists(target):
+                continue
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+            files += 1
+            total_bytes += os.path.getsize(target)
+    return files, total_bytes
+
+def _referenced_uploads(db_path):
+    """Upload paths referenced by rows in a database file."""
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    paths = [row[0] for row in conn.execute("""
+        SELECT file_path FROM resources WHERE file_path IS NOT NULL AND file_path != ''
+        UNION
+        SELECT photo_path FROM profiles WHERE photo_path IS NOT NULL AND photo_path != ''
+    """)]
+    conn.close()
+    return paths
+
+def quick_check(db_path=None):
+    """Run PRAGMA quick_check; returns 'ok' or the list of problems found."""
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True) if db_path else get_connection()
+    rows = [row[0] for row in conn.execute("PRAGMA quick_check")]
+    conn.close()
+    return 'ok' if rows == ['ok'] else rows
+
+def create_snapshot(label=None, progress=None, prune=True):
+    """
+    Take a consistent snapshot of the database together with the uploads it
+    references, under backups/<timestamp>/. The database is copied first
+    (stepwise, without blocking live sessions), then the uploads; referenced
+    files that were deleted in between are listed in the manifest.
+    Returns the snapshot's manifest.
+    """
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    name = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if os.path.exists(os.path.join(BACKUP_DIR, name)):
+        name += f"_{int(time.time() * 1000) % 1000:03d}"
+    tmp_dir = os.path.join(BACKUP_DIR, f".{name}.tmp")
+    os.makedirs(tmp_dir)
+
+    started = time.time()
+    try:
+        db_copy = os.path.join(tmp_dir, 'community.db')
+        backup_database(db_copy, progress=progress)
+        check = quick_check(db_copy)
+        files, upload_bytes = _copy_uploads(UPLOADS_DIR, os.path.join(tmp_dir, UPLOADS_DIR))
+        missing = [path for path in _referenced_uploads(db_copy)
+                   if not os.path.exists(os.path.join(tmp_dir, path))]
+
+        manifest = {
+            'name': name,
+            'label': label,
+            'created_at': _now(),
+            'duration_seconds': round(time.time() - started, 3),
+            'db_bytes': os.path.getsize(db_copy),
+            'upload_files': files,
+            'upload_bytes': upload_bytes,
+            'missing_uploads': missing,
+            'quick_check': check,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        # Only complete snapshots ever appear under their final name
+        os.replace(tmp_dir, os.path.join(BACKUP_DIR, name))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if prune:
+        prune_snapshots()
+    return manifest
+
+def list_snapshots():
+    """Manifests of all complete snapshots, newest first."""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    snapshots = []
+    for name in os.listdir(BACKUP_DIR):
+        path = os.path.join(BACKUP_DIR, name, MANIFEST_FILE)
+        if not name.startswith('.') and os.path.exists(path):
+            with open(path) as f:
+                snapshots.append(json.load(f))
+    return sorted(snapshots, key=lambda m: m['name'], reverse=True)
+
+def prune_snapshots(keep=SNAPSHOT_RETENTION):
+    """Delete all but the newest `keep` snapshots. Returns the removed names."""
+    removed = []
+    for manifest in list_snapshots()[keep:]:
+        shutil.rmtree(os.path.join(BACKUP_DIR, manifest['name']), ignore_errors=True)
+        removed.append(manifest['name'])
+    return removed
+
+def find_snapshot(point_in_time):
+    """The newest snapshot taken at or before point_in_time ('YYYY-MM-DD HH:MM:SS')."""
+    for manifest in list_snapshots():
+        if manifest['created_at'] <= point_in_time:
+            return manifest
+    return None
+
+def restore_snapshot(name):
+    """
+    Restore the database and uploads from a snapshot. The current state is
+    snapshotted first, so a restore can itself be undone.
+
+    The copy into the live database runs as one backup step while holding
+    the in-process write lock; other sessions simply wait on their busy
+    timeout for the few moments it takes. Upload files missing from the live
+    directory are copied back; newer files are left in place.
+    """
+    snapshot_dir = os.path.join(BACKUP_DIR, name)
+    snapshot_db = os.path.join(snapshot_dir, 'community.db')
+    if not os.path.exists(snapshot_db):
+        raise ValueError(f"Snapshot not found: {name}")
+    check = quick_check(snapshot_db)
+    if check != 'ok':
+        raise ValueError(f"Snapshot {name} failed quick_check: {check}")
+
+    # Not pruned yet: that could remove the very snapshot being restored
+    safety = create_snapshot(label=f"before restoring {name}", prune=False)
+
+    source = sqlite3.connect(f'file:{snapshot_db}?mode=ro', uri=True)
+    dest = get_connection()
+    try:
+        with database._write_lock:
+            versions = dict(dest.execute("SELECT name, version FROM data_versions").fetchall())
+            source.backup(dest)
+            # Move cache versions past anything seen before the restore, so no
+            # cached view from either timeline is reused
+            for version_name, version in versions.items():
+                dest.execute("""
+                    INSERT INTO data_versions (name, version) VALUES (?, ?)
+                    ON CONFLICT (name) DO UPDATE SET version = excluded.version
+                """, (version_name, version + 1))
+            dest.commit()
+    finally:
+        source.close()
+        dest.close()
+
+    restored_files, _ = _copy_uploads(os.path.join(snapshot_dir, UPLOADS_DIR), UPLOADS_DIR)
+    prune_snapshots()
+    return {'restored': name, 'safety_snapshot': safety['name'], 'restored_files': restored_files}
+
+def incremental_vacuum(max_pages=None, batch_pages=256, pause=0.05):
+    """
+    Return free pages to the file system a batch at a time, each batch in its
+    own short write transaction. Only has an effect once the database uses
+    auto_vacuum=INCREMENTAL. Returns the number of pages freed.
+    """
+    conn = get_connection()
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.close()
+
+    freed = 0
+    remaining = free_before if max_pages is None else min(free_before, max_pages)
+    conn = get_connection()
+    try:
+        while remaining > 0:
+            step = min(batch_pages, remaining)
+            with database._write_lock:
+                before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                # The pragma frees one page per step, so it has to run to
+                # completion; executescript does that in its own transaction
+                conn.executescript(f"PRAGMA incremental_vacuum({step})")
+                after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if after >= before:
+                break  # auto_vacuum is off, nothing can be reclaimed this way
+            freed += before - after
+            remaining -= step
+            time.sleep(pause)
+    finally:
+        conn.close()
+    return freed
+
+def database_status():
+    """Page counts and vacuum mode of the live database."""
+    conn = get_connection()
+    status = {
+        'auto_vacuum': AUTO_VACUUM_MODES.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 'unknown'),
+        'page_count': conn.execute("PRAGMA page_count").fetchone()[0],
+        'freelist_count': conn.execute("PRAGMA freelist_count").fetchone()[0],
+        'page_size': conn.execute("PRAGMA page_size").fetchone()[0],
+    }
+    conn.close()
+    return status
+
+def database_is_idle(seconds=QUIET_SECONDS):
+    """True if nothing has been written to the database for `seconds`."""
+    paths = [database.DB_PATH, database.DB_PATH + '-wal']
+    last_write = max(os.path.getmtime(path) for path in paths if os.path.exists(path))
+    return time.time() - last_write >= seconds
+
+def optimize_database():
+    """
+    Refresh the query planner's statistics: a full ANALYZE the first time,
+    PRAGMA optimize (which only re-analyzes tables that need it) afterwards.
+    """
+    conn = get_connection()
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    has_stats = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone() is not None
+    with database._write_lock:
+        conn.execute("PRAGMA optimize" if has_stats else "ANALYZE")
+        conn.commit()
+    conn.close()
+    return 'optimize' if has_stats else 'analyze'
+
+def enable_incremental_auto_vacuum():
+    """
+    Switch an existing database to auto_vacuum=INCREMENTAL. This needs one
+    full VACUUM, which blocks writers while it runs, so the scheduler only
+    does it during quiet hours. New databases are created in this mode.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+    with database._write_lock:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    mode = AUTO_VACUUM_MODES.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 'unknown')
+    pages_after = conn.execute("PRAGMA page_count").fetchone()[0]
+    conn.close()
+    return {'auto_vacuum': mode, 'pages_freed': max(0, pages_before - pages_after)}
+
+def _task_ready(task):
+    """Extra conditions, beyond the interval, for a task to run now."""
+    if task == 'incremental_vacuum':
+        status = database_status()
+        return status['auto_vacuum'] == 'incremental' and status['freelist_count'] > 0 and database_is_idle()
+    if task == 'enable_auto_vacuum':
+        return (database_status()['auto_vacuum'] != 'incremental' and datetime.now().hour in QUIET_HOURS
+                and database_is_idle())
+    return True
+
+def request_task(task):
+    """
+    Ask the scheduler to run a task at its next poll regardless of its
+    interval, e.g. optimize after a bulk import.
+    """
+    with write_transaction() as conn:
+        pending = conn.execute("""
+            SELECT 1 FROM maintenance_runs WHERE task = ? AND status = 'requested'
+        """, (task,)).fetchone()
+        if not pending:
+            conn.execute("""
+                INSERT INTO maintenance_runs (task, status, started_at) VALUES (?, 'requested', ?)
+            """, (task, _now()))
+
+def _record_run(task, status, started, detail, run_id=None):
+    """Log a finished run, completing the claimed row if there is one."""
+    values = (status, _now(), int((time.time() - started) * 1000), json.dumps(detail))
+    with write_transaction() as conn:
+        if run_id is not None:
+            conn.execute("""
+                UPDATE maintenance_runs SET status = ?, finished_at = ?, duration_ms = ?, detail = ?
+                WHERE id = ?
+            """, values + (run_id,))
+        else:
+            conn.execute("""
+                INSERT INTO maintenance_runs (task, started_at, status, finished_at, duration_ms, detail)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (task, datetime.fromtimestamp(started).strftime('%Y-%m-%d %H:%M:%S')) + values)
+
+def _claim_task(task, interval):
+    """
+    Claim a due task for this process by inserting its 'running' row, so other
+    processes polling at the same time skip it. Returns the row id or None.
+    """
+    cutoff = (datetime.now() - interval).strftime('%Y-%m-%d %H:%M:%S')
+    with write_transaction() as conn:
+        requested = conn.execute("""
+            SELECT id FROM maintenance_runs WHERE task = ? AND status = 'requested'
+        """, (task,)).fetchone()
+        if requested:
+            conn.execute("UPDATE maintenance_runs SET status = 'running', started_at = ? WHERE id = ?",
+                         (_now(), requested[0]))
+            return requested[0]
+        last = conn.execute("""
+            SELECT MAX(started_at) FROM maintenance_runs WHERE task = ? AND status != 'requested'
+        """, (task,)).fetchone()[0]
+        if last is not None and last > cutoff:
+            return None
+        return conn.execute("""
+            INSERT INTO maintenance_runs (task, status, started_at) VALUES (?, 'running', ?)
+        """, (task, _now())).lastrowid
+
+def run_task(task, run_id=None):
+    """Run one maintenance task now and log it. Returns the task's result."""
+    started = time.time()
+    try:
+        if task == 'quick_check':
+            result = {'quick_check': quick_check()}
+        elif task == 'snapshot':
+            manifest = create_snapshot(label='scheduled')
+            result = {'snapshot': manifest['name'], 'quick_check': manifest['quick_check']}
+        elif task == 'optimize':
+            result = {'mode': optimize_database()}
+        elif task == 'incremental_vacuum':
+            result = {'pages_freed': incremental_vacuum(max_pages=VACUUM_MAX_PAGES_PER_RUN),
+                      'free_pages_left': database_status()['freelist_count']}
+        elif task == 'enable_auto_vacuum':
+            result = enable_incremental_auto_vacuum()
+        elif task == 'hot_scores':
+            result = {'discussions': recompute_hot_scores()}
+        else:
+            raise ValueError(f"Unknown maintenance task: {task}")
+    except Exception as e:
+        _record_run(task, 'failed', started, {'error': str(e)}, run_id)
+        raise
+    status = 'ok' if result.get('quick_check', 'ok') == 'ok' else 'problems'
+    _record_run(task, status, started, result, run_id)
+    return result
+
+def run_due_tasks():
+    """Run every scheduled task whose interval has elapsed."""
+    for task, interval in SCHEDULE.items():
+        if not _task_ready(task):
+            continue
+        run_id = _claim_task(task, interval)
+        if run_id is None:
+            continue
+        try:
+            run_task(task, run_id)
+        except Exception:
+            pass  # already logged by run_task
+
+def _scheduler_loop():
+    while True:
+        try:
+            run_due_tasks()
+        except Exception:
+            pass  # e.g. the database is briefly locked; try again next poll
+        time.sleep(SCHEDULER_POLL_SECONDS)
+
+def start_maintenance_scheduler():
+    """Start the background maintenance thread once per process."""
+    global _scheduler_started
+    with _scheduler_lock:
+        if _scheduler_started or not SCHEDULER_ENABLED:
+            return
+        _scheduler_started = True
+    threading.Thread(target=_scheduler_loop, name="maintenance-scheduler", daemon=True).start()
+
+def last_runs():
+    """The most recent finished run of each task, keyed by task name."""
+    conn = get_connection()
+    cursor = conn.execute("""
+        SELECT task, status, started_at, finished_at, duration_ms, detail
+        FROM maintenance_runs
+        WHERE id IN (SELECT MAX(id) FROM maintenance_runs WHERE finished_at IS NOT NULL GROUP BY task)
+    """)
+    columns = [col[0] for col in cursor.description]
+    runs = {}
+    for row in cursor.fetchall():
+        run = dict(zip(columns, row))
+        run['detail'] = json.loads(run['detail']) if run['detail'] else {}
+        runs[run['task']] = run
+    conn.close()
+    return runs
+
+def recent_runs(limit=20, task=None):
+    """Latest finished maintenance runs as dicts, newest first."""
+    conn = get_connection()
+    query = """
+        SELECT task, status, started_at, finished_at, duration_ms, detail
+        FROM maintenance_runs
+        WHERE finished_at IS NOT NULL
+    """
+    params = []
+    if task:
+        query += " AND task = ?"
+        params.append(task)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    cursor = conn.execute(query, params)
+    columns = [col[0] for col in cursor.description]
+    runs = []
+    for row in cursor.fetchall():
+        run = dict(zip(columns, row))
+        run['detail'] = json.loads(run['detail']) if run['detail'] else {}
+        runs.append(run)
+    conn.close()
+    return runs
@@ -0,0 +1,25 @@
+import importlib
+import sys
+
+# Navigation item -> page module. A page is imported the first time its item
+# is selected, so a process that only ever serves Home never loads the
+# modules behind the other pages or their imports.
+PAGES = {
+    "Profile": "pages.profile",
+    "Discussions": "pages.discussions",
+    "Events": "pages.events",
+    "Resources": "pages.resources",
+    "Messages": "pages.messages",
+    "Announcements": "pages.announcements",
+}
+
+def load_page(name):
+    """Return the app() function of the page behind a navigation item, importing it if needed."""
+    module_name = PAGES[name]
+    module = sys.modules.get(module_name)
+    if module is None:
+        module = importlib.import_module(module_name)
+    return module.app
+
+def render_page(name):
+    load_page(name)()
@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from utils.cache import invalidate
+from utils.database import get_connection, write_transaction
+from utils.maintenance import request_task
+from utils.rsvp import promote_waitlists
+
+# Steps of a user purge, run in order. Each step deletes the rows matching its
+# WHERE clause in chunks; dependent rows (RSVPs and comments on the user's
+# content) go before the content itself. Steps with a file column also delete
+# the referenced upload files.
+PURGE_STEPS = [
+    ('occurrence_rsvps', 'occurrence_rsvps', 'user_id = :user_id', None),
+    ('rsvps_on_events', 'rsvps', 'event_id IN (SELECT id FROM events WHERE user_id = :user_id)', None),
+    ('rsvps', 'rsvps', 'user_id = :user_id', None),
+    ('comments_on_discussions', 'comments',
+     'discussion_id IN (SELECT id FROM discussions WHERE user_id = :user_id)', None),
+    ('comments', 'comments', 'user_id = :user_id', None),
+    ('messages', 'messages', 'sender_id = :user_id OR receiver_id = :user_id', None),
+    ('events', 'events', 'user_id = :user_id', None),
+    ('discussions', 'discussions', 'user_id = :user_id', None),
+    ('resources', 'resources', 'user_id = :user_id', 'file_path'),
+    ('announcements', 'announcements', 'user_id = :user_id', None),
+    ('profiles', 'profiles', 'user_id = :user_id', 'photo_path'),
+    ('users', 'users', 'id = :user_id', None),
+]
+
+PURGE_STEP_NAMES = [step[0] for step in PURGE_STEPS]
+
+UPLOADS_DIR = 'uploads'
+
+# Rows deleted per transaction, and the pause between chunks that lets other
+# writers take the write lock
+CHUNK_SIZE = 500
+CHUNK_PAUSE_SECONDS = 0.02
+
+# A running job whose worker hasn't checked in for this long is treated as
+# abandoned (e.g. the server restarted) and may be resumed
+STALE_AFTER_SECONDS = 60
+
+_active_jobs = set()
+_active_jobs_lock = threading.Lock()
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def _remove_upload(path):
+    """Delete an upload file. Only paths inside the uploads directory are touched."""
+    if not path:
+        return False
+    uploads = os.path.abspath(UPLOADS_DIR)
+    target = os.path.abspath(path)
+    if os.path.commonpath([uploads, target]) != uploads:
+        return False
+    try:
+        os.remove(target)
+        return True
+    except FileNotFoundError:
+        return False
+
+def _purge_chunk(job_id, user_id, step_index, chunk_size):
+    """
+    Delete one chunk of a purge step. Returns the number of rows deleted.
+
+    Upload files are removed before their rows, so a crash in between only
+    means the resumed job finds the files already gone.
+    """
+    step, table, where, file_column = PURGE_STEPS[step_index]
+    params = {'user_id': user_id, 'limit': chunk_size}
+
+    conn = get_connection()
+    columns = f"rowid, {file_column}" if file_column else "rowid"
+    rows = conn.execute(f"SELECT {columns} FROM {table} WHERE {where} LIMIT :limit", params).fetchall()
+    conn.close()
+
+    files_deleted = 0
+    if file_column:
+        files_deleted = sum(_remove_upload(row[1]) for row in rows)
+
+    threads = set()
+    with write_transaction() as conn:
+        deleted = 0
+        if rows:
+            placeholders = ", ".join("?" * len(rows))
+            returning = {'rsvps': " RETURNING event_id, status", 'comments': " RETURNING discussion_id"}.get(table, "")
+            cursor = conn.execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders}){returning}",
+                                  [row[0] for row in rows])
+            if table == 'rsvps':
+                # Seats freed on other members' events go to their waitlists
+                removed = cursor.fetchall()
+                deleted = len(removed)
+                promote_waitlists(conn, {event_id for event_id, status in removed if status == 'attending'})
+            elif table == 'comments':
+                removed = cursor.fetchall()
+                deleted = len(removed)
+                threads = {discussion_id for discussion_id, in removed}
+            else:
+                deleted = cursor.rowcount
+        conn.execute("""
+            UPDATE purge_jobs
+            SET step = ?, rows_deleted = rows_deleted + ?, files_deleted = files_deleted + ?,
+                heartbeat_at = ?
+            WHERE id = ?
+        """, (step, deleted, files_deleted, _now(), job_id))
+    if threads:
+        invalidate(*(f"comments:{discussion_id}" for discussion_id in threads))
+    return deleted
+
+def _claim_job(job_id):
+    """Mark a job as running by this process unless another worker holds it."""
+    stale = (datetime.now() - timedelta(seconds=STALE_AFTER_SECONDS)).strftime('%Y-%m-%d %H:%M:%S')
+    with write_transaction() as conn:
+        cursor = conn.execute("""
+            UPDATE purge_jobs
+            SET status = 'running', heartbeat_at = ?, error = NULL
+            WHERE id = ? AND (status = 'queued' OR (status = 'running' AND heartbeat_at < ?))
+        """, (_now(), job_id, stale))
+        return cursor.rowcount == 1
+
+def _run_job(job_id, chunk_size=CHUNK_SIZE, pause=CHUNK_PAUSE_SECONDS):
+    try:
+        if not _claim_job(job_id):
+            return
+        conn = get_connection()
+        user_id, step = conn.execute("SELECT user_id, step FROM purge_jobs WHERE id = ?", (job_id,)).fetchone()
+        conn.close()
+
+        # Resume from the recorded step; every step is safe to repeat
+        start = PURGE_STEP_NAMES.index(step) if step in PURGE_STEP_NAMES else 0
+        for step_index in range(start, len(PURGE_STEPS)):
+            while _purge_chunk(job_id, user_id, step_index, chunk_size) >= chunk_size:
+                time.sleep(pause)
+
+        with write_transaction() as conn:
+            conn.execute("UPDATE purge_jobs SET status = 'done', finished_at = ? WHERE id = ?", (_now(), job_id))
+        # Large purges leave free pages and stale statistics behind
+        request_task('optimize')
+    except Exception as e:
+        with write_transaction() as conn:
+            conn.execute("UPDATE purge_jobs SET status = 'failed', error = ? WHERE id = ?", (str(e), job_id))
+    finally:
+        with _active_jobs_lock:
+            _active_jobs.discard(job_id)
+
+def _spawn_worker(job_id):
+    with _active_jobs_lock:
+        if job_id in _active_jobs:
+            return
+        _active_jobs.add(job_id)
+    threading.Thread(target=_run_job, args=(job_id,), name=f"purge-job-{job_id}", daemon=True).start()
+
+def start_purge(user_id, requested_by=None):
+    """
+    Queue a background purge of a user and everything that depends on them.
+    Returns the job id, or None if the user doesn't exist. A purge that is
+    already in progress for the user is reused.
+    """
+    with write_transaction() as conn:
+        existing = conn.execute("""
+            SELECT id FROM purge_jobs WHERE user_id = ? AND status IN ('queued', 'running')
+        """, (user_id,)).fetchone()
+        if existing:
+            job_id = existing[0]
+        else:
+            user = conn.execute("SELECT username FROM users WHERE id = ?", (user_id,)).fetchone()
+            if user is None:
+                return None
+            job_id = conn.execute("""
+                INSERT INTO purge_jobs (user_id, username, requested_by, created_at)
+                VALUES (?, ?, ?, ?)
+            """, (user_id, user[0], requested_by, _now())).lastrowid
+    _spawn_worker(job_id)
+    return job_id
+
+def retry_purge(job_id):
+    """Re-queue a failed purge job; it resumes from the step that failed."""
+    with write_transaction() as conn:
+        conn.execute("UPDATE purge_jobs SET status = 'queued' WHERE id = ? AND status = 'failed'", (job_id,))
+    _spawn_worker(job_id)
+
+def resume_purge_jobs():
+    """Restart queued jobs and running jobs abandoned by a crashed worker."""
+    stale = (datetime.now() - timedelta(seconds=STALE_AFTER_SECONDS)).strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_connection()
+    job_ids = [row[0] for row in conn.execute("""
+        SELECT id FROM purge_jobs
+        WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < ?)
+    """, (stale,)).fetchall()]
+    conn.close()
+    for job_id in job_ids:
+        _spawn_worker(job_id)
+    return job_ids
+
+def list_purge_jobs(limit=10):
+    """Most recent purge jobs as dicts, newest first."""
+    conn = get_connection()
+    cursor = conn.execute("""
+        SELECT id, user_id, username, status, step, rows_deleted, files_deleted, error,
+               created_at, finished_at
+        FROM purge_jobs
+        ORDER BY id DESC
+        LIMIT ?
+    """, (limit,))
+    columns = [col[0] for col in cursor.description]
+    jobs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    conn.close()
+    return jobs
@@ -0,0 +1,239 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+
+# Profiling is on unless QUERY_PROFILING=0; it costs a couple of timer calls
+# and a dict update per statement
+PROFILING_ENABLED = os.environ.get('QUERY_PROFILING', '1') != '0'
+
+# Statements slower than this (execute plus fetching the rows) go to the slow
+# query log with their EXPLAIN QUERY PLAN
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '50'))
+
+# Recent timings kept per fingerprint for the percentiles, and slow statements
+# kept in the log
+SAMPLES_PER_QUERY = 1000
+SLOW_LOG_SIZE = 200
+
+# A fingerprint's plan is captured again at most this often
+PLAN_REFRESH_SECONDS = 300
+
+_stats = {}
+_slow_log = deque(maxlen=SLOW_LOG_SIZE)
+_lock = threading.Lock()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_LINE_COMMENT = re.compile(r"--[^\n]*")
+_WHITESPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """
+    Normalize a statement so executions that differ only in literal values
+    or the length of an IN (...) list are aggregated together.
+    """
+    sql = _LINE_COMMENT.sub(" ", sql)
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+def _explain(connection, sql, params):
+    """EXPLAIN QUERY PLAN for a statement, as indented text, or None."""
+    if sql.lstrip()[:6].upper() not in ('SELECT', 'WITH', 'UPDATE', 'DELETE'):
+        return None
+    try:
+        # A plain cursor, so the plan query itself isn't profiled
+        cursor = sqlite3.Cursor(connection)
+        rows = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        cursor.close()
+    except sqlite3.Error:
+        return None
+    depth = {0: 0}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depth[node_id] = depth.get(parent_id, 0) + 1
+        lines.append("  " * (depth[node_id] - 1) + detail)
+    return "\n".join(lines)
+
+def _record(connection, sql, params, elapsed_ms, rows):
+    key = fingerprint(sql)
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None:
+            entry = _stats[key] = {
+                'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'slow_calls': 0,
+                'samples': deque(maxlen=SAMPLES_PER_QUERY), 'plan': None, 'plan_at': 0.0,
+            }
+        entry['calls'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        entry['rows'] += rows
+        entry['samples'].append(elapsed_ms)
+        if elapsed_ms < SLOW_QUERY_MS:
+            return
+        entry['slow_calls'] += 1
+        need_plan = time.time() - entry['plan_at'] > PLAN_REFRESH_SECONDS
+        if need_plan:
+            entry['plan_at'] = time.time()
+
+    plan = _explain(connection, sql, params) if need_plan and params is not None else None
+    with _lock:
+        if plan is not None:
+            entry['plan'] = plan
+        _slow_log.append({
+            'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'fingerprint': key,
+            'duration_ms': elapsed_ms,
+            'rows': rows,
+            'plan': plan or entry['plan'],
+        })
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement from execute until its rows have been
+    fetched (or the cursor moves on), and counts the rows it returned.
+    """
+
+    _pending = None
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            sql, params, elapsed, rows = pending
+            if rows < 0:
+                rows = max(self.rowcount, 0)
+            try:
+                _record(self.connection, sql, params, elapsed * 1000, rows)
+            except sqlite3.ProgrammingError:
+                pass  # connection already closed
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._pending is not None:
+                self._pending[2] += time.perf_counter() - started
+
+    def _count(self, rows):
+        if self._pending is not None:
+            self._pending[3] = max(self._pending[3], 0) + rows
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter()
+        result = super().execute(sql, parameters)
+        # Rows are counted as they're fetched; -1 means "none fetched yet"
+        self._pending = [sql, parameters, time.perf_counter() - started, -1]
+        if self.description is None:
+            self._finish()
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        started = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        self._pending = [sql, None, time.perf_counter() - started, -1]
+        self._finish()
+        return result
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._count(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        self._count(len(rows))
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._count(len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        self._count(1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose cursors, including those made by execute(), are profiled."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def query_stats(order_by='total_ms'):
+    """
+    Aggregated timings per statement fingerprint as a list of dicts with
+    calls, total/mean/max and p50/p95/p99 in milliseconds, rows, slow calls
+    and the last captured plan, sorted by `order_by` descending.
+    """
+    with _lock:
+        snapshot = [(key, dict(entry, samples=sorted(entry['samples']))) for key, entry in _stats.items()]
+    stats = []
+    for key, entry in snapshot:
+        samples = entry['samples']
+        stats.append({
+            'fingerprint': key,
+            'calls': entry['calls'],
+            'total_ms': entry['total_ms'],
+            'mean_ms': entry['total_ms'] / entry['calls'],
+            'p50_ms': percentile(samples, 0.50),
+            'p95_ms': percentile(samples, 0.95),
+            'p99_ms': percentile(samples, 0.99),
+            'max_ms': entry['max_ms'],
+            'rows': entry['rows'],
+            'slow_calls': entry['slow_calls'],
+            'plan': entry['plan'],
+        })
+    stats.sort(key=lambda row: row[order_by], reverse=True)
+    return stats
+
+def slow_queries(limit=50):
+    """Most recent statements over the slow threshold, newest first."""
+    with _lock:
+        return list(_slow_log)[::-1][:limit]
+
+def reset_query_stats():
+    with _lock:
+        _stats.clear()
+        _slow_log.clear()
@@ -0,0 +1,150 @@
+import calendar
+from datetime import datetime, date, timedelta
+from utils.database import get_connection
+
+RECURRENCE_RULES = ('daily', 'weekly', 'monthly')
+
+# Open-ended views (e.g. "All Upcoming") only expand recurring events this far ahead
+DEFAULT_HORIZON_DAYS = 90
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _add_months(start, months):
+    """Return the same day of the month `months` later, or None if that day doesn't exist."""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    if start.day > calendar.monthrange(year, month)[1]:
+        return None
+    return start.replace(year=year, month=month)
+
+def iter_occurrences(first_date, rule, interval=1, until=None, window_start=None, window_end=None):
+    """
+    Lazily yield occurrence dates of a recurrence rule that fall inside
+    [window_start, window_end]. Monthly rules skip months that don't have the
+    series' day (e.g. the 31st).
+    """
+    first_date = _parse_date(first_date)
+    until = _parse_date(until) if until else None
+    window_start = _parse_date(window_start) if window_start else first_date
+    window_end = _parse_date(window_end) if window_end else None
+    interval = max(1, int(interval or 1))
+    last = min(d for d in (until, window_end) if d is not None) if (until or window_end) else None
+    if last is None:
+        raise ValueError("Either until or window_end is required to bound the expansion")
+
+    if rule in ('daily', 'weekly'):
+        step = timedelta(days=interval * (7 if rule == 'weekly' else 1))
+        # Jump straight to the first occurrence inside the window
+        if window_start > first_date:
+            skipped = (window_start - first_date) // step
+            current = first_date + step * skipped
+        else:
+            current = first_date
+        while current <= last:
+            if current >= window_start:
+                yield current
+            current += step
+    elif rule == 'monthly':
+        n = 0
+        if window_start > first_date:
+            # Start one interval before the window to avoid stepping past it
+            months_between = (window_start.year - first_date.year) * 12 + window_start.month - first_date.month
+            n = max(0, months_between // interval - 1) * interval
+        while _add_months(first_date.replace(day=1), n) <= last:
+            current = _add_months(first_date, n)
+            n += interval
+            if current is not None and window_start <= current <= last:
+                yield current
+    else:
+        raise ValueError(f"Unknown recurrence rule: {rule}")
+
+def materialize_occurrences(until):
+    """
+    Extend the event_occurrences index for recurring events up to `until`.
+    Only series whose materialized horizon is short of `until` are expanded,
+    so repeated calls for the same window are a single indexed lookup.
+    """
+    until = _parse_date(until)
+    until_str = until.strftime('%Y-%m-%d')
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, event_date, recurrence_rule, recurrence_interval, recurrence_until, materialized_until
+        FROM events
+        WHERE recurrence_rule IS NOT NULL
+          AND (materialized_until IS NULL OR materialized_until < ?)
+          AND (recurrence_until IS NULL OR materialized_until IS NULL OR materialized_until < recurrence_until)
+    """, (until_str,))
+    pending = cursor.fetchall()
+
+    if pending:
+        rows = []
+        horizons = []
+        for event_id, first_date, rule, interval, series_until, materialized in pending:
+            start = _parse_date(materialized) + timedelta(days=1) if materialized else _parse_date(first_date)
+            for occurrence in iter_occurrences(first_date, rule, interval, series_until, start, until):
+                rows.append((event_id, occurrence.strftime('%Y-%m-%d')))
+            horizons.append((until_str, event_id))
+
+        cursor.executemany("""
+            INSERT OR IGNORE INTO event_occurrences (event_id, occurrence_date)
+            VALUES (?, ?)
+        """, rows)
+        cursor.executemany("UPDATE events SET materialized_until = ? WHERE id = ?", horizons)
+        conn.commit()
+
+    conn.close()
+    return len(pending)
+
+def get_occurrence_rsvp(event_id, occurrence_date, user_id):
+    """
+    Return (status, is_override) for a user on one occurrence: the
+    per-occurrence override if there is one, otherwise the series RSVP.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT status FROM occurrence_rsvps
+        WHERE event_id = ? AND occurrence_date = ? AND user_id = ?
+    """, (event_id, occurrence_date, user_id))
+    override = cursor.fetchone()
+    if override:
+        conn.close()
+        return override[0], True
+    cursor.execute("SELECT status FROM rsvps WHERE event_id = ? AND user_id = ?", (event_id, user_id))
+    series = cursor.fetchone()
+    conn.close()
+    return (series[0] if series else None), False
+
+def set_occurrence_rsvp(event_id, occurrence_date, user_id, status):
+    """Store (or with status=None, clear) a user's RSVP override for one occurrence."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    if status is None:
+        cursor.execute("""
+            DELETE FROM occurrence_rsvps
+            WHERE event_id = ? AND occurrence_date = ? AND user_id = ?
+        """, (event_id, occurrence_date, user_id))
+    else:
+        cursor.execute("""
+            INSERT INTO occurrence_rsvps (event_id, occurrence_date, user_id, status, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (event_id, occurrence_date, user_id) DO UPDATE SET status = excluded.status
+        """, (event_id, occurrence_date, user_id, status, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    conn.commit()
+    conn.close()
+
+def describe_recurrence(rule, interval, until):
+    """Human-readable summary of a recurrence rule, e.g. 'Every 2 weeks until 2025-12-31'."""
+    if not rule:
+        return None
+    interval = int(interval or 1)
+    unit = {'daily': 'day', 'weekly': 'week', 'monthly': 'month'}[rule]
+    text = f"Every {unit}" if interval == 1 else f"Every {interval} {unit}s"
+    if until:
+        text += f" until {until}"
+    return text
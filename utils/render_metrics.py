@@ -0,0 +1,388 @@
+import _lsprof
+import functools
+import io
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.cache import cache_stats
+from utils.query_profiler import percentile, query_stats
+from utils.session_memory import memory_report, run_keys, track_keys
+
+# Local endpoint serving /metrics (Prometheus text) and /metrics.json;
+# METRICS_PORT=0 turns it off
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9464'))
+
+# Recent timings kept per phase for the percentiles
+SAMPLES_PER_TIMER = 1000
+
+# Sessions that haven't rerun for this long are dropped from the rerun table
+SESSION_IDLE_SECONDS = 3600
+
+_timers = {}
+_reruns_by_script = {}
+_sessions = {}
+_lock = threading.Lock()
+
+_server = None
+_server_error = None
+_server_lock = threading.Lock()
+
+# Profile capture of page renders, armed from the admin page. Only one
+# render is profiled at a time.
+_capture = {'remaining': 0, 'page': None, 'stats': None, 'pages': [], 'armed_at': None}
+_profile_lock = threading.Lock()
+
+def _session_id():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else 'bare'
+
+def _observe(script, phase, elapsed_ms):
+    with _lock:
+        entry = _timers.get((script, phase))
+        if entry is None:
+            entry = _timers[(script, phase)] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                'samples': deque(maxlen=SAMPLES_PER_TIMER)}
+        entry['count'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        entry['samples'].append(elapsed_ms)
+
+def record_rerun(script):
+    """Count one run of a script for the current session."""
+    start_metrics_server()
+    now = time.time()
+    session_id = _session_id()
+    with _lock:
+        _reruns_by_script[script] = _reruns_by_script.get(script, 0) + 1
+        session = _sessions.get(session_id)
+        if session is None:
+            session = _sessions[session_id] = {'reruns': 0, 'first_seen': now, 'scripts': {}}
+        session['reruns'] += 1
+        session['last_seen'] = now
+        session['scripts'][script] = session['scripts'].get(script, 0) + 1
+        for stale in [sid for sid, s in _sessions.items() if now - s['last_seen'] > SESSION_IDLE_SECONDS]:
+            del _sessions[stale]
+
+class RunTimer:
+    """
+    Lap timer for the phases of one script run: each lap() records the time
+    since the previous one under the given phase name.
+    """
+
+    def __init__(self, script):
+        self.script = script
+        self.keys = run_keys()
+        self.started = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        _observe(self.script, phase, (now - self._last) * 1000)
+        self._last = now
+
+    def finish(self):
+        _observe(self.script, 'total', (time.perf_counter() - self.started) * 1000)
+        track_keys(self.script, self.keys)
+
+def start_run(script):
+    """Count a rerun of `script` and return a RunTimer for its phases."""
+    record_rerun(script)
+    return RunTimer(script)
+
+def _label(code):
+    if isinstance(code, str):
+        return ('~', 0, code)
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+class _Profiler(_lsprof.Profiler):
+    """
+    cProfile.Profile without importing cProfile: it imports the stdlib
+    `profile` module, which pages/profile.py shadows whenever pages/ is on
+    sys.path (as under AppTest). create_stats() builds the same table.
+    """
+
+    def create_stats(self):
+        self.disable()
+        entries = self.getstats()
+        self.stats = {}
+        callers_by_code = {}
+        for entry in entries:
+            callers = callers_by_code[id(entry.code)] = {}
+            self.stats[_label(entry.code)] = (entry.callcount - entry.reccallcount, entry.callcount,
+                                              entry.inlinetime, entry.totaltime, callers)
+        for entry in entries:
+            func = _label(entry.code)
+            for sub in entry.calls or ():
+                callers = callers_by_code.get(id(sub.code))
+                if callers is None:
+                    continue
+                nc, cc = sub.callcount, sub.callcount - sub.reccallcount
+                tt, ct = sub.inlinetime, sub.totaltime
+                if func in callers:
+                    prev = callers[func]
+                    nc, cc, tt, ct = nc + prev[0], cc + prev[1], tt + prev[2], ct + prev[3]
+                callers[func] = nc, cc, tt, ct
+
+def _start_capture(page):
+    with _lock:
+        if _capture['remaining'] <= 0 or _capture['page'] not in (None, page):
+            return None
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        _capture['remaining'] -= 1
+    profiler = _Profiler()
+    profiler.enable()
+    return profiler
+
+def _finish_capture(profiler, page):
+    profiler.disable()
+    try:
+        with _lock:
+            if _capture['stats'] is None:
+                _capture['stats'] = pstats.Stats(profiler, stream=io.StringIO())
+            else:
+                _capture['stats'].add(profiler)
+            _capture['pages'].append(page)
+    finally:
+        _profile_lock.release()
+
+def timed_page(name):
+    """
+    Decorator for a page's app(): counts the rerun, times the render,
+    attributes the session state keys it creates to the page and, while a
+    capture is armed, runs it under cProfile.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            record_rerun(name)
+            keys = run_keys()
+            profiler = _start_capture(name)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                # st.rerun() and st.stop() end the render by raising
+                _observe(name, 'render', (time.perf_counter() - started) * 1000)
+                track_keys(name, keys)
+                if profiler is not None:
+                    _finish_capture(profiler, name)
+        return wrapper
+    return decorator
+
+def render_stats():
+    """Timings per (script, phase) as dicts with count, total, mean, max and p50/p95/p99 in ms."""
+    with _lock:
+        snapshot = [(key, dict(entry, samples=sorted(entry['samples']))) for key, entry in _timers.items()]
+    stats = []
+    for (script, phase), entry in sorted(snapshot):
+        samples = entry['samples']
+        stats.append({
+            'script': script,
+            'phase': phase,
+            'count': entry['count'],
+            'total_ms': entry['total_ms'],
+            'mean_ms': entry['total_ms'] / entry['count'],
+            'p50_ms': percentile(samples, 0.50),
+            'p95_ms': percentile(samples, 0.95),
+            'p99_ms': percentile(samples, 0.99),
+            'max_ms': entry['max_ms'],
+        })
+    return stats
+
+def rerun_stats():
+    """Reruns per script since startup, and per-session rerun counts for active sessions."""
+    session_id = _session_id()
+    with _lock:
+        reruns = [s['reruns'] for s in _sessions.values()]
+        return {
+            'by_script': dict(_reruns_by_script),
+            'active_sessions': len(_sessions),
+            'session_reruns_mean': sum(reruns) / len(reruns) if reruns else 0,
+            'session_reruns_max': max(reruns, default=0),
+            'this_session': _sessions.get(session_id, {}).get('reruns', 0),
+        }
+
+def reset_render_stats():
+    with _lock:
+        _timers.clear()
+
+def start_profile_capture(renders=10, page=None):
+    """Profile the next `renders` page renders (of `page` only, if given), discarding earlier results."""
+    with _lock:
+        _capture.update(remaining=renders, page=page, stats=None, pages=[],
+                        armed_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+def profile_capture_status():
+    with _lock:
+        return {'remaining': _capture['remaining'], 'page': _capture['page'],
+                'captured': len(_capture['pages']), 'armed_at': _capture['armed_at']}
+
+def profile_report(sort='cumulative', limit=40):
+    """The captured profile as pstats text, or None if nothing was captured."""
+    with _lock:
+        stats = _capture['stats']
+        if stats is None:
+            return None
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+def profile_dump():
+    """The captured profile in .prof format (for snakeviz, pstats etc.), or None."""
+    with _lock:
+        if _capture['stats'] is None:
+            return None
+        return marshal.dumps(_capture['stats'].stats)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_metrics():
+    """Render timings, rerun counts, SQL totals and cache counters in the Prometheus text format."""
+    lines = [
+        "# HELP community_hub_render_seconds Time spent in each phase of a script run or page render.",
+        "# TYPE community_hub_render_seconds summary",
+    ]
+    for s in render_stats():
+        labels = f'script="{_escape(s["script"])}",phase="{_escape(s["phase"])}"'
+        for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+            lines.append(f'community_hub_render_seconds{{{labels},quantile="{quantile}"}} {s[key] / 1000:.6f}')
+        lines.append(f'community_hub_render_seconds_sum{{{labels}}} {s["total_ms"] / 1000:.6f}')
+        lines.append(f'community_hub_render_seconds_count{{{labels}}} {s["count"]}')
+
+    reruns = rerun_stats()
+    lines += [
+        "# HELP community_hub_reruns_total Script runs since the server started.",
+        "# TYPE community_hub_reruns_total counter",
+    ]
+    for script, count in sorted(reruns['by_script'].items()):
+        lines.append(f'community_hub_reruns_total{{script="{_escape(script)}"}} {count}')
+    lines += [
+        "# HELP community_hub_active_sessions Sessions that reran within the idle window.",
+        "# TYPE community_hub_active_sessions gauge",
+        f"community_hub_active_sessions {reruns['active_sessions']}",
+    ]
+
+    queries = query_stats()
+    lines += [
+        "# HELP community_hub_sql_seconds Time spent in SQL statements, all statements combined.",
+        "# TYPE community_hub_sql_seconds summary",
+        f"community_hub_sql_seconds_sum {sum(q['total_ms'] for q in queries) / 1000:.6f}",
+        f"community_hub_sql_seconds_count {sum(q['calls'] for q in queries)}",
+        "# HELP community_hub_sql_slow_total Statements over the slow query threshold.",
+        "# TYPE community_hub_sql_slow_total counter",
+        f"community_hub_sql_slow_total {sum(q['slow_calls'] for q in queries)}",
+    ]
+
+    cache = cache_stats()
+    lines += [
+        "# HELP community_hub_cache_requests_total Cached calls by function and result.",
+        "# TYPE community_hub_cache_requests_total counter",
+    ]
+    for site in cache['sites']:
+        for result, key in (('hit', 'hits'), ('miss', 'misses')):
+            lines.append(f'community_hub_cache_requests_total{{site="{_escape(site["name"])}",'
+                         f'result="{result}"}} {site[key]}')
+    lines += [
+        "# HELP community_hub_cache_evictions_total Entries dropped to stay within the memory budget.",
+        "# TYPE community_hub_cache_evictions_total counter",
+    ]
+    for site in cache['sites']:
+        lines.append(f'community_hub_cache_evictions_total{{site="{_escape(site["name"])}"}} {site["evictions"]}')
+    lines += [
+        "# HELP community_hub_cache_invalidations_total Entries dropped because a tag was invalidated.",
+        "# TYPE community_hub_cache_invalidations_total counter",
+    ]
+    for site in cache['sites']:
+        lines.append(f'community_hub_cache_invalidations_total{{site="{_escape(site["name"])}"}} '
+                     f'{site["invalidations"]}')
+    lines += [
+        "# HELP community_hub_cache_bytes Pickled size of all cached values.",
+        "# TYPE community_hub_cache_bytes gauge",
+        f"community_hub_cache_bytes {cache['bytes']}",
+        "# HELP community_hub_cache_entries Cached values.",
+        "# TYPE community_hub_cache_entries gauge",
+        f"community_hub_cache_entries {cache['entries']}",
+    ]
+
+    # Last reaper measurement; sizing every session on each scrape costs too much
+    sessions = memory_report(refresh=False)
+    lines += [
+        "# HELP community_hub_session_state_bytes Session state held by this process, per page that created the keys.",
+        "# TYPE community_hub_session_state_bytes gauge",
+    ]
+    for page in sessions['pages']:
+        lines.append(f'community_hub_session_state_bytes{{page="{_escape(page["page"])}"}} {page["bytes"]}')
+    lines += [
+        "# HELP community_hub_session_uploaded_bytes Uploaded files held in memory for open sessions.",
+        "# TYPE community_hub_session_uploaded_bytes gauge",
+        f"community_hub_session_uploaded_bytes {sessions['uploaded_bytes']}",
+        "# HELP community_hub_session_evictions_total Sessions whose state was cleared or trimmed.",
+        "# TYPE community_hub_session_evictions_total counter",
+        f'community_hub_session_evictions_total{{reason="idle"}} {sessions["evictions"]["idle_sessions"]}',
+        f'community_hub_session_evictions_total{{reason="cap"}} {sessions["evictions"]["capped_sessions"]}',
+    ]
+    return "\n".join(lines) + "\n"
+
+def json_metrics():
+    return json.dumps({
+        'render': render_stats(),
+        'reruns': rerun_stats(),
+        'queries': [dict(q, plan=None) for q in query_stats()],
+        'cache': cache_stats(),
+        'sessions': memory_report(refresh=False),
+    })
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = prometheus_metrics(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = json_metrics(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server():
+    """Serve the metrics endpoint from a daemon thread; once per process."""
+    global _server, _server_error
+    if METRICS_PORT == 0:
+        return None
+    with _server_lock:
+        if _server is None and _server_error is None:
+            try:
+                _server = ThreadingHTTPServer((METRICS_HOST, METRICS_PORT), _MetricsHandler)
+            except OSError as e:
+                # e.g. another process already serves the port
+                _server_error = str(e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
+
+def metrics_endpoint():
+    """URL of this process's metrics endpoint, or None with the reason it isn't running."""
+    if METRICS_PORT == 0:
+        return None, "disabled (METRICS_PORT=0)"
+    if _server is None:
+        return None, _server_error or "not started"
+    host, port = _server.server_address[:2]
+    return f"http://{host}:{port}/metrics", None
@@ -1,4 +1,5 @@
 import streamlit as st
+from utils.stylesheet import inject_stylesheet
 
 def get_device_type():
     """
@@ -12,132 +13,9 @@ def get_device_type():
 def apply_responsive_styles():
     """
     Apply responsive CSS styles for different device types.
-    This improves the mobile experience significantly.
+    The rules live in styles/responsive.css and ship in the app stylesheet bundle.
     """
-    responsive_css = """
-    <style>
-        /* Base styles for all devices */
-        .main .block-container {
-            padding-top: 1rem;
-            padding-bottom: 1rem;
-        }
-        
-        /* Mobile styles (max-width: 640px) */
-        @media (max-width: 640px) {
-            .main .block-container {
-                padding-left: 0.5rem;
-                padding-right: 0.5rem;
-                padding-top: 0.5rem;
-            }
-            h1 {
-                font-size: 1.8rem !important;
-            }
-            h2 {
-                font-size: 1.4rem !important;
-            }
-            h3 {
-                font-size: 1.2rem !important;
-            }
-            .stButton > button {
-                width: 100%;
-            }
-            .mobile-hidden {
-                display: none !important;
-            }
-            .mobile-smaller {
-                font-size: 0.8rem !important;
-            }
-            /* Make cards stack on mobile */
-            div[data-testid="column"] {
-                width: 100% !important;
-                margin-bottom: 1rem;
-            }
-            /* Sidebar adjustments */
-            section[data-testid="stSidebar"] {
-                width: 80% !important;
-                min-width: unset !important;
-            }
-            /* Reduce padding in forms */
-            div[data-testid="stVerticalBlock"] > div {
-                padding-top: 0.25rem !important;
-                padding-bottom: 0.25rem !important;
-            }
-        }
-        
-        /* Tablet styles (max-width: 1024px) */
-        @media (min-width: 641px) and (max-width: 1024px) {
-            .tablet-smaller {
-                font-size: 0.9rem !important;
-            }
-            /* Adjust column layout for tablets */
-            div[data-testid="column"]:nth-of-type(2n) {
-                margin-right: 0 !important;
-            }
-        }
-
-        /* Card component for responsive layout */
-        .card {
-            border-radius: 0.5rem;
-            padding: 1rem;
-            margin-bottom: 1rem;
-            background-color: #f8f9fa;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.12), 0 1px 2px rgba(0,0,0,0.24);
-        }
-        
-        /* Responsive grid system */
-        .grid-container {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-            gap: 1rem;
-        }
-        
-        /* Responsive table */
-        .responsive-table {
-            width: 100%;
-            overflow-x: auto;
-        }
-        
-        /* Bottom navigation for mobile */
-        .mobile-bottom-nav {
-            display: none;
-        }
-        
-        @media (max-width: 640px) {
-            .mobile-bottom-nav {
-                display: flex;
-                position: fixed;
-                bottom: 0;
-                left: 0;
-                width: 100%;
-                background: #ffffff;
-                box-shadow: 0 -2px 5px rgba(0,0,0,0.1);
-                z-index: 1000;
-                justify-content: space-around;
-                padding: 0.5rem 0;
-            }
-            .mobile-bottom-nav a {
-                text-align: center;
-                padding: 0.5rem;
-                color: #555;
-                text-decoration: none;
-                font-size: 0.7rem;
-            }
-            .mobile-bottom-nav a.active {
-                color: #1E88E5;
-            }
-            .mobile-bottom-nav-icon {
-                font-size: 1.2rem;
-                margin-bottom: 0.2rem;
-            }
-            
-            /* Add padding to bottom of page to account for nav bar */
-            body {
-                padding-bottom: 4rem;
-            }
-        }
-    </style>
-    """
-    st.markdown(responsive_css, unsafe_allow_html=True)
+    inject_stylesheet('app')
 
 def create_responsive_grid(columns=3, content_list=None, style="card"):
     """
@@ -0,0 +1,114 @@
+from datetime import datetime
+from utils.database import write_transaction
+
+RSVP_STATUSES = ('attending', 'maybe', 'not_attending')
+
+# Upsert a user's RSVP in one statement. Re-sending the current status keeps
+# the original timestamp, so a waitlisted user never loses their place in line,
+# and a user who already holds a seat keeps it even if the event is now full.
+UPSERT_RSVP_SQL = """
+    INSERT INTO rsvps (event_id, user_id, status, created_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (event_id, user_id) DO UPDATE SET
+        status = CASE
+            WHEN rsvps.status = 'attending' AND excluded.status = 'waitlisted' THEN 'attending'
+            ELSE excluded.status
+        END,
+        created_at = CASE
+            WHEN rsvps.status = excluded.status
+                 OR (rsvps.status = 'attending' AND excluded.status = 'waitlisted')
+            THEN rsvps.created_at
+            ELSE excluded.created_at
+        END
+    RETURNING status
+"""
+
+def _promote_waitlist(conn, event_id, open_seats):
+    """Move the earliest waitlisted RSVPs into open seats. Returns promoted user ids."""
+    if open_seats <= 0:
+        return []
+    rows = conn.execute("""
+        UPDATE rsvps
+        SET status = 'attending'
+        WHERE id IN (
+            SELECT id FROM rsvps
+            WHERE event_id = ? AND status = 'waitlisted'
+            ORDER BY created_at, id
+            LIMIT ?
+        )
+        RETURNING user_id
+    """, (event_id, open_seats)).fetchall()
+    return [row[0] for row in rows]
+
+def promote_waitlists(conn, event_ids):
+    """
+    Fill open seats from the waitlist on each of the given capped events, inside
+    the caller's write transaction. Returns the promoted user ids.
+    """
+    promoted = []
+    for event_id in event_ids:
+        row = conn.execute("""
+            SELECT e.capacity, COALESCE(s.attending, 0)
+            FROM events e
+            LEFT JOIN event_stats s ON s.event_id = e.id
+            WHERE e.id = ? AND e.capacity IS NOT NULL
+        """, (event_id,)).fetchone()
+        if row:
+            promoted.extend(_promote_waitlist(conn, event_id, row[0] - row[1]))
+    return promoted
+
+def set_rsvp(event_id, user_id, status):
+    """
+    Record a user's RSVP for an event.
+
+    The capacity check, the upsert and any waitlist promotion run in one short
+    write transaction, so concurrent clicks can never overbook an event.
+    Returns (stored_status, promoted_user_ids), where stored_status is
+    'waitlisted' if the user asked to attend a full event, or None if the
+    event does not exist.
+    """
+    if status not in RSVP_STATUSES:
+        raise ValueError(f"Unknown RSVP status: {status}")
+
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with write_transaction() as conn:
+        event = conn.execute("""
+            SELECT e.capacity, COALESCE(s.attending, 0)
+            FROM events e
+            LEFT JOIN event_stats s ON s.event_id = e.id
+            WHERE e.id = ?
+        """, (event_id,)).fetchone()
+        if event is None:
+            return None, []
+
+        capacity, attending = event
+        requested = status
+        if status == 'attending' and capacity is not None and attending >= capacity:
+            requested = 'waitlisted'
+
+        stored_status = conn.execute(UPSERT_RSVP_SQL, (event_id, user_id, requested, now)).fetchone()[0]
+
+        promoted = []
+        if capacity is not None:
+            # A seat may have been freed by this change; hand it to the waitlist
+            attending = conn.execute("SELECT attending FROM event_stats WHERE event_id = ?",
+                                     (event_id,)).fetchone()[0]
+            promoted = _promote_waitlist(conn, event_id, capacity - attending)
+
+    return stored_status, promoted
+
+def set_event_capacity(event_id, capacity):
+    """
+    Change an event's capacity (None for unlimited) and fill any newly opened
+    seats from the waitlist. Returns the promoted user ids.
+    """
+    with write_transaction() as conn:
+        conn.execute("UPDATE events SET capacity = ? WHERE id = ?", (capacity, event_id))
+        row = conn.execute("SELECT attending, waitlisted FROM event_stats WHERE event_id = ?",
+                           (event_id,)).fetchone()
+        promoted = []
+        if row:
+            attending, waitlisted = row
+            open_seats = waitlisted if capacity is None else capacity - attending
+            promoted = _promote_waitlist(conn, event_id, open_seats)
+    return promoted
@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from streamlit.runtime import Runtime
+from streamlit.runtime.app_session import AppSessionState
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.stats import safe_sizeof
+
+# Login state every page relies on; never evicted
+PROTECTED_KEYS = {'authenticated', 'user_id', 'username', 'role', 'show_splash'}
+
+# Sessions that haven't run for this long lose everything else in their
+# state, and their uploaded files. Pages re-create their keys with defaults
+# and the browser sends its widget values again on the next interaction.
+# 0 turns idle eviction off.
+SESSION_IDLE_EVICT_SECONDS = int(os.environ.get('SESSION_IDLE_EVICT_SECONDS', '900'))
+
+# Cap on one session's state; above it the largest unprotected keys are
+# dropped first. 0 turns the cap off.
+SESSION_STATE_MAX_BYTES = int(os.environ.get('SESSION_STATE_MAX_KB', '512')) * 1024
+
+REAPER_INTERVAL_SECONDS = 60
+
+# Widget values without a user key are reported together under this name
+UNKEYED_WIDGETS = '(widgets without a key)'
+
+_key_pages = {}
+_last_run = {}
+_last_report = {'at': None, 'sessions': [], 'error': None}
+_evictions = {'idle_sessions': 0, 'idle_keys': 0, 'idle_bytes': 0, 'uploaded_bytes': 0,
+              'capped_sessions': 0, 'capped_keys': 0, 'capped_bytes': 0, 'reaper_failures': 0}
+_lock = threading.Lock()
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+def run_keys():
+    """Keys in the current session's state, to pass to track_keys() after a render."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return set()
+    with _lock:
+        _last_run[ctx.session_id] = time.time()
+    return set(ctx.session_state.filtered_state)
+
+def track_keys(page, before):
+    """Attribute keys the current run added since `before` to `page` (first creator wins)."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return
+    new_keys = set(ctx.session_state.filtered_state) - before
+    if new_keys:
+        with _lock:
+            for key in new_keys:
+                _key_pages.setdefault(key, page)
+
+def _state_sizes(state):
+    """Bytes per key of one SessionState; widget values without a key are summed under one name."""
+    names = state._key_id_mapper.id_key_mapping
+    sizes = {}
+    for key in list(state._keys()):
+        name = names.get(key, key)
+        if name.startswith('$$'):
+            name = UNKEYED_WIDGETS
+        try:
+            value = state[key]
+        except (KeyError, AttributeError):
+            continue
+        sizes[name] = sizes.get(name, 0) + safe_sizeof(value)
+    return sizes
+
+def _uploaded_bytes(runtime, session_id):
+    storage = getattr(runtime.uploaded_file_mgr, 'file_storage', None)
+    if not storage:
+        return 0
+    return sum(len(rec.data) for rec in list(storage.get(session_id, {}).values()))
+
+def _sessions():
+    if not Runtime.exists():
+        return None, []
+    runtime = Runtime.instance()
+    # Private API; test harnesses stand in a runtime without it
+    session_mgr = getattr(runtime, '_session_mgr', None)
+    if session_mgr is None:
+        return runtime, []
+    return runtime, session_mgr.list_sessions()
+
+def _delete(state, names):
+    """Drop user keys (and keyed widget values) from a session's state; returns the keys dropped."""
+    dropped = []
+    for name in names:
+        if name == UNKEYED_WIDGETS or name in PROTECTED_KEYS:
+            continue
+        try:
+            del state[name]
+            dropped.append(name)
+        except KeyError:
+            pass
+    return dropped
+
+def reap_sessions(evict=True, now=None):
+    """
+    One pass over this process's sessions: measure each one's state and,
+    with evict, clear idle ones and trim any over the cap. Sessions in the
+    middle of a run are only measured. Returns the per-session report it stored.
+    """
+    now = now or time.time()
+    runtime, sessions = _sessions()
+    report = []
+    for info in sessions:
+        session = info.session
+        state = session.session_state
+        running = session._state == AppSessionState.APP_IS_RUNNING
+        with _lock:
+            last_run = _last_run.get(session.id)
+        idle = now - last_run if last_run else None
+        try:
+            sizes = _state_sizes(state)
+        except RuntimeError:
+            continue  # state changed size under us; measured next pass
+        uploaded = _uploaded_bytes(runtime, session.id)
+        can_evict = evict and not running
+        action, dropped = None, []
+
+        if can_evict and SESSION_IDLE_EVICT_SECONDS and (idle is None or idle > SESSION_IDLE_EVICT_SECONDS):
+            dropped = _delete(state, list(sizes))
+            if dropped or uploaded:
+                runtime.uploaded_file_mgr.remove_session_files(session.id)
+                with _lock:
+                    _evictions['idle_sessions'] += 1
+                    _evictions['idle_keys'] += len(dropped)
+                    _evictions['idle_bytes'] += sum(sizes[name] for name in dropped)
+                    _evictions['uploaded_bytes'] += uploaded
+                uploaded, action = 0, 'idle'
+        elif can_evict and SESSION_STATE_MAX_BYTES and sum(sizes.values()) > SESSION_STATE_MAX_BYTES:
+            over = sum(sizes.values()) - SESSION_STATE_MAX_BYTES
+            largest = []
+            for name, size in sorted(sizes.items(), key=lambda item: -item[1]):
+                if over <= 0:
+                    break
+                if name != UNKEYED_WIDGETS and name not in PROTECTED_KEYS:
+                    largest.append(name)
+                    over -= size
+            dropped = _delete(state, largest)
+            with _lock:
+                _evictions['capped_sessions'] += 1
+                _evictions['capped_keys'] += len(dropped)
+                _evictions['capped_bytes'] += sum(sizes[name] for name in dropped)
+            action = 'capped'
+        for name in dropped:
+            del sizes[name]
+
+        report.append({'session_id': session.id, 'bytes': sum(sizes.values()), 'uploaded_bytes': uploaded,
+                       'keys': sizes, 'idle_seconds': idle, 'running': running, 'action': action})
+
+    live = {entry['session_id'] for entry in report}
+    with _lock:
+        for session_id in [sid for sid in _last_run if sid not in live]:
+            del _last_run[session_id]
+        _last_report.update(at=now, sessions=report)
+    return report
+
+def memory_report(refresh=True):
+    """
+    Session memory of this process: per session, per key (with the page
+    that created it) and per page, plus eviction counters. refresh=False
+    returns the reaper's last measurement instead of measuring again.
+    """
+    sessions = reap_sessions(evict=False) if refresh else _last_report['sessions']
+    with _lock:
+        key_pages = dict(_key_pages)
+        evictions = dict(_evictions)
+        measured_at = _last_report['at']
+        reaper_error = _last_report['error']
+
+    keys = {}
+    for session in sessions:
+        for name, size in session['keys'].items():
+            entry = keys.setdefault(name, {'key': name, 'page': key_pages.get(name, '-'),
+                                           'sessions': 0, 'bytes': 0, 'max_bytes': 0})
+            entry['sessions'] += 1
+            entry['bytes'] += size
+            entry['max_bytes'] = max(entry['max_bytes'], size)
+    pages = {}
+    for entry in keys.values():
+        page = pages.setdefault(entry['page'], {'page': entry['page'], 'keys': 0, 'bytes': 0})
+        page['keys'] += 1
+        page['bytes'] += entry['bytes']
+
+    return {
+        'measured_at': measured_at,
+        'sessions': sorted(sessions, key=lambda s: -(s['bytes'] + s['uploaded_bytes'])),
+        'keys': sorted(keys.values(), key=lambda k: -k['bytes']),
+        'pages': sorted(pages.values(), key=lambda p: -p['bytes']),
+        'total_bytes': sum(s['bytes'] for s in sessions),
+        'uploaded_bytes': sum(s['uploaded_bytes'] for s in sessions),
+        'evictions': evictions,
+        'reaper_error': reaper_error,
+        'idle_evict_seconds': SESSION_IDLE_EVICT_SECONDS,
+        'max_bytes': SESSION_STATE_MAX_BYTES,
+    }
+
+def _reaper_loop():
+    while True:
+        time.sleep(REAPER_INTERVAL_SECONDS)
+        try:
+            reap_sessions()
+        except Exception as e:
+            # Counted and shown on the admin Performance tab; the next pass retries
+            with _lock:
+                _evictions['reaper_failures'] += 1
+                _last_report['error'] = (time.time(), f"{type(e).__name__}: {e}")
+
+def start_session_reaper():
+    """Start the idle-session reaper in a daemon thread; once per process."""
+    global _reaper
+    if not (SESSION_IDLE_EVICT_SECONDS or SESSION_STATE_MAX_BYTES):
+        return None
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reaper_loop, name="session-reaper", daemon=True)
+            _reaper.start()
+    return _reaper
@@ -0,0 +1,137 @@
+import glob
+import hashlib
+import os
+import re
+import threading
+import time
+import streamlit as st
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STYLES_DIR = os.path.join(ROOT, 'styles')
+
+# Streamlit serves this directory at app/static/ when server.enableStaticServing is on
+STATIC_DIR = os.path.join(ROOT, 'static')
+BUNDLE_DIR = os.path.join(STATIC_DIR, 'css')
+BUNDLE_URL = 'app/static/css'
+
+# Source files per bundle, in cascade order. The auth styles restyle every
+# button, tab and text input, so they stay a separate bundle that is only
+# referenced from the login screen. Page-specific styles get their own
+# bundle, referenced from that page.
+BUNDLES = {
+    'app': ['responsive.css', 'base.css', 'splash.css', 'navigation.css', 'footer.css'],
+    'auth': ['auth.css'],
+    'discussions': ['discussions.css'],
+    'messages': ['messages.css'],
+}
+
+# Bundles from older builds are removed once they are this old, so sessions
+# still holding the previous hash keep working through a deploy
+STALE_BUNDLE_SECONDS = 86400
+
+_bundles = {}
+_lock = threading.Lock()
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_STRING = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')""")
+_SPACE_AROUND = re.compile(r"\s*([{};,>])\s*")
+_SPACE_AFTER_COLON = re.compile(r":\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+def minify_css(css):
+    """Strip comments and redundant whitespace, leaving string literals alone."""
+    css = _COMMENT.sub('', css)
+    parts = _STRING.split(css)
+    for i in range(0, len(parts), 2):
+        part = _WHITESPACE.sub(' ', parts[i])
+        part = _SPACE_AROUND.sub(r'\1', part)
+        parts[i] = _SPACE_AFTER_COLON.sub(':', part)
+    return ''.join(parts).replace(';}', '}').strip()
+
+def _write_bundle(name, css, digest):
+    path = os.path.join(BUNDLE_DIR, f"{name}.{digest}.css")
+    if not os.path.exists(path):
+        os.makedirs(BUNDLE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(css)
+        os.replace(tmp_path, path)
+    now = time.time()
+    for old in glob.glob(os.path.join(BUNDLE_DIR, f"{name}.*.css")):
+        if old != path and now - os.path.getmtime(old) > STALE_BUNDLE_SECONDS:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return path
+
+def build_bundle(name):
+    """
+    Concatenate and minify a bundle's sources and write it to static/css/
+    under a content-hashed name. Built once per process; returns a dict
+    with the file name, URL, CSS and byte counts.
+    """
+    with _lock:
+        bundle = _bundles.get(name)
+        if bundle is not None:
+            return bundle
+        sources = []
+        for source in BUNDLES[name]:
+            with open(os.path.join(STYLES_DIR, source), encoding='utf-8') as f:
+                sources.append(f.read())
+        css = minify_css('\n'.join(sources))
+        digest = hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+        try:
+            path = _write_bundle(name, css, digest)
+            error = None
+        except OSError as e:
+            path, error = None, str(e)
+        bundle = _bundles[name] = {
+            'name': name,
+            'sources': BUNDLES[name],
+            'hash': digest,
+            'file': path and os.path.basename(path),
+            'url': path and f"{BUNDLE_URL}/{os.path.basename(path)}",
+            'css': css,
+            'source_bytes': sum(len(s.encode('utf-8')) for s in sources),
+            'minified_bytes': len(css.encode('utf-8')),
+            'error': error,
+        }
+        return bundle
+
+def _static_serving():
+    try:
+        return bool(st.get_option('server.enableStaticServing'))
+    except Exception:
+        return False
+
+def _reference(bundle):
+    """Markup sent on each rerun: an @import of the cached file, or the CSS itself as a fallback."""
+    if bundle['url'] and _static_serving():
+        return f'<style>@import url("{bundle["url"]}");</style>'
+    return f"<style>{bundle['css']}</style>"
+
+def inject_stylesheet(name='app'):
+    """
+    Reference a bundle from the current script run. Streamlit drops
+    elements a rerun doesn't emit again, so this is called on every run;
+    it costs a short @import while the browser fetches the file once per
+    content hash.
+    """
+    st.markdown(_reference(build_bundle(name)), unsafe_allow_html=True)
+
+def stylesheet_stats():
+    """Per bundle: inline bytes each rerun used to carry versus the reference sent now."""
+    stats = []
+    for name in BUNDLES:
+        bundle = build_bundle(name)
+        stats.append({
+            'bundle': name,
+            'file': bundle['file'],
+            'inline_bytes': bundle['source_bytes'],
+            'minified_bytes': bundle['minified_bytes'],
+            'rerun_bytes': len(_reference(bundle).encode('utf-8')),
+            'static_serving': bool(bundle['url']) and _static_serving(),
+            'error': bundle['error'],
+        })
+    return stats
@@ -0,0 +1,46 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from utils.database import get_connection, write_transaction
+
+# A discussion's hot score sums its opening post and each comment on it from
+# the last HOT_WINDOW_DAYS, every one weighted by half for each
+# HOT_HALF_LIFE_HOURS of its age. A burst of fresh comments outranks a long
+# thread that has gone quiet; anything older than the window no longer counts.
+HOT_HALF_LIFE_HOURS = 12
+HOT_WINDOW_DAYS = 7
+
+# Discussions shown under the Trending sort
+TRENDING_FEED_SIZE = 50
+
+def hot_scores(now=None):
+    """
+    Hot score of every discussion with activity in the window, as
+    {discussion_id: score}, from range scans of the created_at indexes.
+    """
+    now = now or datetime.now()
+    now_text = now.strftime('%Y-%m-%d %H:%M:%S')
+    cutoff = (now - timedelta(days=HOT_WINDOW_DAYS)).strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT id, (julianday(?) - julianday(created_at)) * 24 FROM discussions WHERE created_at >= ?
+        UNION ALL
+        SELECT discussion_id, (julianday(?) - julianday(created_at)) * 24 FROM comments WHERE created_at >= ?
+    """, (now_text, cutoff, now_text, cutoff)).fetchall()
+    conn.close()
+    scores = defaultdict(float)
+    for discussion_id, age_hours in rows:
+        scores[discussion_id] += 0.5 ** (max(age_hours, 0) / HOT_HALF_LIFE_HOURS)
+    return scores
+
+def recompute_hot_scores(now=None):
+    """
+    Store fresh hot scores in discussions.hot_score; discussions that left
+    the window drop back to 0. Run by the maintenance scheduler. Returns the
+    number of discussions with a score.
+    """
+    scores = hot_scores(now)
+    with write_transaction() as conn:
+        conn.execute("UPDATE discussions SET hot_score = 0 WHERE hot_score > 0")
+        conn.executemany("UPDATE discussions SET hot_score = ? WHERE id = ?",
+                         [(score, discussion_id) for discussion_id, score in scores.items()])
+    return len(scores)
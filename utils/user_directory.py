@@ -0,0 +1,152 @@
+import streamlit as st
+from utils.database import get_connection
+
+DIRECTORY_COLUMNS = ("id", "username", "email", "role", "created_at", "last_login",
+                     "discussions", "comments", "resources", "events", "rsvps")
+
+STAT_COLUMNS = ("discussions", "comments", "resources", "events", "rsvps", "attending")
+
+# Sortable columns mapped to their SQL expressions; anything else is rejected
+SORT_COLUMNS = {
+    "username": "u.username COLLATE NOCASE",
+    "email": "u.email COLLATE NOCASE",
+    "created_at": "u.created_at",
+    "last_login": "u.last_login",
+    "discussions": "COALESCE(s.discussions, 0)",
+    "comments": "COALESCE(s.comments, 0)",
+    "resources": "COALESCE(s.resources, 0)",
+    "events": "COALESCE(s.events, 0)",
+    "rsvps": "COALESCE(s.rsvps, 0)",
+}
+
+SEARCH_FIELDS = ("username", "email")
+
+def _prefix_bounds(prefix):
+    """
+    Turn a prefix into a half-open [low, high) range, so the search can use
+    the NOCASE index on the column instead of scanning it with LIKE.
+    """
+    # NOCASE only folds ASCII letters, so only fold those here too
+    low = "".join(c.lower() if c.isascii() else c for c in prefix)
+    # The bound must be the successor in folded order: NOCASE reads A-Z as
+    # a-z, so after '@' comes '[', not 'A' (which would cover '[' to '`')
+    successor = chr(ord(low[-1]) + 1)
+    if "A" <= successor <= "Z":
+        successor = "["
+    return low, low[:-1] + successor
+
+def _search_clause(prefix, field):
+    if not prefix:
+        return "", []
+    if field not in SEARCH_FIELDS:
+        raise ValueError(f"Unknown search field: {field}")
+    low, high = _prefix_bounds(prefix)
+    return f" WHERE u.{field} >= ? COLLATE NOCASE AND u.{field} < ? COLLATE NOCASE", [low, high]
+
+def count_users(prefix="", field="username"):
+    """Number of users whose `field` starts with prefix (all users if it's empty)."""
+    where, params = _search_clause(prefix.strip(), field)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM users u{where}", params)
+    total = cursor.fetchone()[0]
+    conn.close()
+    return total
+
+def list_users(page=1, page_size=50, sort="username", descending=False, prefix="", field="username"):
+    """
+    Return one page of the user directory.
+
+    Rows are dicts with the user's account fields and activity counters read
+    from user_stats. `prefix` narrows the directory to users whose `field`
+    (username or email) starts with it, case-insensitively.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort column: {sort}")
+    page = max(1, int(page))
+    page_size = max(1, int(page_size))
+    where, params = _search_clause(prefix.strip(), field)
+    direction = "DESC" if descending else "ASC"
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT u.id, u.username, u.email, u.role, u.created_at, u.last_login,
+               COALESCE(s.discussions, 0), COALESCE(s.comments, 0), COALESCE(s.resources, 0),
+               COALESCE(s.events, 0), COALESCE(s.rsvps, 0)
+        FROM users u
+        LEFT JOIN user_stats s ON s.user_id = u.id
+        {where}
+        ORDER BY {SORT_COLUMNS[sort]} {direction}, u.id {direction}
+        LIMIT ? OFFSET ?
+    """, params + [page_size, (page - 1) * page_size])
+    rows = [dict(zip(DIRECTORY_COLUMNS, row)) for row in cursor.fetchall()]
+    conn.close()
+    return rows
+
+def get_user_stats(user_id):
+    """Return a user's activity counters as a dict (all zero if they have none yet)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(STAT_COLUMNS)} FROM user_stats WHERE user_id = ?", (user_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return dict(zip(STAT_COLUMNS, row or (0,) * len(STAT_COLUMNS)))
+
+def top_users(column, limit=10):
+    """Return (username, count) for the users with the highest all-time count in `column`."""
+    if column not in STAT_COLUMNS:
+        raise ValueError(f"Unknown counter: {column}")
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT u.username, s.{column}
+        FROM user_stats s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.{column} > 0
+        ORDER BY s.{column} DESC, u.id
+        LIMIT ?
+    """, (limit,))
+    users = cursor.fetchall()
+    conn.close()
+    return users
+
+def search_users(prefix, limit=20, exclude_id=None):
+    """Return up to `limit` (id, username) pairs whose username starts with prefix."""
+    prefix = prefix.strip()
+    if not prefix:
+        return []
+    low, high = _prefix_bounds(prefix)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, username FROM users
+        WHERE username >= ? COLLATE NOCASE AND username < ? COLLATE NOCASE AND id IS NOT ?
+        ORDER BY username COLLATE NOCASE
+        LIMIT ?
+    """, (low, high, exclude_id, limit))
+    users = cursor.fetchall()
+    conn.close()
+    return users
+
+def user_picker(label, key, exclude_id=None, limit=20):
+    """
+    Typeahead user picker: a search box plus a short list of matching users.
+    Only the matches for the typed prefix are loaded. Returns (id, username)
+    or None.
+    """
+    prefix = st.text_input(label, key=f"{key}_search", placeholder="Start typing a username")
+    if not prefix.strip():
+        return None
+    matches = search_users(prefix, limit=limit, exclude_id=exclude_id)
+    if not matches:
+        st.caption("No matching users.")
+        return None
+    if len(matches) == limit:
+        st.caption(f"Showing the first {limit} matches; keep typing to narrow them down.")
+    return st.selectbox(
+        "Matching users",
+        matches,
+        format_func=lambda x: f"{x[1]} (ID: {x[0]})",
+        key=key
+    )
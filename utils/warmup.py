@@ -0,0 +1,95 @@
+import importlib
+import logging
+import os
+import time
+from datetime import datetime
+from utils import database
+from utils.page_registry import PAGES
+
+# Pages app.py loads directly rather than through the registry. Their heavy
+# libraries (pandas, plotly) stay deferred to first use, see benchmarks/import_time.py.
+EXTRA_PAGES = ['pages.admin', 'pages.analytics']
+
+def import_pages():
+    """Import every page module, so no session pays for it on first selection."""
+    for module_name in list(PAGES.values()) + EXTRA_PAGES:
+        importlib.import_module(module_name)
+    return len(PAGES) + len(EXTRA_PAGES)
+
+def read_ahead():
+    """
+    Ask the OS to read the database and its WAL into the page cache in the
+    background, so the first queries don't wait on cold disk reads. Returns
+    the bytes requested (0 where posix_fadvise isn't available).
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return 0
+    requested = 0
+    for path in (database.DB_PATH, database.DB_PATH + '-wal'):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            requested += os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+    return requested
+
+def run_hot_queries():
+    """
+    Run what the first requests need once: the Home dashboard, today's
+    calendar, the filter options and the member count. This fills the
+    process-wide caches and leaves the statements in the statement cache of
+    the pooled connection handed out next.
+    """
+    from pages.discussions import discussion_categories
+    from pages.resources import resource_types
+    from utils.calendar_view import events_data_version, get_calendar
+    from utils.dashboard import home_dashboard
+    from utils.recurrence import materialize_occurrences
+    from utils.user_directory import count_users
+
+    today = datetime.now().date()
+    day = today.strftime('%Y-%m-%d')
+    home_dashboard()
+    materialize_occurrences(day)
+    get_calendar("Day", day, day, events_data_version(), today=today)
+    discussion_categories()
+    resource_types()
+    count_users()
+    return 5
+
+STEPS = [
+    ('database', database.initialize_database),
+    ('pages', import_pages),
+    ('read_ahead', read_ahead),
+    ('pool', database.prime_pool),
+    ('hot_queries', run_hot_queries),
+]
+
+def warm_up(log=None):
+    """
+    Prepare this process to serve requests: schema, page modules, OS page
+    cache, connection pool, then the hot queries. A step that fails is
+    logged and skipped; a worker is better served cold than not at all.
+    Returns {step: (seconds, result)}.
+    """
+    report = {}
+    started = time.perf_counter()
+    # Outside a script run Streamlit warns about every st call it sees
+    logging.disable(logging.WARNING)
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        try:
+            result = step()
+        except Exception as e:
+            result = f"failed: {e}"
+        report[name] = (time.perf_counter() - step_started, result)
+        if log:
+            log(f"warm-up {name}: {report[name][0] * 1000:.0f} ms ({result})")
+    logging.disable(logging.NOTSET)
+    if log:
+        log(f"warm-up done in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return report